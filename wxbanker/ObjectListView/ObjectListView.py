@@ -100,6 +100,23 @@ import time
 from wxbanker.ObjectListView import CellEditor, OLVEvent
 
 
+def _getCollationKey(text):
+    """
+    Return the key which sorts the given text the way locale.strcoll() would compare it,
+    so a sort only has to collate each value once rather than once per comparison.
+    """
+    try:
+        if isinstance(text, unicode):
+            try:
+                text = text.encode(locale.getpreferredencoding(False) or "utf-8")
+            except UnicodeError:
+                # The locale can't collate it, so at least keep the order of the code points.
+                text = text.encode("utf-8")
+        return locale.strxfrm(text)
+    except (ValueError, TypeError, LookupError, locale.Error):
+        return text
+
+
 class ObjectListView(wx.ListCtrl):
     """
     An object list displays various aspects of a list of objects in a multi-column list control.
@@ -249,6 +266,11 @@ class ObjectListView(wx.ListCtrl):
         self.whenLastTypingEvent = 0
         self.filter = None
         self.objectToIndexMap = None
+        # The sort key of each model object, by column, and the sorted order of the model
+        # objects by each (primary, secondary, ascending) sort that has been used, so sorting
+        # by a column again doesn't have to get any values. See InvalidateSortKeys().
+        self.sortKeys = {}
+        self.sortPermutations = {}
 
         self.rowFormatter = kwargs.pop("rowFormatter", None)
         self.useAlternateBackColors = kwargs.pop("useAlternateBackColors", True)
@@ -318,6 +340,7 @@ class ObjectListView(wx.ListCtrl):
                 self.AddColumnDefn(x)
             else:
                 self.AddColumnDefn(ColumnDefn(*x))
+        self.InvalidateSortKeys()
         # Try to preserve the column column
         self.SetSortColumn(sortCol)
         if repopulate:
@@ -513,6 +536,7 @@ class ObjectListView(wx.ListCtrl):
             self.Freeze()
             originalSize = len(self.innerList)
             self.modelObjects.extend(modelObjects)
+            self.InvalidateSortKeys([])
             self._BuildInnerList()
             item = wx.ListItem()
             item.SetColumn(0)
@@ -793,6 +817,7 @@ class ObjectListView(wx.ListCtrl):
         """
         Refresh the display of the given model
         """
+        self.InvalidateSortKeys([modelObject])
         idx = self.GetIndexOf(modelObject)
         if idx != -1:
             self.RefreshIndex(self._MapModelIndexToListIndex(idx), modelObject)
@@ -839,6 +864,7 @@ class ObjectListView(wx.ListCtrl):
             for x in modelObjects:
                 self.modelObjects.remove(x)
 
+        self.InvalidateSortKeys(modelObjects)
         self.RepopulateList()
         self.SelectObjects(selection)
 
@@ -941,6 +967,7 @@ class ObjectListView(wx.ListCtrl):
         else:
             self.modelObjects = modelObjects[:]
 
+        self.InvalidateSortKeys()
         self.RepopulateList()
 
         if preserveSelection:
@@ -1768,21 +1795,17 @@ class ObjectListView(wx.ListCtrl):
 
         secondarySortColumn = None # self.GetSecondarySortColumn()
 
-        def _singleObjectComparer(col, object1, object2):
-            value1 = col.GetValue(object1)
-            value2 = col.GetValue(object2)
-            try:
-                return locale.strcoll(value1.lower(), value2.lower())
-            except:
-                return cmp(value1, value2)
+        # Get the key of each item once up front, instead of a value and a collation per comparison.
+        keys = [self._GetSortKey(x, sortColumn, secondarySortColumn) for x in self.innerList]
 
-        def _objectComparer(object1, object2):
-            result = _singleObjectComparer(sortColumn, object1, object2)
-            if secondarySortColumn and result == 0:
-                result = _singleObjectComparer(secondarySortColumn, object1, object2)
-            return result
+        def _sorter(key1, key2):
+            cmpVal = cmp(keys[key1], keys[key2])
+            if self.sortAscending:
+                return cmpVal
+            else:
+                return -cmpVal
 
-        self.SortListItemsBy(_objectComparer)
+        self.SortItems(_sorter)
 
 
     def SortListItemsBy(self, cmpFunc, ascending=None):
@@ -1830,29 +1853,90 @@ class ObjectListView(wx.ListCtrl):
         if evt.IsVetoed() or evt.wasHandled:
             return
 
-        # When sorting large groups, this is called a lot. Make it efficent.
+        # If we have sorted all the objects this way before and nothing has changed since,
+        # reuse that order rather than getting the keys again.
+        permutationKey = (sortColumn, secondarySortColumn, self.sortAscending)
+        permutation = None
+        if modelObjects is self.modelObjects:
+            permutation = self.sortPermutations.get(permutationKey)
+        if permutation is not None and len(permutation) == len(modelObjects):
+            modelObjects[:] = permutation
+        else:
+            modelObjects.sort(key=lambda x: self._GetSortKey(x, sortColumn, secondarySortColumn), reverse=(not self.sortAscending))
+            if modelObjects is self.modelObjects:
+                self.sortPermutations[permutationKey] = modelObjects[:]
+
+        # Sorting invalidates our object map
+        self.objectToIndexMap = None
+
+
+    def _GetSortKey(self, modelObject, sortColumn, secondarySortColumn=None):
+        """
+        Return the key which sorts the given model object by the given columns, caching it
+        until the object is refreshed.
+        """
+        primary = self._GetColumnSortKey(modelObject, sortColumn)
+        if secondarySortColumn:
+            return (primary, self._GetColumnSortKey(modelObject, secondarySortColumn))
+        return primary
+
+
+    def _GetColumnSortKey(self, modelObject, column):
+        """
+        Return the key which sorts the given model object by the given column. Strings are
+        compared without case, in the order of the locale.
+        """
+        keys = self.sortKeys.setdefault(column, {})
+        try:
+            return keys[modelObject]
+        except KeyError:
+            pass
+        except TypeError:
+            # Not every object can be hashed, so the keys of some can't be cached.
+            keys = None
+
+        key = column.GetValue(modelObject)
         # It is more efficient (by about 30%) to try to call lower() and catch the
         # exception than it is to test for the class
-        def _getSortValue(x):
-            primary = sortColumn.GetValue(x)
-            try:
-                primary = primary.lower()
-            except AttributeError:
-                pass
-            if secondarySortColumn:
-                secondary = secondarySortColumn.GetValue(x)
+        try:
+            key = _getCollationKey(key.lower())
+        except AttributeError:
+            pass
+
+        if keys is not None:
+            keys[modelObject] = key
+        return key
+
+
+    def InvalidateSortKeys(self, modelObjects=None):
+        """
+        Forget the cached sort keys of the given model objects, or of every object if None is
+        given, and the cached sorted orders. Call this (or RefreshObject()) when an object
+        changes in a way which may change where it sorts, or objects are added or removed.
+        """
+        self.sortPermutations = {}
+        if modelObjects is None:
+            self.sortKeys = {}
+            return
+
+        for keys in self.sortKeys.itervalues():
+            for x in modelObjects:
                 try:
-                    secondary = secondary.lower()
-                except AttributeError:
+                    keys.pop(x, None)
+                except TypeError:
                     pass
-                return (primary, secondary)
-            else:
-                return primary
 
-        modelObjects.sort(key=_getSortValue, reverse=(not self.sortAscending))
 
-        # Sorting invalidates our object map
-        self.objectToIndexMap = None
+    def InvalidateColumnSortKeys(self, column):
+        """
+        Forget the cached sort keys of every object for the given column, and the cached sorted
+        orders which used them. Call this when the values of a column change for many objects at
+        once, such as when they depend on other objects.
+        """
+        self.sortKeys.pop(column, None)
+        for permutationKey in self.sortPermutations.keys():
+            if column in permutationKey[:2]:
+                del self.sortPermutations[permutationKey]
 
 
     def _UpdateColumnSortIndicators(self, sortColumnIndex=None, oldSortColumnIndex=-1):
@@ -2236,6 +2320,7 @@ class AbstractVirtualObjectListView(ObjectListView):
         """
         Refresh the display of the given modelObject
         """
+        self.InvalidateSortKeys([modelObject])
         # We only have a hammer so everything looks like a nail
         self.RefreshObjects()
 
@@ -2244,6 +2329,8 @@ class AbstractVirtualObjectListView(ObjectListView):
         """
         Refresh all the objects in the given list
         """
+        if aList:
+            self.InvalidateSortKeys(aList)
         # We can only refresh everything
         self.lastGetObjectIndex = -1
         self.RefreshItems(0, self.GetItemCount()-1)
@@ -2459,6 +2546,7 @@ class FastObjectListView(AbstractVirtualObjectListView):
         Add the given collections of objects to our collection of objects.
         """
         self.modelObjects.extend(modelObjects)
+        self.InvalidateSortKeys([])
         # We don't want to call RepopulateList() here since that makes the whole
         # control redraw, which flickers slightly, which I *really* hate! So we
         # most of the work of RepopulateList() but only redraw from the first
@@ -2508,6 +2596,7 @@ class FastObjectListView(AbstractVirtualObjectListView):
         self.lastGetObjectIndex = -1
         # If no list is given, refresh everything
         if aList:
+            self.InvalidateSortKeys(aList)
             for x in aList:
                 idx = self.GetIndexOf(x)
                 if idx != -1:
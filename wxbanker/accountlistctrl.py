@@ -19,6 +19,80 @@
 import wx
 from wxbanker import bankcontrols, bankexceptions, accountconfigdialog, localization
 from wxbanker.lib.pubsub import Publisher
+from wxbanker.refreshscheduler import RefreshScheduler
+
+
+class AccountListBox(wx.VListBox):
+    """
+    An owner-drawn list of account names and balances. Only the rows in view are drawn,
+    so it stays responsive with hundreds of accounts, and a single row can be redrawn
+    by itself when its balance changes.
+
+    The rows come from getRow(n), which returns the (name, balance, mintStatus) of row n,
+    where mintStatus is None or the (bitmapName, tooltip) of its Mint.com status.
+    The last row is the grand total, which is set apart from the accounts by a small gap.
+    """
+    # The bitmaps of the Mint.com statuses, which are shared by all the rows.
+    Bitmaps = {}
+    # The space between the accounts and the total.
+    TOTAL_GAP = 3
+
+    def __init__(self, parent, getRow):
+        wx.VListBox.__init__(self, parent, style=wx.BORDER_NONE)
+        self.getRow = getRow
+        self.RowHeight = self.GetCharHeight() + 8
+        self.tooltip = ""
+        self.Bind(wx.EVT_MOTION, self.onMotion)
+
+    def getBitmap(self, bitmapName):
+        if bitmapName not in self.Bitmaps:
+            self.Bitmaps[bitmapName] = wx.ArtProvider.GetBitmap("wxART_%s" % bitmapName)
+        return self.Bitmaps[bitmapName]
+
+    def OnMeasureItem(self, n):
+        if n == self.GetItemCount() - 1:
+            return self.RowHeight + self.TOTAL_GAP
+        return self.RowHeight
+
+    def OnDrawItem(self, dc, rect, n):
+        name, balance, mintStatus = self.getRow(n)
+        if n == self.GetItemCount() - 1:
+            rect = wx.Rect(rect.x, rect.y + self.TOTAL_GAP, rect.width, rect.height - self.TOTAL_GAP)
+        if self.IsSelected(n):
+            dc.SetTextForeground(wx.SystemSettings.GetColour(wx.SYS_COLOUR_HIGHLIGHTTEXT))
+        else:
+            dc.SetTextForeground(self.GetForegroundColour())
+        dc.SetFont(self.GetFont())
+
+        # Lay the row out from the right: the Mint.com status, then the balance.
+        right = rect.x + rect.width - 3
+        if mintStatus is not None:
+            bitmap = self.getBitmap(mintStatus[0])
+            right -= bitmap.Width
+            dc.DrawBitmap(bitmap, right, rect.y + (rect.height - bitmap.Height) / 2, True)
+            right -= 3
+        balanceWidth, textHeight = dc.GetTextExtent(balance)
+        right -= balanceWidth
+        y = rect.y + (rect.height - textHeight) / 2
+        dc.DrawText(balance, right, y)
+
+        # Cut a long name off before it runs into the balance.
+        dc.SetClippingRegion(rect.x, rect.y, max(right - 10 - rect.x, 0), rect.height)
+        dc.DrawText(name, rect.x + 3, y)
+        dc.DestroyClippingRegion()
+
+    def onMotion(self, event):
+        # Show the Mint.com status of the row under the mouse.
+        n = self.HitTest(event.Position)
+        tooltip = ""
+        if n != wx.NOT_FOUND:
+            mintStatus = self.getRow(n)[2]
+            if mintStatus is not None:
+                tooltip = mintStatus[1]
+        if tooltip != self.tooltip:
+            self.tooltip = tooltip
+            self.SetToolTipString(tooltip)
+        event.Skip()
 
 
 class AccountListCtrl(wx.Panel):
@@ -29,6 +103,8 @@ class AccountListCtrl(wx.Panel):
 
     Accounts can be added, removed, and renamed.
     """
+    # The most rows to show before the list scrolls instead of growing.
+    MAX_ROWS = 20
 
     def __init__(self, parent, bankController, autoPopulate=True):
         wx.Panel.__init__(self, parent, name="AccountListCtrl")
@@ -36,9 +112,14 @@ class AccountListCtrl(wx.Panel):
         self.Model = bankController.Model
 
         # Initialize some attributes to their default values.
-        self.editCtrl = self.hiddenIndex = None
+        self.editCtrl = None
         self.currentIndex = None
-        self.radioButtons, self.totalTexts, self.accountObjects, self.mintStatuses = [], [], [], []
+        self.mintShown = False
+        # The accounts in order, whether each is shown, and the shown ones (by index) in order.
+        self.accountObjects, self.shownAccounts, self.visibleIndexes = [], [], []
+        # The row of each shown account, by index.
+        self.visibleRows = {}
+        self.grandTotal = self.Model.float2str(0)
 
         # Create the staticboxsizer which is the home for everything.
         # This *MUST* be created first to ensure proper z-ordering (as per docs).
@@ -80,22 +161,14 @@ class AccountListCtrl(wx.Panel):
         buttonSizer.AddSpacer(6)
         buttonSizer.Add(removeButton)
 
-        # Set up the "Total" sizer.
-        self.totalText = wx.StaticText(self.childPanel, label=self.Model.float2str(0))
-        self.totalTexts.append(self.totalText)
-        miniSizer = wx.BoxSizer()
-        self.allAccountsRadio = wx.RadioButton(self.childPanel, label=_("All accounts"))
-        miniSizer.Add(self.allAccountsRadio, 1, wx.ALIGN_CENTER)
-        miniSizer.Add(self.totalText, 0, wx.ALIGN_CENTER|wx.LEFT, 10)
-        miniSizer.AddSpacer(3)
+        # The accounts, and the "All accounts" total as the last row, so the keyboard moves through both.
+        self.accountList = AccountListBox(self.childPanel, self.getRow)
 
         #self.staticBoxSizer = SmoothStaticBoxSizer(self.staticBox, wx.VERTICAL)
         self.staticBoxSizer = wx.StaticBoxSizer(self.staticBox, wx.VERTICAL)
         #self.staticBoxSizer.SetSmooth(False)
         childSizer.Add(buttonSizer, 0, wx.BOTTOM, 9)
-        # Add just a tiny bit of padding between the accounts and the total item.
-        childSizer.AddSpacer(3)
-        childSizer.Add(miniSizer, 0, wx.EXPAND)
+        childSizer.Add(self.accountList, 0, wx.EXPAND)
         self.childPanel.Sizer = childSizer
         self.staticBoxSizer.Add(self.childPanel, 1, wx.EXPAND)
 
@@ -104,8 +177,8 @@ class AccountListCtrl(wx.Panel):
         removeButton.Bind(wx.EVT_BUTTON, self.onRemoveButton)
         editButton.Bind(wx.EVT_BUTTON, self.onRenameButton)
         configureButton.Bind(wx.EVT_BUTTON, self.onConfigureButton)
-        # Set up the link binding.
-        self.Bind(wx.EVT_RADIOBUTTON, self.onAccountClick)
+        # Set up the selection binding, for clicks and the arrow keys.
+        self.accountList.Bind(wx.EVT_LISTBOX, self.onAccountClick)
 
         # Subscribe to messages we are concerned about.
         Publisher.subscribe(self.onAccountBalanceChanged, "ormobject.updated.Account.Balance")
@@ -146,32 +219,54 @@ class AccountListCtrl(wx.Panel):
 
         if not self.GetCount():
             self.addButton.StartFlashing()
+
+    def getRow(self, row):
+        """Return what to draw in the given row, which is an account or, after them, the total."""
+        if row == len(self.visibleIndexes):
+            return self.getTotalRow(row)
+        return self.getAccountRow(row)
+
+    def getAccountRow(self, row):
+        """Return the name, balance and Mint.com status to draw in the given row of accounts."""
+        account = self.accountObjects[self.visibleIndexes[row]]
+        mintStatus = None
+        if self.mintShown:
+            mintStatus = self.getMintStatus(account)
+        return account.Name, account.float2str(account.Balance), mintStatus
+
+    def getTotalRow(self, row):
+        return _("All accounts"), self.grandTotal, None
+
+    def getMintStatus(self, account):
+        bitmapName = "transparent"
+        tooltip = _("Not synchronized with Mint.com")
+        if account.IsMintEnabled():
+            tooltip = account.GetSyncString()
+            if account.IsInSync():
+                bitmapName = "accept"
+            else:
+                bitmapName = "exclamation"
+        return bitmapName, tooltip
             
     def onAccountMintIdChanged(self, message):
-        self._UpdateMintStatuses()
+        RefreshScheduler.GetShared().Schedule(self._UpdateMintStatuses)
         
     def onTransactionDateChanged(self, event):
-        self._UpdateMintStatuses()
+        RefreshScheduler.GetShared().Schedule(self._UpdateMintStatuses)
         
     def _UpdateMintStatuses(self):
-        for account, mintCtrl in zip(self.accountObjects, self.mintStatuses):
-            bitmapName = "transparent"
-            tooltip = _("Not synchronized with Mint.com")
-            if account.IsMintEnabled():
-                tooltip = account.GetSyncString()
-                if account.IsInSync():
-                    bitmapName = "accept"
-                else:
-                    bitmapName = "exclamation"
-            mintCtrl.SetBitmap(wx.ArtProvider.GetBitmap("wxART_%s" % bitmapName))
-            mintCtrl.SetToolTipString(tooltip)
+        # The statuses are worked out as the rows are drawn, so just redraw the ones in view.
+        self.accountList.RefreshAll()
 
     def refreshBalances(self):
         # Update all the accounts.
-        for account, textCtrl in zip(self.accountObjects, self.totalTexts):
-            textCtrl.Label = account.float2str(account.Balance)
+        self.accountList.RefreshAll()
         # Update the total text.
         self.updateGrandTotal()
+        RefreshScheduler.GetShared().Schedule(self.layout)
+
+    def layout(self):
+        self.Layout()
         self.Parent.Layout()
         
     def onCurrencyChanged(self, message):
@@ -199,10 +294,9 @@ class AccountListCtrl(wx.Panel):
         self.refreshVisibility()
         
     def ShowMintStatus(self, show):
-        for index, mintStatus in enumerate(self.mintStatuses):
-            if self.IsVisible(index):
-                mintStatus.Show(show)
-        self.Layout()
+        if show != self.mintShown:
+            self.mintShown = show
+            self.accountList.RefreshAll()
         
     def MintStatusIsShown(self):
         return self.Model.MintEnabled
@@ -215,20 +309,18 @@ class AccountListCtrl(wx.Panel):
         if index < 0 or index >= self.GetCount():
             raise IndexError, "No element at index %i"%index
 
-        # Offset by 1 because the first child is actually the button sizer.
-        return self.childSizer.GetItem(index+1).IsShown()
+        return self.shownAccounts[index]
 
     def SelectItem(self, index):
         """Given an index (zero-based), select the appropriate account."""
         if index is None:
             account = None
-            self.allAccountsRadio.Value = True
         else:
             account = self.accountObjects[index]
-            # Set the value in case it wasn't a click that triggered this.
-            self.radioButtons[index].Value = True
 
         self.currentIndex = index
+        # Set the selection in case it wasn't a click that triggered this.
+        self.refreshSelection()
         # Update the remove/edit buttons.
         self.removeButton.Enabled = index is not None
         self.editButton.Enabled = index is not None
@@ -238,6 +330,16 @@ class AccountListCtrl(wx.Panel):
         # as account changes are also triggered by account removals and additions.
         Publisher.sendMessage("view.account changed", account)
         return account
+
+    def refreshSelection(self):
+        """Highlight the row of the current account, or the total if it is all of them."""
+        if self.currentIndex is None:
+            row = len(self.visibleIndexes)
+        else:
+            row = self.visibleRows.get(self.currentIndex, -1)
+        # This also scrolls the row into view.
+        self.accountList.SetSelection(row)
+        
         
     def SelectItemById(self, theId):
         # If there is no recently selected account, select the first visible if one exists.
@@ -263,18 +365,14 @@ class AccountListCtrl(wx.Panel):
         Given an index (zero-based), select the
         visible account at that index.
         """
-        visibleItems = -1
-        for i in range(self.GetCount()):
-            if self.IsVisible(i):
-                visibleItems += 1
-
-                if index == visibleItems:
-                    self.SelectItem(i)
-                    return
-        else: # If we didn't break (or return).
+        if index is not None and 0 <= index < len(self.visibleIndexes):
+            self.SelectItem(self.visibleIndexes[index])
+        else:
             self.SelectItem(None)
             
     def SelectPreviousAccount(self):
+        # Any pending change of balance may change which accounts are shown.
+        RefreshScheduler.GetShared().Flush(self)
         if self.currentIndex is not None:
             i = self.currentIndex - 1
         else:
@@ -287,6 +385,7 @@ class AccountListCtrl(wx.Panel):
         return self.accountObjects[0]
     
     def SelectNextAccount(self):
+        RefreshScheduler.GetShared().Flush(self)
         if self.currentIndex is not None:
             i = self.currentIndex + 1
         else:
@@ -305,7 +404,7 @@ class AccountListCtrl(wx.Panel):
         return len(self.accountObjects)
     
     def GetVisibleCount(self):
-        return len([i for i in range(self.GetCount()) if self.IsVisible(i)])
+        return len(self.visibleIndexes)
 
     def GetCurrentAccount(self):
         if self.currentIndex is not None:
@@ -352,57 +451,22 @@ class AccountListCtrl(wx.Panel):
 
         This assumes the account already exists in the database.
         """
-        balance = account.Balance
-
-        # Create the controls.
-        link = wx.RadioButton(self.childPanel, label=account.Name)
-        link.AccountIndex = index
-        totalText = wx.StaticText(self.childPanel, label=account.float2str(balance))
-        mintStatus = wx.StaticBitmap(self.childPanel)
-        mintStatus.Show(self.Model.MintEnabled)
-        
         self.accountObjects.insert(index, account)
-        self.radioButtons.insert(index, link)
-        self.totalTexts.insert(index, totalText)
-        self.mintStatuses.insert(index, mintStatus)
-
-        # Put them in an hsizer.
-        miniSizer = wx.BoxSizer()
-        miniSizer.Add(link, 1, wx.ALIGN_CENTER)
-        miniSizer.Add(totalText, 0, wx.ALIGN_CENTER|wx.LEFT, 10)
-        miniSizer.Add(mintStatus, 0, wx.ALIGN_CENTER|wx.LEFT, 3)
-        miniSizer.AddSpacer(3)
-
-        # Insert the hsizer into the correct position in the list.
-        self.childSizer.Insert(index+1, miniSizer, 0, wx.EXPAND|wx.BOTTOM, 3)
-
-        # Renumber the links after this.
-        for linkCtrl in self.radioButtons[index+1:]:
-            linkCtrl.AccountIndex = linkCtrl.AccountIndex+1
+        self.shownAccounts.insert(index, True)
+
         if self.currentIndex >= index:
             self.currentIndex += 1
+        self.updateRows()
 
         # Update the total text, as sometimes the account already exists.
         self.updateGrandTotal()
 
-        self.Layout()
-        self.Parent.Layout()
+        RefreshScheduler.GetShared().Schedule(self.layout)
 
     def _RemoveItem(self, index, fixSel=True):
-        linkCtrl = self.radioButtons[index]
-
         self.accountObjects.pop(index)
-        del self.radioButtons[index]
-        del self.totalTexts[index]
-        del self.mintStatuses[index]
-
-        # Renumber the links after this.
-        for linkCtrl in self.radioButtons[index:]:
-            linkCtrl.AccountIndex = linkCtrl.AccountIndex-1
-
-        # Actually remove (sort of) the account sizer.
-        self.childSizer.Hide(index+1)
-        self.childSizer.Detach(index+1)
+        del self.shownAccounts[index]
+        self.updateRows()
 
         # Handle selection logic.
         if fixSel:
@@ -418,31 +482,55 @@ class AccountListCtrl(wx.Panel):
         # Update the total text (subtract what was removed).
         self.updateGrandTotal()
 
-        self.Layout()
-        self.Parent.Layout()
+        RefreshScheduler.GetShared().Schedule(self.layout)
 
-    def onAccountBalanceChanged(self, message):
+    def updateRows(self):
         """
-        Update all the total strings.
+        Update which row each shown account is in, after accounts are added, removed, or shown or hidden.
         """
-        account = message.data
-        # Figure out the position of the account in our list.
-        index = self.accountObjects.index(account) # Raises ValueError if not found.
+        self.visibleIndexes = [i for i, shown in enumerate(self.shownAccounts) if shown]
+        self.visibleRows = dict((index, row) for row, index in enumerate(self.visibleIndexes))
+
+        # Grow with the accounts up to a point, after which the list scrolls. The total is the extra row.
+        rows = len(self.visibleIndexes)
+        height = self.accountList.RowHeight * (min(rows, self.MAX_ROWS) + 1) + AccountListBox.TOTAL_GAP
+        self.accountList.SetMinSize((-1, height))
+        self.accountList.SetItemCount(rows + 1)
+        self.refreshSelection()
+        self.accountList.RefreshAll()
+
+    def onAccountBalanceChanged(self, message):
+        # However many balances change in this event, update the totals once afterwards.
+        RefreshScheduler.GetShared().Schedule(self.refreshAccounts, message.data)
 
-        # Update the total for the changed account.
-        self.totalTexts[index].Label = account.float2str(account.Balance)
+    def refreshAccounts(self, accounts):
+        """
+        Redraw the rows of the accounts whose balances changed, and what depends on them.
+        """
+        showZero = self.bankController.ShowZeroBalanceAccounts
+        visibilityChanged = False
+        for account in accounts:
+            # Figure out the position of the account in our list, if it wasn't removed since.
+            try:
+                index = self.accountObjects.index(account)
+            except ValueError:
+                continue
+            # Redraw the changed account, along with its sync status, if it is shown.
+            if index in self.visibleRows:
+                self.accountList.RefreshLine(self.visibleRows[index])
+            # Handle a zero-balance account going to non-zero or vice-versa.
+            if self.shownAccounts[index] != self.isShown(account, showZero):
+                visibilityChanged = True
         # Update the grand total.
         self.updateGrandTotal()
 
-        # Handle a zero-balance account going to non-zero or vice-versa.
-        self.refreshVisibility()
-        
-        # Refresh sync status
-        self._UpdateMintStatuses()
+        if visibilityChanged:
+            self.refreshVisibility()
 
     def updateGrandTotal(self):
         shownick = self.bankController.ShowCurrencyNick
-        self.totalText.Label = self.Model.float2str( self.Model.Balance, withNick=shownick )
+        self.grandTotal = self.Model.float2str( self.Model.Balance, withNick=shownick )
+        self.accountList.RefreshLine(len(self.visibleIndexes))
 
     def onAddButton(self, event):
         self.showEditCtrl()
@@ -480,6 +568,10 @@ class AccountListCtrl(wx.Panel):
             event.Skip()
 
     def showEditCtrl(self, pos=-1, focus=True):
+        """
+        Show the box to type the name of a new account in above the accounts,
+        or to rename the account at pos over its row if it is given.
+        """
         if self.editCtrl:
             self.editCtrl.Value = ''
             self.editCtrl.Show()
@@ -489,35 +581,37 @@ class AccountListCtrl(wx.Panel):
             self.editCtrl.Bind(wx.EVT_KEY_DOWN, self.onEditCtrlKey)
 
         if pos == -1:
-            pos = 1
             self.editCtrl.Value = _("Account name")
             self.editCtrl.Bind(wx.EVT_TEXT_ENTER, self.onAddAccount)
+            self.childSizer.Insert(1, self.editCtrl, 0, wx.EXPAND|wx.BOTTOM, 3)#, smooth=True)
+            self.Parent.Layout()
         else:
             self.editCtrl.Value = self.accountObjects[pos].Name
-            pos += 1
-            self.childSizer.Hide(pos)
-            self.hiddenIndex = pos
             self.editCtrl.Bind(wx.EVT_TEXT_ENTER, self.onRenameAccount)
+            self.placeEditCtrl(self.visibleRows[pos])
             
         # Select the text inside so it can be typed over.
         self.editCtrl.SetSelection(-1, -1)
 
-        self.childSizer.Insert(pos, self.editCtrl, 0, wx.EXPAND)#, smooth=True)
-        self.Parent.Layout()
-
         if focus:
             self.editCtrl.SetFocus()
 
-    def onHideEditCtrl(self, event=None, restore=True):
-        # Hide and remove the control and re-layout.
-        self.childSizer.Hide(self.editCtrl)#, smooth=True)
+    def placeEditCtrl(self, row):
+        """Put the edit box over the given row of accounts, scrolling it into view if needed."""
+        accountList = self.accountList
+        if not accountList.IsVisible(row):
+            accountList.ScrollToLine(row)
+        position = accountList.Position
+        y = position.y + (row - accountList.GetFirstVisibleLine()) * accountList.RowHeight
+        height = self.editCtrl.GetBestSize().height
+        self.editCtrl.SetDimensions(position.x, y + (accountList.RowHeight - height) / 2, accountList.Size.width, height)
+        self.editCtrl.Raise()
+
+    def onHideEditCtrl(self, event=None):
+        # Hide and remove the control (if it was added above the accounts) and re-layout.
+        self.editCtrl.Hide()
         self.childSizer.Detach(self.editCtrl)
 
-        # If it was a rename, we have to re-show the linkctrl.
-        if restore and self.hiddenIndex is not None:
-            self.childSizer.Show(self.hiddenIndex)
-            self.hiddenIndex = None
-
         self.Parent.Layout()
 
         # Re-enable the add button.
@@ -563,22 +657,22 @@ class AccountListCtrl(wx.Panel):
         """Called when an account has been renamed in the model."""
         account = message.data
         # Hide the edit control.
-        self.onHideEditCtrl(restore=False)
+        self.onHideEditCtrl()
         # Just renaming won't put it in the right alpha position, so remove it
         # and add it again, letting _PutAccount handle the ordering.
         self._RemoveItem(self.currentIndex, fixSel=False)
         self.currentIndex = self._PutAccount(account)
-        self.radioButtons[self.currentIndex].Value = True
+        self.refreshSelection()
 
     def onAccountClick(self, event):
         """
-        This method is called when the current account has been changed by clicking on an account name.
+        This method is called when the current account has been changed by clicking on an account,
+        or moving to another with the arrow keys.
         """
-        radio = event.EventObject
-        if radio is self.allAccountsRadio:
+        if event.Selection == len(self.visibleIndexes):
             account = None
         else:
-            account = self.accountObjects[radio.AccountIndex]
+            account = self.accountObjects[self.visibleIndexes[event.Selection]]
         Publisher.sendMessage("user.account changed", account)
         
     def onShowZeroToggled(self, message):
@@ -590,6 +684,10 @@ class AccountListCtrl(wx.Panel):
     def onSelectPreviousAccount(self, message):
         self.SelectPreviousAccount()
 
+    def isShown(self, account, showZero):
+        # If the account is out of sync, always show it so as not to hide discrepencies.
+        return showZero or abs(account.Balance) >= .001 or account.IsOutOfSync()
+
     def refreshVisibility(self, refreshSelection=True):
         """
         This method is called when the user checks/unchecks the option to hide zero-balance accounts.
@@ -597,15 +695,8 @@ class AccountListCtrl(wx.Panel):
         showZero = self.bankController.ShowZeroBalanceAccounts
         showMint = self.MintStatusIsShown()
         
-        for i, account in enumerate(self.accountObjects):
-            # Show it, in the case of calls from updateTotals where a
-            # zero-balance became a non-zero. otherwise it won't come up.
-            # +1 offset is to take into account the buttons at the top.
-            self.childSizer.Show(i+1)
-            if not showZero:
-                # If the account is out of sync, always show it so as not to hide discrepencies.
-                if abs(account.Balance) < .001 and not account.IsOutOfSync():
-                    self.childSizer.Hide(i+1)
+        self.shownAccounts = [self.isShown(account, showZero) for account in self.accountObjects]
+        self.updateRows()
 
         # Restore the Mint status.
         self.ShowMintStatus(showMint)
@@ -613,4 +704,4 @@ class AccountListCtrl(wx.Panel):
         if refreshSelection and not showZero and not self.IsVisible(self.currentIndex):
             self.SelectVisibleItem(0)
                 
-        self.Parent.Layout()
+        RefreshScheduler.GetShared().Schedule(self.layout)
@@ -21,6 +21,129 @@
 import datetime, calendar
 from dateutil.relativedelta import relativedelta
 
+from wxbanker.lib.pubsub import Publisher
+from wxbanker.bankobjects.tag import TagRegistry
+
+# Forecasting needs NumPy, which is otherwise only required for plotting.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def requireNumpy(feature):
+    """Raise a clear error if NumPy isn't installed, rather than failing somewhere in the feature."""
+    if numpy is None:
+        raise ImportError("%s requires NumPy (python-numpy), which is not installed." % feature)
+
+def _sampleDays(start, end, numPoints):
+    """
+    Return the ordinal day of each of numPoints evenly spaced points from start to end, along
+    with the (fractional) days per point. A point covers up to start + daysPerPoint * (i+1), where
+    adding a timedelta to a date drops any fraction of a day, as in BasePlot.getPoints. Work in
+    microseconds, as timedelta does, to match that exactly.
+    """
+    daysPerPoint = 1.0 * (end - start) / numPoints
+    delta = datetime.timedelta(daysPerPoint)
+    deltaMicroseconds = (delta.days * 86400 + delta.seconds) * 10**6 + delta.microseconds
+    offsets = deltaMicroseconds * numpy.arange(1, numPoints + 1, dtype=numpy.int64) // (86400 * 10**6)
+    return numpy.minimum(start + offsets, end), daysPerPoint
+
+def sampleBalances(dates, amounts, start, end, numPoints):
+    """
+    Return the balance after the amounts on their dates, as of numPoints evenly spaced days
+    from start to end, along with the (fractional) days per point. The dates must be ascending
+    ordinals. This gives the same points as BasePlot.getPoints would from a total for every
+    day, but with a cumsum and searchsorted instead of building those daily totals.
+    """
+    samples, daysPerPoint = _sampleDays(start, end, numPoints)
+    balances = numpy.concatenate(([0.0], numpy.cumsum(amounts, dtype=float)))
+    indexes = numpy.searchsorted(numpy.asarray(dates, dtype=int), samples, side="right")
+    return balances[indexes].tolist(), daysPerPoint
+
+def sampleBalanceExtremes(dates, amounts, start, end, numPoints):
+    """
+    Like sampleBalances, but split the days into numPoints/2 even buckets and return the lowest
+    and highest daily balance of each, in the order they happened. Unlike the balance at the end
+    of each bucket, this keeps spikes such as money which came in and went out within a bucket.
+    """
+    if numPoints < 2:
+        return sampleBalances(dates, amounts, start, end, numPoints)
+
+    buckets = numPoints // 2
+    bounds, daysPerBucket = _sampleDays(start, end, buckets)
+    dates = numpy.asarray(dates, dtype=int)
+    balances = numpy.concatenate(([0.0], numpy.cumsum(amounts, dtype=float)))
+
+    # The balance at the end of each day from after start until the last bound on which it changes.
+    lo, hi = numpy.searchsorted(dates, [start, bounds[-1]], side="right")
+    lastOfDay = numpy.ones(hi - lo, dtype=bool)
+    lastOfDay[:-1] = dates[lo+1:hi] != dates[lo:hi-1]
+    days = dates[lo:hi][lastOfDay]
+    dayBalances = balances[lo+1:hi+1][lastOfDay]
+    # Bucket k covers the days after the bound of bucket k-1 up to its own bound, and the first also start.
+    dayBuckets = numpy.searchsorted(bounds, days, side="left")
+
+    # The balance carried into a bucket is the balance of its first day, unless it changes that day.
+    previous = numpy.concatenate(([start], bounds[:-1]))
+    carried = balances[numpy.searchsorted(dates, previous, side="right")]
+    keep = ~(numpy.in1d(previous + 1, days) & (bounds > previous))
+    keep[0] = True
+
+    allBuckets = numpy.concatenate((numpy.arange(buckets)[keep], dayBuckets))
+    allDays = numpy.concatenate((previous[keep], days))
+    allBalances = numpy.concatenate((carried[keep], dayBalances))
+
+    # Sort by bucket and then balance, so the first of each bucket is its extreme, the earliest for ties.
+    firsts = numpy.searchsorted(numpy.sort(allBuckets), numpy.arange(buckets))
+    lows = numpy.lexsort((allDays, allBalances, allBuckets))[firsts]
+    highs = numpy.lexsort((allDays, -allBalances, allBuckets))[firsts]
+    lowFirst = allDays[lows] <= allDays[highs]
+
+    points = numpy.empty((buckets, 2))
+    points[:, 0] = numpy.where(lowFirst, allBalances[lows], allBalances[highs])
+    points[:, 1] = numpy.where(lowFirst, allBalances[highs], allBalances[lows])
+    return points.ravel().tolist(), daysPerBucket / 2
+
+def sampleTotals(series, numPoints, daterange=None, extremes=False):
+    """
+    Sample the (dates, amounts) of BankModel.GetBalanceSeries, or a list of them, returning
+    (points, startDate, daysPerPoint) as BankModel.GetSampledTotals does. This only uses the
+    plain lists it is given, so it is safe to run in a worker thread.
+    """
+    many = isinstance(series, list)
+    if not many:
+        series = [series]
+
+    first = last = None
+    for dates, amounts in series:
+        if dates:
+            first = min(first or dates[0], dates[0])
+            last = max(last, dates[-1])
+
+    # Like GetXTotals, cover the transactions and up to today, or exactly the date range.
+    if first is not None:
+        if daterange:
+            first, last = [d.toordinal() for d in daterange]
+        else:
+            last = max(last, datetime.date.today().toordinal())
+
+    # If there is nothing to plot, return 0 for every point and start at today.
+    if first is None or first > last:
+        points = [[0] * 10 for s in series]
+        startDate, daysPerPoint = datetime.date.today(), 0
+    else:
+        points = []
+        sample = sampleBalanceExtremes if extremes else sampleBalances
+        for dates, amounts in series:
+            accountPoints, daysPerPoint = sample(dates, amounts, first, last, numPoints)
+            points.append(accountPoints)
+        startDate = datetime.date.fromordinal(first)
+
+    if not many:
+        points = points[0]
+    # Don't ever return 0 as the days per point, you can't graph without SOME x delta.
+    return points, startDate, daysPerPoint or 1.0/2**32
+
 class MonthlyAnalyzer:
     def __init__(self, months=12):
         self.Today = datetime.date.today()
@@ -55,5 +178,300 @@ class MonthlyAnalyzer:
                 self._AddToBucket(buckets, date, t.Amount)
             
         return [(key, buckets[key]) for key in sorted(buckets)]
-                
-        
+
+    def GetPeriodEarnings(self, periodTotals, account=None, tag=None):
+        """
+        Return the same [("YYYY.MM", amount), ...] as GetEarnings, but read from the
+        precomputed monthly totals of a PeriodTotals, optionally of one account or tag.
+        """
+        start, end = self.GetDateRange()
+        lastMonth = start + relativedelta(months=self.Months-1)
+        series = periodTotals.GetSeries(PeriodTotals.MONTH, start, lastMonth, account, tag)
+        # Like GetEarnings, leave out the transactions in the last month after the end date.
+        lastMonthEnd = lastMonth + relativedelta(months=1, days=-1)
+        later = periodTotals.GetSeries(PeriodTotals.DAY, max(end + relativedelta(days=1), lastMonth), lastMonthEnd, account, tag)
+        if series and later:
+            date, amount = series[-1]
+            series[-1] = (date, amount - sum(dayAmount for day, dayAmount in later))
+        return [(self._DateToBucket(date), amount) for date, amount in series]
+
+
+class PeriodTotals:
+    """
+    Keep the total amount of the transactions in each day, week, month, quarter and year,
+    for all accounts, each account, and each tag. Periods are integers which count
+    from year zero, so they are cheap to compute and consecutive periods are adjacent.
+    The totals are updated from the transaction messages, so reports never have to
+    go through every transaction. Tag totals need every transaction's tags parsed,
+    so they are only added once a tag is first asked for.
+    """
+    DAY, WEEK, MONTH, QUARTER, YEAR = range(5)
+    GRANULARITIES = (DAY, WEEK, MONTH, QUARTER, YEAR)
+
+    def __init__(self, model):
+        # {(granularity, scope): {period: total}}, where scope is None for all accounts.
+        self._Totals = {}
+        # {transaction: (accountID, periods, amount, tagNames)}, which is what was added for it.
+        self._Entries = {}
+        # Transactions which changed since they were added, and are updated on the next read.
+        self._Dirty = set()
+        # Whether the tag totals are kept yet, see _indexTags.
+        self._TagsIndexed = False
+
+        for account in model.Accounts:
+            for transaction in account.Transactions:
+                self._add(transaction)
+
+        Publisher.subscribe(self.onTransactionCreated, "transaction.created")
+        Publisher.subscribe(self.onTransactionsCreated, "transactions.created")
+        Publisher.subscribe(self.onTransactionsRemoved, "transactions.removed")
+        Publisher.subscribe(self.onTransactionChanged, "ormobject.updated.Transaction.Amount")
+        Publisher.subscribe(self.onTransactionChanged, "ormobject.updated.Transaction.Date")
+        # Tags come from the description.
+        Publisher.subscribe(self.onTransactionChanged, "ormobject.updated.Transaction.Description")
+
+    @staticmethod
+    def PeriodOf(granularity, date):
+        """Return the integer period of the granularity which the date falls in."""
+        if granularity == PeriodTotals.DAY:
+            return date.toordinal()
+        elif granularity == PeriodTotals.WEEK:
+            # Weeks start on Monday, and the first ordinal (1/1/1) was a Monday.
+            return (date.toordinal() - 1) // 7
+        elif granularity == PeriodTotals.MONTH:
+            return date.year * 12 + date.month - 1
+        elif granularity == PeriodTotals.QUARTER:
+            return date.year * 4 + (date.month - 1) // 3
+        elif granularity == PeriodTotals.YEAR:
+            return date.year
+        raise ValueError("Unknown granularity: %r" % granularity)
+
+    @staticmethod
+    def PeriodStart(granularity, period):
+        """Return the first date of the period, the inverse of PeriodOf."""
+        if granularity == PeriodTotals.DAY:
+            return datetime.date.fromordinal(period)
+        elif granularity == PeriodTotals.WEEK:
+            return datetime.date.fromordinal(period * 7 + 1)
+        elif granularity == PeriodTotals.MONTH:
+            return datetime.date(period // 12, period % 12 + 1, 1)
+        elif granularity == PeriodTotals.QUARTER:
+            return datetime.date(period // 4, (period % 4) * 3 + 1, 1)
+        elif granularity == PeriodTotals.YEAR:
+            return datetime.date(period, 1, 1)
+        raise ValueError("Unknown granularity: %r" % granularity)
+
+    def _scopes(self, accountID, tagNames):
+        yield None
+        yield ("account", accountID)
+        for tagName in tagNames:
+            yield ("tag", tagName)
+
+    def _apply(self, entry, sign):
+        accountID, periods, amount, tagNames = entry
+        self._applyScopes(self._scopes(accountID, tagNames), periods, amount * sign)
+
+    def _applyScopes(self, scopes, periods, amount):
+        for scope in scopes:
+            for granularity, period in zip(self.GRANULARITIES, periods):
+                totals = self._Totals.setdefault((granularity, scope), {})
+                total = totals.get(period, 0) + amount
+                # Drop periods which no longer have anything in them, allowing for float error.
+                if abs(total) < 1e-9:
+                    totals.pop(period, None)
+                else:
+                    totals[period] = total
+
+    def _add(self, transaction):
+        account = transaction.Parent
+        # The CSV import preview sends the same messages for its container, which isn't an account.
+        accountID = getattr(account, "ID", None)
+        if accountID is None:
+            return
+
+        date = transaction.Date
+        periods = tuple(self.PeriodOf(granularity, date) for granularity in self.GRANULARITIES)
+        tagNames = ()
+        if self._TagsIndexed:
+            tagNames = tuple(tag.Name for tag in transaction.Tags)
+        entry = (accountID, periods, transaction.Amount, tagNames)
+        self._Entries[transaction] = entry
+        self._apply(entry, 1)
+
+    def _remove(self, transaction):
+        self._Dirty.discard(transaction)
+        entry = self._Entries.pop(transaction, None)
+        if entry is not None:
+            self._apply(entry, -1)
+
+    def _update(self):
+        """Re-add any transactions which changed since they were added."""
+        for transaction in self._Dirty:
+            entry = self._Entries.pop(transaction)
+            self._apply(entry, -1)
+            self._add(transaction)
+        self._Dirty.clear()
+
+    def _indexTags(self):
+        """Add the tag totals of every transaction, the first time that they are needed."""
+        self._TagsIndexed = True
+        for transaction, (accountID, periods, amount, tagNames) in self._Entries.items():
+            tagNames = tuple(tag.Name for tag in transaction.Tags)
+            self._Entries[transaction] = (accountID, periods, amount, tagNames)
+            self._applyScopes([("tag", tagName) for tagName in tagNames], periods, amount)
+
+    def _getScope(self, account, tag):
+        if account is not None and tag is not None:
+            raise ValueError("Totals are kept per account or per tag, not both.")
+        if account is not None:
+            return ("account", account.ID)
+        if tag is not None:
+            if not self._TagsIndexed:
+                self._indexTags()
+            return ("tag", TagRegistry.Get(tag).Name)
+        return None
+
+    def GetTotals(self, granularity, account=None, tag=None):
+        """
+        Return a new {period: total} of every period whose transactions don't add up to zero,
+        for all accounts or one account or tag. The amounts are not converted, as with MonthlyAnalyzer.
+        """
+        self._update()
+        totals = self._Totals.get((granularity, self._getScope(account, tag)), {})
+        return dict(totals)
+
+    def GetSeries(self, granularity, start, end, account=None, tag=None):
+        """Return [(periodStart, total), ...] for every period from start to end dates, including empty ones."""
+        self._update()
+        totals = self._Totals.get((granularity, self._getScope(account, tag)), {})
+        first, last = self.PeriodOf(granularity, start), self.PeriodOf(granularity, end)
+        return [(self.PeriodStart(granularity, period), totals.get(period, 0)) for period in range(first, last + 1)]
+
+    def onTransactionCreated(self, message):
+        account, transaction = message.data
+        self._add(transaction)
+
+    def onTransactionsCreated(self, message):
+        account, transactions = message.data
+        for transaction in transactions:
+            self._add(transaction)
+
+    def onTransactionsRemoved(self, message):
+        account, transactions = message.data
+        for transaction in transactions:
+            self._remove(transaction)
+
+    def onTransactionChanged(self, message):
+        transaction = message.data
+        # The description is published before the tags are updated, so wait until the next read.
+        if transaction in self._Entries:
+            self._Dirty.add(transaction)
+
+
+class ForecastAnalyzer:
+    """
+    Project daily balances into the future from the current balances, any transactions
+    already entered in the future, and every occurrence of the recurring transactions.
+    Occurrences are expanded as arrays of day offsets from today and the balances are
+    NumPy cumulative sums, so there are no per-day Python loops. This needs NumPy 1.6
+    or later, for bincount's minlength.
+    """
+    def __init__(self, years=5):
+        requireNumpy("Forecasting")
+        self.Today = datetime.date.today()
+        self.Years = years
+
+    def GetDateRange(self):
+        """The projection starts with today's balance and ends at the horizon."""
+        return self.Today, self.Today + relativedelta(years=self.Years)
+
+    def GetDays(self):
+        """The number of days projected after today."""
+        start, end = self.GetDateRange()
+        return (end - start).days
+
+    def GetOccurrences(self, recurring):
+        """
+        Return a sorted array of day offsets from today on which the recurring transaction
+        will be entered, up to the horizon. Dates which are already due but not yet entered
+        will be entered as soon as possible, so they count as today (offset 0).
+        """
+        days = self.GetDays()
+        end = days
+        if recurring.EndDate:
+            end = min(end, (recurring.EndDate - self.Today).days)
+
+        first = (recurring.Date - self.Today).days
+        if recurring.LastTransacted:
+            first = max(first, (recurring.LastTransacted - self.Today).days + 1)
+        if first > end:
+            return numpy.zeros(0, dtype=int)
+
+        every = recurring.RepeatEvery
+        start = (recurring.Date - self.Today).days
+        if recurring.RepeatType == recurring.DAILY:
+            offsets = numpy.arange(start, end + 1, every)
+        elif recurring.RepeatType == recurring.WEEKLY:
+            # Weeks start on Monday, and every RepeatEvery'th week from the first one repeats.
+            monday = start - recurring.Date.weekday()
+            weeks = numpy.arange(monday, end + 1, 7 * every)
+            weekdays = [i for i, on in enumerate(recurring.RepeatOn) if on]
+            offsets = numpy.sort(numpy.concatenate([weeks + i for i in weekdays] or [weeks[:0]]))
+        else:
+            # Months and years have uneven lengths, but there are few enough of these to use the rule.
+            rule = recurring.GetRRule()
+            last = self.Today + datetime.timedelta(days=end)
+            dates = rule.between(recurring.DateToDatetime(recurring.Date), recurring.DateToDatetime(last), inc=True)
+            offsets = numpy.array([(dt.date() - self.Today).days for dt in dates], dtype=int)
+
+        offsets = offsets[(offsets >= first) & (offsets <= end)]
+        return numpy.maximum(offsets, 0)
+
+    def GetBalances(self, accounts, currency=None):
+        """
+        Return an array of the projected total balance of the accounts for each day
+        from today until the horizon, optionally converted to the given currency.
+        """
+        days = self.GetDays()
+        accounts = list(accounts)
+        changes = numpy.zeros(days + 1)
+        balance = 0.0
+
+        # Use a per-account conversion factor, since conversion is linear.
+        factors = {}
+        for account in accounts:
+            factors[account] = account.balanceAtCurrency(1.0, currency)
+
+        for account in accounts:
+            factor = factors[account]
+            # Transactions already entered in the future are in the balance, so move them to their day.
+            futureOffsets, futureAmounts = [], []
+            for t in account.Transactions:
+                if t.Date > self.Today:
+                    futureOffsets.append((t.Date - self.Today).days)
+                    futureAmounts.append(t.Amount)
+            balance += (account.Balance - sum(futureAmounts)) * factor
+            if futureOffsets:
+                offsets = numpy.minimum(futureOffsets, days + 1)
+                changes += numpy.bincount(offsets, weights=futureAmounts, minlength=days + 2)[:days + 1] * factor
+
+        # Recurring transfers from another account affect these accounts too, so consider them all.
+        recurrings = accounts[0].Parent.GetRecurringTransactions() if accounts else []
+        for recurring in recurrings:
+            parentFactor = factors.get(recurring.Parent, 0)
+            # A recurring transfer takes the same amount out of its source account.
+            sourceFactor = factors.get(recurring.Source, 0) if recurring.Source else 0
+            if not (parentFactor or sourceFactor):
+                continue
+            offsets = self.GetOccurrences(recurring)
+            if len(offsets):
+                occurrences = numpy.bincount(offsets, minlength=days + 1)
+                changes += occurrences * (recurring.Amount * (parentFactor - sourceFactor))
+
+        return balance + numpy.cumsum(changes)
+
+    def GetTotals(self, accounts, currency=None):
+        """Return the projected balances as [(date, balance), ...], like BankModel.GetXTotals."""
+        balances = self.GetBalances(accounts, currency)
+        onedaydelta = datetime.timedelta(days=1)
+        return [(self.Today + i * onedaydelta, float(balance)) for i, balance in enumerate(balances)]
@@ -26,7 +26,6 @@ from wxbanker.bankobjects.recurringtransaction import RecurringTransaction
 from wxbanker import currencies, bankexceptions, debug
 from wxbanker.mint.api import Mint
 
-from wxbanker.currencies import CurrencyList
 from wxbanker.currconvert import CurrencyConverter
 
 import datetime
@@ -92,8 +91,8 @@ class Account(ORMObject):
 
     def balanceAtCurrency(self, balance, currency):
         if currency:
-            conv = CurrencyConverter()
-            destCurrency = CurrencyList[currency]().GetCurrencyNick()
+            conv = CurrencyConverter.GetShared()
+            destCurrency = currencies.GetCurrencyNick(currency)
             srcCurrency = self.GetCurrency().GetCurrencyNick()
             return conv.Convert(balance, srcCurrency, destCurrency)
         return balance
@@ -137,6 +136,11 @@ class Account(ORMObject):
                             self._Transactions[i] = oldT
                             break
 
+            # Now that we know which objects are the real ones, index any recurring children.
+            for transaction in self._Transactions:
+                if transaction.RecurringParent is not None:
+                    transaction.RecurringParent._Children[transaction] = True
+
         return self._Transactions
 
     def GetName(self):
@@ -150,14 +154,54 @@ class Account(ORMObject):
         self.Parent.Remove(self.Name)
 
     def AddTransactions(self, transactions, sources=None):
+        """
+        Add many transaction objects at once, optionally making the opposite transaction in a
+        source account for each. Every account involved gets one balance update and one
+        transactions.created message, instead of one of each per transaction.
+        """
         Publisher.sendMessage("batch.start")
         # If we don't have any sources, we want None for each transaction.
         if sources is None:
             sources = [None for i in range(len(transactions))]
-            
-        for t, source in zip(transactions, sources):
-            self.AddTransaction(transaction=t, source=source)
+
+        # Create the opposite sides of any transfers, grouped by their account.
+        groups = []
+        links = []
+        for transaction, source in zip(transactions, sources):
+            # These may be coming from another account or an import, so they need new rows here.
+            transaction.ID = None
+            transaction.Parent = self
+            if source:
+                other = Transaction(None, source, -1 * transaction.Amount, transaction._Description, transaction.Date)
+                other.RecurringParent = transaction.RecurringParent
+                transaction.LinkedTransaction = other
+                links.append((other, transaction))
+                for account, others in groups:
+                    if account is source:
+                        others.append(other)
+                        break
+                else:
+                    groups.append((source, [other]))
+        groups.append((self, list(transactions)))
+
+        # Store the other sides first, so that the transactions here are stored with their link.
+        for account, accountTransactions in groups:
+            account._storeTransactions(accountTransactions)
+        for other, transaction in links:
+            other.LinkedTransaction = transaction
+
+        for account, accountTransactions in groups:
+            Publisher.sendMessage("transactions.created", (account, accountTransactions))
+            account.Balance += sum(t.Amount for t in accountTransactions)
         Publisher.sendMessage("batch.end")
+
+    def _storeTransactions(self, transactions):
+        self.Store.MakeTransactions(self, transactions)
+        # See AddTransaction for why these may need to go in _preTransactions.
+        if self._Transactions is not None:
+            self._Transactions.extend(transactions)
+        else:
+            self._preTransactions.extend(transactions)
         
     def AddRecurringTransaction(self, amount, description, date, repeatType, repeatEvery=1, repeatOn=None, endDate=None, source=None):
         # Create the recurring transaction object.
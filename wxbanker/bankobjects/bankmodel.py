@@ -26,22 +26,33 @@ import re, datetime
 from wxbanker import currencies
 from wxbanker.bankobjects.ormobject import ORMKeyValueObject
 from wxbanker.bankobjects.accountlist import AccountList
+from wxbanker.bankobjects.transaction import Transaction
+from wxbanker.analyzers import ForecastAnalyzer, PeriodTotals, sampleTotals
 from wxbanker.mint.api import Mint
 
-from wxbanker.currencies import GetCurrencyInt
+from wxbanker.currencies import GetCurrencyInt, GetCurrencyNick
+from wxbanker.currconvert import CurrencyConverter
 
 class BankModel(ORMKeyValueObject):
     ORM_TABLE = "meta"
     ORM_ATTRIBUTES = ["LastAccountId", "MintEnabled", "GlobalCurrency"]
     
-    def __init__(self, store):
+    def __init__(self, store, mintLogin=True):
         ORMKeyValueObject.__init__(self, store)
         self.Store = store
         self.Accounts = AccountList(self, store)
         self._Tags = {}
+        # Date-ordered transactions per account ID, and all of them merged, built on demand.
+        self._SortedTransactions = {}
+        self._MergedTransactions = None
+        # The (dates, amounts) balance series per (account ID, currency), built on demand.
+        self._BalanceSeries = {}
+        # Per-period totals, built on demand and then kept up to date as transactions change.
+        self._PeriodTotals = None
 
         # Handle Mint integration, but send the message in the main thread, otherwise, dead.
-        if self.MintEnabled:
+        # Without a GUI, such as when rendering charts, there's no main thread to log in for.
+        if self.MintEnabled and mintLogin:
             delayedresult.startWorker(lambda result: Publisher.sendMessage("mint.updated"), Mint.LoginFromKeyring, wkwargs={"notify": False})
 
         Publisher.subscribe(self.onGlobalCurrencyChanged, "user.global_currency_changed")
@@ -50,6 +61,14 @@ class BankModel(ORMKeyValueObject):
         Publisher.subscribe(self.onAccountChanged, "view.account changed")
         Publisher.subscribe(self.onTransactionTagged, "transaction.tagged")
         Publisher.subscribe(self.onTransactionUntagged, "transaction.untagged")
+        Publisher.subscribe(self.onTransactionCreated, "transaction.created")
+        Publisher.subscribe(self.onTransactionsCreated, "transactions.created")
+        Publisher.subscribe(self.onTransactionsRemoved, "transactions.removed")
+        Publisher.subscribe(self.onTransactionDateChanged, "ormobject.updated.Transaction.Date")
+        Publisher.subscribe(self.onTransactionAmountChanged, "ormobject.updated.Transaction.Amount")
+        Publisher.subscribe(self.onCurrencyChanged, "currency_changed")
+        Publisher.subscribe(self.onAccountRemoved, "account.removed")
+        Publisher.subscribe(self.onAccountRenamed, "ormobject.updated.Account.Name")
         
     def GetLastAccount(self):
         return self.Accounts.GetById(self.LastAccountId)
@@ -60,25 +79,124 @@ class BankModel(ORMKeyValueObject):
     def GetRecurringTransactions(self):
         return self.Accounts.GetRecurringTransactions()
 
+    def GetDueRecurringTransactions(self):
+        """Return a list of (recurring, dates) for each recurring transaction with due dates."""
+        due = []
+        for recurring in self.GetRecurringTransactions():
+            dates = recurring.GetUntransactedDates()
+            if dates:
+                due.append((recurring, dates))
+        return due
+
+    def PerformRecurringTransactions(self, due=None):
+        """
+        Enter the transactions for each (recurring, dates) in due, or for all due recurring
+        transactions if due is None. Transactions are added per account in one batch, so each
+        account involved is stored, balanced and notified once rather than once per date.
+        """
+        if due is None:
+            due = self.GetDueRecurringTransactions()
+
+        # Group the new transactions (and any transfer sources) by the account they go into.
+        groups = []
+        for recurring, dates in due:
+            transactions = recurring.MakeTransactions(dates)
+            sources = [recurring.Source] * len(transactions)
+            for account, accountTransactions, accountSources in groups:
+                if account is recurring.Parent:
+                    accountTransactions.extend(transactions)
+                    accountSources.extend(sources)
+                    break
+            else:
+                groups.append((recurring.Parent, transactions, sources))
+
+        Publisher.sendMessage("batch.start")
+        for account, transactions, sources in groups:
+            account.AddTransactions(transactions, sources)
+        today = datetime.date.today()
+        for recurring, dates in due:
+            recurring.LastTransacted = today
+        Publisher.sendMessage("batch.end")
+
     def GetTransactions(self):
-        transactions = []
-        for account in self.Accounts:
-            transactions.extend(account.Transactions)
+        """Return a new list of the transactions in all accounts, sorted by date."""
+        return list(self._getSortedTransactions())
+
+    def _getSortedTransactions(self, account=None):
+        """
+        Return the cached, date-ordered list of transactions in the account, or in all accounts
+        if account is None. This list is shared so callers must not modify it. It is only rebuilt
+        after a create, remove or date change, and then only the affected account is re-sorted.
+        """
+        if account is not None:
+            transactions = self._SortedTransactions.get(account.ID)
+            if transactions is None:
+                transactions = sorted(account.Transactions)
+                self._SortedTransactions[account.ID] = transactions
+            return transactions
 
-        return transactions
+        if self._MergedTransactions is None:
+            merged = []
+            for account in self.Accounts:
+                merged.extend(self._getSortedTransactions(account))
+            # Each account is already a sorted run, which the sort merges in close to linear time.
+            merged.sort()
+            self._MergedTransactions = merged
+        return self._MergedTransactions
+
+    def _invalidateTransactions(self, account):
+        # The CSV import preview sends the same messages for its container, which isn't an account.
+        self._SortedTransactions.pop(getattr(account, "ID", None), None)
+        self._MergedTransactions = None
+        self._invalidateBalanceSeries(account)
+
+    def _invalidateBalanceSeries(self, account):
+        # The series of all accounts includes this account's transactions too.
+        accountID = getattr(account, "ID", None)
+        for key in self._BalanceSeries.keys():
+            if key[0] in (accountID, None):
+                del self._BalanceSeries[key]
     
     def GetDateRange(self):
         """Get the date of the first and last transaction."""
-        transactions = self.GetTransactions()
+        transactions = self._getSortedTransactions()
         
         # If there are no transactions, let's go with today.
         if not transactions:
             return datetime.date.today(), datetime.date.today()
         else:
-            # Sorting transactions is very important, otherwise the first and last dates are arbitrary!
-            transactions.sort()
             return transactions[0].Date, transactions[-1].Date
 
+    def GetAmounts(self, transactions, currency=None, dated=False):
+        """
+        Return the amounts of the transactions, converted to the currency if one is given.
+        This uses the latest rates, so the amounts add up to the converted balances. If dated
+        is True each amount is converted at the rate on its date instead; each account's
+        amounts are then converted together in date order, finding the rates in one pass.
+        """
+        amounts = [t.Amount for t in transactions]
+        if not currency:
+            return amounts
+
+        indexesByAccount = {}
+        for i, t in enumerate(transactions):
+            indexesByAccount.setdefault(t.Parent, []).append(i)
+
+        converter = CurrencyConverter.GetShared()
+        destination = GetCurrencyNick(currency)
+        for account, indexes in indexesByAccount.items():
+            original = account.GetCurrency().GetCurrencyNick()
+            if dated:
+                # These are usually already in date order, in which case this sort is linear.
+                indexes.sort(key=lambda i: transactions[i].Date)
+                dates = [transactions[i].Date for i in indexes]
+                converted = converter.ConvertSeries([amounts[i] for i in indexes], dates, original, destination)
+            else:
+                converted = converter.ConvertMany([amounts[i] for i in indexes], original, destination)
+            for i, amount in zip(indexes, converted):
+                amounts[i] = amount
+        return amounts
+
     def GetXTotals(self, account=None, daterange=None):
         """
         Get totals every so many days, optionally within a specific account
@@ -86,15 +204,15 @@ class BankModel(ORMKeyValueObject):
         graph a summary of account balances.
         """
         if account is None:
-            transactions = self.GetTransactions()
+            transactions = self._getSortedTransactions()
             currency = self.GlobalCurrency
         else:
-            transactions = account.Transactions[:]
+            transactions = self._getSortedTransactions(account)
             currency = GetCurrencyInt(account.GetCurrency())
-        transactions.sort()
         
         if transactions == []:
             return []
+        amounts = self.GetAmounts(transactions, currency)
         
         startingBalance = 0.0
         # Crop transactions around the date range, if supplied.
@@ -109,9 +227,10 @@ class BankModel(ORMKeyValueObject):
                 if t.Date > endDate:
                     endi = i
                     break
-                total += t.GetAmount(currency)
+                total += amounts[i]
                 
             transactions = transactions[starti:endi]
+            amounts = amounts[starti:endi]
         else:
             # Figure out the actual start and end dates we end up with.
             startDate, endDate = transactions[0].Date, transactions[-1].Date
@@ -131,19 +250,81 @@ class BankModel(ORMKeyValueObject):
         balance = startingBalance
         while currDate <= endDate:
             while tindex < len(transactions) and transactions[tindex].Date <= currDate:
-                balance += transactions[tindex].GetAmount(currency)
+                balance += amounts[tindex]
                 tindex += 1
             totals.append([currDate, balance])
             currDate += onedaydelta
 
         return totals
 
+    def GetBalanceSeries(self, account=None):
+        """
+        Return the (dates, amounts) of the transactions of an account, or all accounts for None,
+        in order, as date ordinals and amounts in its currency. The account may also be a list of
+        accounts, in which case a list of the series of each is returned. These are plain lists,
+        so sampleTotals can sample them away from the model, such as in a worker thread.
+        Each series is kept until its transactions or currency change, so it is shared and
+        callers must not modify it.
+        """
+        many = isinstance(account, (list, tuple))
+        if many:
+            accounts = account
+        else:
+            accounts = [account]
+
+        series = []
+        for account in accounts:
+            if account is None:
+                accountID, currency = None, self.GlobalCurrency
+            else:
+                accountID, currency = account.ID, GetCurrencyInt(account.GetCurrency())
+            key = (accountID, currency)
+            if key not in self._BalanceSeries:
+                transactions = self._getSortedTransactions(account)
+                dates = [t.Date.toordinal() for t in transactions]
+                self._BalanceSeries[key] = (dates, self.GetAmounts(transactions, currency))
+            series.append(self._BalanceSeries[key])
+
+        if not many:
+            return series[0]
+        return series
+
+    def GetSampledTotals(self, numPoints, account=None, daterange=None, extremes=False):
+        """
+        Get the balance at numPoints evenly spaced dates, as (points, startDate, daysPerPoint).
+        This is what BasePlot.getPoints returns for GetXTotals with the same arguments, without
+        generating a total for every day. The account may also be a list of accounts, in which
+        case points is a list of the points of each, sampled at the same dates.
+        
+        If extremes is True, each pair of points is instead the lowest and highest balance in
+        that time, in order, so that short spikes still show up; see sampleBalanceExtremes.
+        """
+        return sampleTotals(self.GetBalanceSeries(account), numPoints, daterange, extremes)
+
     def CreateAccount(self, accountName):
         return self.Accounts.Create(accountName)
 
     def RemoveAccount(self, accountName):
         return self.Accounts.Remove(accountName)
 
+    def GetForecastTotals(self, account=None, years=5):
+        """
+        Get the projected balance for each day from today until some years from now,
+        of a specific account or all of them, including all future recurring transactions.
+        This is only available from the model for now; no chart shows it yet.
+        """
+        if account is None:
+            accounts, currency = self.Accounts, self.GlobalCurrency
+        else:
+            accounts, currency = [account], None
+        return ForecastAnalyzer(years).GetTotals(accounts, currency)
+
+    def GetPeriodTotals(self):
+        """Return the PeriodTotals of all the transactions, for weekly, monthly, quarterly and yearly reports."""
+        if self._PeriodTotals is None:
+            self._PeriodTotals = PeriodTotals(self)
+        return self._PeriodTotals
+
     def Search(self, searchString, account=None, matchIndex=1):
         """
         matchIndex: 0: Amount, 1: Description, 2: Date
@@ -152,7 +333,7 @@ class BankModel(ORMKeyValueObject):
         """
         # Handle account options.
         if account is None:
-            potentials = self.GetTransactions()
+            potentials = self._getSortedTransactions()
         else:
             potentials = account.Transactions[:]
 
@@ -172,7 +353,7 @@ class BankModel(ORMKeyValueObject):
         Handle representing floats as strings for non
         account-specific amounts, such as totals.
         """
-        currency = currencies.CurrencyList[self.GlobalCurrency]()
+        currency = currencies.GetCurrency(self.GlobalCurrency)
         return currency.float2str(*args, **kwargs)
 
     def setGlobalCurrency(self, currencyIndex):
@@ -214,6 +395,39 @@ class BankModel(ORMKeyValueObject):
             if self._Tags[tag] == 0:
                 self._Tags.pop(tag)
                 
+    def onTransactionCreated(self, message):
+        account, transaction = message.data
+        self._invalidateTransactions(account)
+
+    def onTransactionsCreated(self, message):
+        account, transactions = message.data
+        self._invalidateTransactions(account)
+
+    def onTransactionsRemoved(self, message):
+        account, transactions = message.data
+        self._invalidateTransactions(account)
+
+    def onTransactionDateChanged(self, message):
+        transaction = message.data
+        if transaction.Parent is not None:
+            self._invalidateTransactions(transaction.Parent)
+
+    def onTransactionAmountChanged(self, message):
+        transaction = message.data
+        if transaction.Parent is not None:
+            self._invalidateBalanceSeries(transaction.Parent)
+
+    def onCurrencyChanged(self, message):
+        self._BalanceSeries.clear()
+
+    def onAccountRemoved(self, message):
+        account = message.data
+        self._invalidateTransactions(account)
+                
+    def onAccountRenamed(self, message):
+        # Transfers mention the name of the other account in their description.
+        Transaction.InvalidateDescriptions()
+
     def onMintToggled(self, message):
         enabled = message.data
         self.MintEnabled = enabled
@@ -233,6 +447,9 @@ class BankModel(ORMKeyValueObject):
                 print t
                 
     def GetTags(self):
+        # Transactions parse their tags lazily, so make sure they all have before counting.
+        for transaction in self._getSortedTransactions():
+            transaction.Tags
         return set(self._Tags.keys())
 
     Balance = property(GetBalance)
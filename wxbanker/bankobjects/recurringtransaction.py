@@ -19,7 +19,7 @@
 #    along with wxBanker.  If not, see <http://www.gnu.org/licenses/>.
 
 from wxbanker import localization
-import datetime, functools, gettext
+import datetime, functools, gettext, weakref
 from dateutil import rrule
 
 from wxbanker import helpers
@@ -47,6 +47,9 @@ class RecurringTransaction(Transaction, ORMObject):
             repeatOn = [int(i==todaydaynumber) for i in range(7)]
         
         self.IsFrozen = True
+        # Transactions with this as their RecurringParent, maintained by Transaction.SetRecurringParent.
+        self._Children = weakref.WeakKeyDictionary()
+        self._RRule = self._RRuleKey = None
         self.RepeatType = repeatType
         self.RepeatEvery = repeatEvery
         self.RepeatOn = repeatOn
@@ -59,17 +62,30 @@ class RecurringTransaction(Transaction, ORMObject):
         return self.RepeatType == self.WEEKLY
         
     def PerformTransactions(self):
-        for date in self.GetUntransactedDates():
-            result = self.Parent.AddTransaction(self.Amount, self.Description, date, self.Source)
-            if isinstance(result, Transaction):
-                result = (result,)
-            for transaction in result:
-                transaction.RecurringParent = self
-        
+        """Enter all the due transactions at once."""
+        transactions = self.MakeTransactions(self.GetUntransactedDates())
+        self.Parent.AddTransactions(transactions, [self.Source] * len(transactions))
         self.LastTransacted = datetime.date.today()
+
+    def MakeTransactions(self, dates):
+        """Create (but don't add) the child transactions for the given dates."""
+        transactions = []
+        for date in dates:
+            transaction = Transaction(None, self.Parent, self.Amount, self.Description, date)
+            transaction.RecurringParent = self
+            transactions.append(transaction)
+        return transactions
         
     def GetRRule(self):
-        """Generate the dateutils.rrule for this recurring transaction."""
+        """Generate the dateutils.rrule for this recurring transaction, re-using it while the rule is unchanged."""
+        repeatOn = self.RepeatOn and tuple(self.RepeatOn)
+        key = (self.RepeatType, self.RepeatEvery, repeatOn, self.Date)
+        if self._RRuleKey != key:
+            self._RRule = self._makeRRule()
+            self._RRuleKey = key
+        return self._RRule
+
+    def _makeRRule(self):
         # Create some mapping lists.
         rruleDays = [rrule.MO, rrule.TU, rrule.WE, rrule.TH, rrule.FR, rrule.SA, rrule.SU]
         rruleTypes = [rrule.DAILY, rrule.WEEKLY, rrule.MONTHLY, rrule.YEARLY]
@@ -201,9 +217,10 @@ class RecurringTransaction(Transaction, ORMObject):
         return self.GetStringBase() + self.GetRecurrance()
     
     def GetChildren(self):
-        for transaction in self.Parent.Transactions:
-            if transaction.RecurringParent == self:
-                yield transaction
+        # The children are only indexed as the account's transactions load, so make sure they have.
+        self.Parent.Transactions
+        # Linked transactions in the source account share this RecurringParent, but aren't children.
+        return sorted(t for t in self._Children if t.Parent is self.Parent)
         
     def __eq__(self, other):
         if other is None:
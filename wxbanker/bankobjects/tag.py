@@ -18,6 +18,8 @@
 #    You should have received a copy of the GNU General Public License
 #    along with wxBanker.  If not, see <http://www.gnu.org/licenses/>.
 
+import weakref
+
 from wxbanker.lib.pubsub import Publisher
 from wxbanker import bankexceptions
 
@@ -51,4 +53,25 @@ class Tag(object):
         return cmp(self.Name, other.Name)
     
     def __hash__(self):
-        return hash(self.Name)
\ No newline at end of file
+        return hash(self.Name)
+
+
+class TagRegistry:
+    """
+    Interns Tag objects so that each tag name maps to one shared instance,
+    instead of every transaction holding its own copy of the same tag.
+    """
+    # Weak so that tags which are no longer used by any transaction can go away.
+    _Tags = weakref.WeakValueDictionary()
+
+    @classmethod
+    def Get(cls, tagName):
+        """Return the shared Tag for this name, creating it if needed."""
+        if isinstance(tagName, Tag):
+            tagName = tagName.Name
+
+        tag = cls._Tags.get(tagName)
+        if tag is None:
+            tag = Tag(tagName)
+            cls._Tags[tagName] = tag
+        return tag
@@ -23,12 +23,62 @@ import datetime
 import re
 
 from wxbanker.bankobjects.ormobject import ORMObject
-from wxbanker.bankobjects.tag import Tag, EmptyTagException
+from wxbanker.bankobjects.tag import Tag, TagRegistry, EmptyTagException
 from wxbanker import debug
 
-from wxbanker.currencies import CurrencyList
+from wxbanker.currencies import GetCurrencyNick
 from wxbanker.currconvert import CurrencyConverter
 
+# The maximum number of years you can refer to in the future, using an abbreviation.
+# Ex: If it is 2008 and MAX_FUTURE_ABBR is 10, years 9-18 will become 2009-2018,
+# while 19-99 will become 1919-1999.
+MAX_FUTURE_ABBR = 10
+
+# Parsed date strings, since loading and importing see the same few dates over and over.
+_DateCache = {}
+
+def massageDate(date):
+    """
+    Takes a date and returns a valid datetime.date object.
+    `date` can be a datetime object, or a string. In the case of a string, valid separators are '-' and '/'.
+    Abbreviated years will be converted into the "intended" year: 86 => 1986, 08 => 2008.
+    """
+    if date is None:
+        return datetime.date.today()
+    if isinstance(date, datetime.datetime):
+        return date.date()
+    if isinstance(date, datetime.date):
+        return date
+    if not isinstance(date, basestring):
+        date = str(date)
+
+    try:
+        return _DateCache[date]
+    except KeyError:
+        pass
+
+    # The store and ISO formats are by far the most common, so handle them without splitting.
+    if len(date) == 10 and date[4] in "-/" and date[7] == date[4]:
+        result = datetime.date(int(date[:4]), int(date[5:7]), int(date[8:]))
+        _DateCache[date] = result
+        return result
+
+    year, m, d = [int(x) for x in date.replace('/', '-').split("-")]
+    if year < 100:
+        # Abbreviated years depend on the current year, so don't cache them.
+        currentYear = datetime.date.today().year
+        currentAbr = currentYear % 100
+        currentBase = currentYear / 100
+        if year <= currentAbr + MAX_FUTURE_ABBR: #allow the user to reasonably refer to future years
+            year += currentBase * 100
+        else:
+            year += (currentBase-1) * 100
+        return datetime.date(year, m, d)
+
+    result = datetime.date(year, m, d)
+    _DateCache[date] = result
+    return result
+
 class Transaction(ORMObject):
     """
     An object which represents a transaction.
@@ -38,19 +88,24 @@ class Transaction(ORMObject):
     """
     ORM_TABLE = "transactions"
     ORM_ATTRIBUTES = ["_Amount", "_Description", "_Date", "LinkedTransaction", "RecurringParent"]
+    # Bumped whenever an account is renamed, which makes every cached transfer description stale.
+    _DescriptionGeneration = 0
     
     def __init__(self, tID, parent, amount, description, date):
         ORMObject.__init__(self)
         self.IsFrozen = True
 
         self.ID = tID
+        # The (generation, description) of a transfer, see GetDescription.
+        self._DescriptionCache = None
         self.LinkedTransaction = None
         self.Parent = parent
         self.Date = date
-        self.Tags = set()
+        # Tags are parsed lazily from the description on first access, see GetTags.
+        self._Tags = None
         self.Description = description
         self.Amount = amount
-        self.RecurringParent = None
+        self._RecurringParent = None
 
         self.IsFrozen = False
 
@@ -66,33 +121,16 @@ class Transaction(ORMObject):
             self.LinkedTransaction.SetDate(date, fromLink=True)
 
     def _MassageDate(self, date):
-        """
-        Takes a date and returns a valid datetime.date object.
-        `date` can be a datetime object, or a string. In the case of a string, valid separators are '-' and '/'.
-        Abbreviated years will be converted into the "intended" year: 86 => 1986, 08 => 2008.
-        """
-        if date is None:
-            return datetime.date.today()
-        # The maximum number of years you can refer to in the future, using an abbreviation.
-        # Ex: If it is 2008 and MAX_FUTURE_ABBR is 10, years 9-18 will become 2009-2018,
-        # while 19-99 will become 1919-1999.
-        MAX_FUTURE_ABBR = 10
-        date = str(date) #if it is a datetime.date object, make it a Y-M-D string.
-        date = date.replace('/', '-') # '-' is our standard assumed separator
-        year, m, d = [int(x) for x in date.split("-")]
-        if year < 100:
-            currentYear = datetime.date.today().year
-            currentAbr = currentYear % 100
-            currentBase = currentYear / 100
-            if year <= currentAbr + MAX_FUTURE_ABBR: #allow the user to reasonably refer to future years
-                year += currentBase * 100
-            else:
-                year += (currentBase-1) * 100
-        return datetime.date(year, m, d)
+        return massageDate(date)
 
     def GetDescription(self):
         description = self._Description
         if self.LinkedTransaction:
+            # Transfer descriptions are cached until the description, amount or link changes, or an account is renamed.
+            cache = self._DescriptionCache
+            if cache is not None and cache[0] == Transaction._DescriptionGeneration:
+                return cache[1]
+            
             parentName = self.LinkedTransaction.Parent.Name
             if self.Amount > 0:
                 transferString = _("Transfer from %s") % parentName
@@ -103,34 +141,50 @@ class Transaction(ORMObject):
                 description = transferString + " (%s)"%description
             else:
                 description = transferString
+            self._DescriptionCache = (Transaction._DescriptionGeneration, description)
             
         return description
 
+    @classmethod
+    def InvalidateDescriptions(cls):
+        """Make all cached transfer descriptions stale, such as when an account is renamed."""
+        cls._DescriptionGeneration += 1
+
     def SetDescription(self, description, fromLink=False):
         """Update the description, ensuring it is a string."""
         description = unicode(description)
         self._Description = description
+        self._DescriptionCache = None
         # Update the linked transaction if one exists.
         if not fromLink and self.LinkedTransaction:
             self.LinkedTransaction.SetDescription(description, fromLink=True)
-            
-        # Parse/update tags.
+
+        # If the tags haven't been parsed yet there is nothing to update; they will be parsed when needed.
+        if self._Tags is None:
+            return
+
+        tags = self._ParseTags(description)
+        removedTags = self._Tags.difference(tags)
+        addedTags = tags.difference(self._Tags)
+        if removedTags:
+            self.TagsRemoved(removedTags)
+        if addedTags:
+            self.TagsAdded(addedTags)
+
+    def _ParseTags(self, description):
+        """Return the set of (interned) tags found in a description."""
         tags = set()
         for word in description.split(" "):
             if word.startswith("#"):
                 tagName = word[1:].lower()
                 try:
-                    tag = Tag(tagName)
+                    tag = TagRegistry.Get(tagName)
                 except EmptyTagException:
                     # This is not so good but, we can't argue with the description, it just isn't a tag.
                     continue
                 tags.add(tag)
-        
-        removedTags = self._Tags.difference(tags)
-        addedTags = tags.difference(self._Tags)
-        self.TagsRemoved(removedTags)
-        self.TagsAdded(addedTags)
-        
+        return tags
+
     def TagsAdded(self, tagNames):
         self.Tags.update(tagNames)
         Publisher.sendMessage("transaction.tagged", tagNames)
@@ -140,7 +194,7 @@ class Transaction(ORMObject):
         Publisher.sendMessage("transaction.untagged", tagNames)
         
     def AddTag(self, tagName):
-        tag = Tag(tagName)
+        tag = TagRegistry.Get(tagName)
         if tag not in self.Tags:
             self.Description = self._Description + " %s" % tag
     
@@ -150,23 +204,35 @@ class Transaction(ORMObject):
         self.Description = re.sub(pattern, "", self.Description)
                 
     def GetTags(self):
+        if self._Tags is None:
+            self._Tags = set()
+            tags = self._ParseTags(self._Description)
+            if tags:
+                self.TagsAdded(tags)
         return self._Tags
                 
     def SetTags(self, tagList):
         self._Tags = tagList
 
-    def GetAmount(self, currency=None):
+    def GetAmount(self, currency=None, dated=False):
+        """
+        Return the amount, converted to the currency if one is given. This uses the latest
+        rates like account balances do, unless dated is True to use the rates on this date.
+        """
         if currency:
-            conv = CurrencyConverter()
-            destCurrency = CurrencyList[currency]().GetCurrencyNick() 
+            conv = CurrencyConverter.GetShared()
+            destCurrency = GetCurrencyNick(currency)
             srcCurrency = self.Parent.GetCurrency().GetCurrencyNick()
-            return conv.Convert(self._Amount, srcCurrency, destCurrency)
+            date = self.Date if dated else None
+            return conv.Convert(self._Amount, srcCurrency, destCurrency, date)
         return self._Amount
 
     def SetAmount(self, amount, fromLink=False):
         """Update the amount, ensuring it is a float."""
         amount = float(amount)
         self._Amount = amount
+        # The direction of a transfer depends on the sign of the amount.
+        self._DescriptionCache = None
         
         # Update the linked transaction if one exists.
         if not fromLink and self.LinkedTransaction:
@@ -177,6 +243,18 @@ class Transaction(ORMObject):
 
     def SetLinkedTransaction(self, transaction):
         self._LinkedTransaction = transaction
+        self._DescriptionCache = None
+
+    def GetRecurringParent(self):
+        return self._RecurringParent
+
+    def SetRecurringParent(self, recurring):
+        # Keep the index of children on the recurring transactions up to date.
+        if self._RecurringParent is not None:
+            self._RecurringParent._Children.pop(self, None)
+        if recurring is not None:
+            recurring._Children[self] = True
+        self._RecurringParent = recurring
 
     def GetLinkedTransactionID(self):
         """
@@ -220,4 +298,5 @@ class Transaction(ORMObject):
     Description = property(GetDescription, SetDescription)
     Amount = property(GetAmount, SetAmount)
     LinkedTransaction = property(GetLinkedTransaction, SetLinkedTransaction)
+    RecurringParent = property(GetRecurringParent, SetRecurringParent)
     Tags = property(GetTags, SetTags)
@@ -34,7 +34,13 @@ __version__ = 1.1
 import cairo
 import math
 import random
-from series import Series, Group, Data
+from series import Series, Group, Data, ArraySeries
+
+# Only needed to plot an ArraySeries, which can't be made without it.
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 HORZ = 0
 VERT = 1
@@ -175,7 +181,7 @@ class Plot(object):
         if callable(data) or type(data) is list and callable(data[0]): # Lambda or List of lambdas
             self.series = data
             self.series_labels = None
-        elif isinstance(data, Series): # Instance of Series
+        elif isinstance(data, (Series, ArraySeries)): # Instance of Series
             self.series = data
             self.series_labels = data.get_names()
         else: # Anything else
@@ -342,6 +348,13 @@ class ScatterPlot( Plot ):
     def load_series(self, data, x_labels = None, y_labels = None, series_colors=None):
         #TODO: In cairoplot 2.0 keep only the Series instances
 
+        # Arrays of plain (x, y) points need no conversion
+        if isinstance(data, ArraySeries):
+            Plot.load_series(self, data, x_labels, y_labels, series_colors)
+            self.calc_boundaries()
+            self.calc_labels()
+            return
+
         # Convert Data and Group to Series
         if isinstance(data, Data) or isinstance(data, Group):
             data = Series(data)
@@ -422,7 +435,16 @@ class ScatterPlot( Plot ):
         min_data_value = [0,0,0]
         max_data_value = [0,0,0]
         
-        for group in self.series:
+        if isinstance(self.series, ArraySeries):
+            for points in self.series.get_points():
+                if len(points):
+                    min_data_value[:2] = numpy.minimum(min_data_value[:2], points.min(axis=0)).tolist()
+                    max_data_value[:2] = numpy.maximum(max_data_value[:2], points.max(axis=0)).tolist()
+            groups = []
+        else:
+            groups = self.series
+        
+        for group in groups:
             if type(group[0].content) in (int, float, long):
                 group = [Data((index, item.content)) for index,item in enumerate(group)]
             
@@ -629,11 +651,15 @@ class ScatterPlot( Plot ):
         radius = self.dots
         x0 = self.borders[HORZ] - self.bounds[HORZ][0]*self.horizontal_step
         y0 = self.borders[VERT] - self.bounds[VERT][0]*self.vertical_step
-        for index, group in enumerate(self.series):
+        if isinstance(self.series, ArraySeries):
+            groups = [points.tolist() for points in self.series.get_points()]
+        else:
+            groups = [[data.content for data in group] for group in self.series]
+        for index, group in enumerate(groups):
             cr.set_source_rgba(*self.series_colors[index][:4])
-            for number, data in enumerate(group):
-                x = x0 + self.horizontal_step * data.content[0]
-                y = self.dimensions[VERT] - y0 - self.vertical_step * data.content[1]
+            for number, point in enumerate(group):
+                x = x0 + self.horizontal_step * point[0]
+                y = self.dimensions[VERT] - y0 - self.vertical_step * point[1]
                 if self.errors[HORZ]:
                     cr.move_to(x, y)
                     x1 = x - self.horizontal_step * self.errors[HORZ][0][number]
@@ -664,7 +690,37 @@ class ScatterPlot( Plot ):
                     cr.stroke()
                 
                 
+    def render_array_plot(self):
+        #Same as render_plot, but the positions of each group are computed all at once
+        cr = self.context
+        cr.rectangle(self.borders[HORZ], self.borders[VERT], self.plot_width, self.plot_height)
+        cr.clip()
+        x0 = self.borders[HORZ] - self.bounds[HORZ][0]*self.horizontal_step
+        y0 = self.borders[VERT] - self.bounds[VERT][0]*self.vertical_step
+        for number, points in enumerate(self.series.get_points()):
+            cr.set_source_rgba(*self.series_colors[number][:4])
+            xs = (x0 + self.horizontal_step*points[:,0]).tolist()
+            ys = (self.dimensions[VERT] - y0 - self.vertical_step*points[:,1]).tolist()
+            if self.discrete or self.dots:
+                for x, y in zip(xs, ys):
+                    cr.arc(x, y, self.dots, 0, 2*math.pi)
+                    cr.fill()
+            if self.discrete or len(xs) < 2:
+                continue
+            # One path for the whole line, rather than a stroke per segment
+            cr.move_to(xs[0], ys[0])
+            for x, y in zip(xs[1:], ys[1:]):
+                cr.line_to(x, y)
+            cr.set_line_width(self.series_widths[number])
+            if self.dash and self.dash[number]:
+                s = self.series_widths[number]
+                cr.set_dash([s*3, s*3], 0)
+            cr.stroke()
+            cr.set_dash([])
+
     def render_plot(self):
+        if isinstance(self.series, ArraySeries):
+            return self.render_array_plot()
         cr = self.context
         if self.discrete:
             cr.rectangle(self.borders[HORZ], self.borders[VERT], self.plot_width, self.plot_height)
@@ -924,6 +980,12 @@ class BarPlot(Plot):
         Plot.load_series(self, data, x_labels, y_labels, series_colors)
         self.calc_boundaries()
         
+    def group_values(self, group):
+        #The numbers of a group, which is already an array in an ArraySeries
+        if isinstance(group, Group):
+            return group.to_list()
+        return group.tolist()
+        
     def process_colors(self, series_colors):
         #Data for a BarPlot might be a List or a List of Lists.
         #On the first case, colors must be generated for all bars,
@@ -943,10 +1005,10 @@ class BarPlot(Plot):
         if not self.bounds[self.main_dir]:
             min_data_value = 0
             if self.stack:
-                max_data_value = max(sum(group.to_list()) for group in self.series)
+                max_data_value = max(sum(self.group_values(group)) for group in self.series)
             else:
-                max_data_value = max(max(group.to_list()) for group in self.series)
-                min_data_value = min(min(group.to_list()) for group in self.series)
+                max_data_value = max(max(self.group_values(group)) for group in self.series)
+                min_data_value = min(min(self.group_values(group)) for group in self.series)
             self.bounds[self.main_dir] = (min(0, min_data_value), max_data_value)
         if not self.bounds[other_direction(self.main_dir)]:
             self.bounds[other_direction(self.main_dir)] = (0, len(self.series))
@@ -973,9 +1035,9 @@ class BarPlot(Plot):
         self.value_label = 0
         if self.display_values:
             if self.stack:
-                self.value_label = self.context.text_extents(str(max(sum(group.to_list()) for group in self.series)))[2 + self.main_dir]
+                self.value_label = self.context.text_extents(str(max(sum(self.group_values(group)) for group in self.series)))[2 + self.main_dir]
             else:
-                self.value_label = self.context.text_extents(str(max(max(group.to_list()) for group in self.series)))[2 + self.main_dir]
+                self.value_label = self.context.text_extents(str(max(max(self.group_values(group)) for group in self.series)))[2 + self.main_dir]
         if self.labels[self.main_dir]:
             self.plot_dimensions[self.main_dir] = self.dimensions[self.main_dir] - 2*self.borders[self.main_dir] - self.value_label
         else:
@@ -1227,7 +1289,7 @@ class HorizontalBarPlot(BarPlot):
         self.context.set_font_size(self.font_size * 0.8)
         if self.stack:
             for i,group in enumerate(self.series):
-                value = sum(group.to_list())
+                value = sum(self.group_values(group))
                 height = self.context.text_extents(str(value))[3]
                 x = self.borders[HORZ] + value*self.steps[HORZ] + 2
                 y = self.borders[VERT] + (i+0.5)*self.steps[VERT] + (i+1)*self.space + height/2
@@ -1237,10 +1299,10 @@ class HorizontalBarPlot(BarPlot):
             for i,group in enumerate(self.series):
                 inner_step = self.steps[VERT]/len(group)
                 y0 = self.border + i*self.steps[VERT] + (i+1)*self.space
-                for number,data in enumerate(group):
-                    height = self.context.text_extents(str(data.content))[3]
-                    self.context.move_to(self.borders[HORZ] + data.content*self.steps[HORZ] + 2, y0 + 0.5*inner_step + height/2, )
-                    self.context.show_text(str(data.content))
+                for number,value in enumerate(self.group_values(group)):
+                    height = self.context.text_extents(str(value))[3]
+                    self.context.move_to(self.borders[HORZ] + value*self.steps[HORZ] + 2, y0 + 0.5*inner_step + height/2, )
+                    self.context.show_text(str(value))
                     y0 += inner_step
 
     def render_plot(self):
@@ -1248,9 +1310,9 @@ class HorizontalBarPlot(BarPlot):
             for i,group in enumerate(self.series):
                 x0 = self.borders[HORZ]
                 y0 = self.borders[VERT] + i*self.steps[VERT] + (i+1)*self.space
-                for number,data in enumerate(group):
+                for number,value in enumerate(self.group_values(group)):
                     if self.series_colors[number][4] in ('radial','linear') :
-                        linear = cairo.LinearGradient( data.content*self.steps[HORZ]/2, y0, data.content*self.steps[HORZ]/2, y0 + self.steps[VERT] )
+                        linear = cairo.LinearGradient( value*self.steps[HORZ]/2, y0, value*self.steps[HORZ]/2, y0 + self.steps[VERT] )
                         color = self.series_colors[number]
                         linear.add_color_stop_rgba(0.0, 3.5*color[0]/5.0, 3.5*color[1]/5.0, 3.5*color[2]/5.0,1.0)
                         linear.add_color_stop_rgba(1.0, *color[:4])
@@ -1258,28 +1320,28 @@ class HorizontalBarPlot(BarPlot):
                     elif self.series_colors[number][4] == 'solid':
                         self.context.set_source_rgba(*self.series_colors[number][:4])
                     if self.rounded_corners:
-                        self.draw_rectangle(number, len(group), x0, y0, x0+data.content*self.steps[HORZ], y0+self.steps[VERT])
+                        self.draw_rectangle(number, len(group), x0, y0, x0+value*self.steps[HORZ], y0+self.steps[VERT])
                         self.context.fill()
                     else:
-                        self.context.rectangle(x0, y0, data.content*self.steps[HORZ], self.steps[VERT])
+                        self.context.rectangle(x0, y0, value*self.steps[HORZ], self.steps[VERT])
                         self.context.fill()
-                    x0 += data.content*self.steps[HORZ]
+                    x0 += value*self.steps[HORZ]
         else:
             for i,group in enumerate(self.series):
                 inner_step = self.steps[VERT]/len(group)
                 x0 = self.borders[HORZ]
                 y0 = self.border + i*self.steps[VERT] + (i+1)*self.space
-                for number,data in enumerate(group):
-                    linear = cairo.LinearGradient(data.content*self.steps[HORZ]/2, y0, data.content*self.steps[HORZ]/2, y0 + inner_step)
+                for number,value in enumerate(self.group_values(group)):
+                    linear = cairo.LinearGradient(value*self.steps[HORZ]/2, y0, value*self.steps[HORZ]/2, y0 + inner_step)
                     color = self.series_colors[number]
                     linear.add_color_stop_rgba(0.0, 3.5*color[0]/5.0, 3.5*color[1]/5.0, 3.5*color[2]/5.0,1.0)
                     linear.add_color_stop_rgba(1.0, *color[:4])
                     self.context.set_source(linear)
-                    if self.rounded_corners and data.content != 0:
-                        BarPlot.draw_round_rectangle(self,x0, y0, x0 + data.content*self.steps[HORZ], y0 + inner_step)
+                    if self.rounded_corners and value != 0:
+                        BarPlot.draw_round_rectangle(self,x0, y0, x0 + value*self.steps[HORZ], y0 + inner_step)
                         self.context.fill()
                     else:
-                        self.context.rectangle(x0, y0, data.content*self.steps[HORZ], inner_step)
+                        self.context.rectangle(x0, y0, value*self.steps[HORZ], inner_step)
                         self.context.fill()
                     y0 += inner_step
     
@@ -1405,7 +1467,7 @@ class VerticalBarPlot(BarPlot):
         self.context.set_font_size(self.font_size * 0.8)
         if self.stack:
             for i,group in enumerate(self.series):
-                value = sum(group.to_list())
+                value = sum(self.group_values(group))
                 strvalue = self.value_formatter(value)
                 width = self.context.text_extents(strvalue)[2]
                 x = self.borders[HORZ] + (i+0.5)*self.steps[HORZ] + (i+1)*self.space - width/2
@@ -1416,13 +1478,13 @@ class VerticalBarPlot(BarPlot):
             for i,group in enumerate(self.series):
                 inner_step = self.steps[HORZ]/len(group)
                 x0 = self.borders[HORZ] + i*self.steps[HORZ] + (i+1)*self.space
-                for number,data in enumerate(group):
-                    strvalue = self.value_formatter(data.content)
+                for number,value in enumerate(self.group_values(group)):
+                    strvalue = self.value_formatter(value)
                     width = self.context.text_extents(strvalue)[2]
                     negative_value_correction = 0
-                    if data.content < 0:
+                    if value < 0:
                         negative_value_correction = 6 + self.steps[VERT]
-                    self.context.move_to(x0 + 0.5*inner_step - width/2, self.plot_top - data.content*self.steps[VERT] - 2 + negative_value_correction)
+                    self.context.move_to(x0 + 0.5*inner_step - width/2, self.plot_top - value*self.steps[VERT] - 2 + negative_value_correction)
                     self.context.show_text(strvalue)
                     x0 += inner_step
 
@@ -1431,9 +1493,9 @@ class VerticalBarPlot(BarPlot):
             for i,group in enumerate(self.series):
                 x0 = self.borders[HORZ] + i*self.steps[HORZ] + (i+1)*self.space
                 y0 = 0
-                for number,data in enumerate(group):
+                for number,value in enumerate(self.group_values(group)):
                     if self.series_colors[number][4] in ('linear','radial'):
-                        linear = cairo.LinearGradient( x0, data.content*self.steps[VERT]/2, x0 + self.steps[HORZ], data.content*self.steps[VERT]/2 )
+                        linear = cairo.LinearGradient( x0, value*self.steps[VERT]/2, x0 + self.steps[HORZ], value*self.steps[VERT]/2 )
                         color = self.series_colors[number]
                         linear.add_color_stop_rgba(0.0, 3.5*color[0]/5.0, 3.5*color[1]/5.0, 3.5*color[2]/5.0,1.0)
                         linear.add_color_stop_rgba(1.0, *color[:4])
@@ -1441,38 +1503,38 @@ class VerticalBarPlot(BarPlot):
                     elif self.series_colors[number][4] == 'solid':
                         self.context.set_source_rgba(*self.series_colors[number][:4])
                     if self.rounded_corners:
-                        self.draw_rectangle(number, len(group), x0, self.plot_top - y0 - data.content*self.steps[VERT], x0 + self.steps[HORZ], self.plot_top - y0)
+                        self.draw_rectangle(number, len(group), x0, self.plot_top - y0 - value*self.steps[VERT], x0 + self.steps[HORZ], self.plot_top - y0)
                         self.context.fill()
                     else:
-                        self.context.rectangle(x0, self.plot_top - y0 - data.content*self.steps[VERT], self.steps[HORZ], data.content*self.steps[VERT])
+                        self.context.rectangle(x0, self.plot_top - y0 - value*self.steps[VERT], self.steps[HORZ], value*self.steps[VERT])
                         self.context.fill()
-                    y0 += data.content*self.steps[VERT]
+                    y0 += value*self.steps[VERT]
         else:
             for i,group in enumerate(self.series):
                 inner_step = self.steps[HORZ]/len(group)
                 y0 = self.borders[VERT]
                 x0 = self.borders[HORZ] + i*self.steps[HORZ] + (i+1)*self.space
-                for number,data in enumerate(group):
+                for number,value in enumerate(self.group_values(group)):
                     if self.series_colors[number][4] == 'linear':
-                        linear = cairo.LinearGradient( x0, data.content*self.steps[VERT]/2, x0 + inner_step, data.content*self.steps[VERT]/2 )
+                        linear = cairo.LinearGradient( x0, value*self.steps[VERT]/2, x0 + inner_step, value*self.steps[VERT]/2 )
                         color = self.series_colors[number]
                         linear.add_color_stop_rgba(0.0, 3.5*color[0]/5.0, 3.5*color[1]/5.0, 3.5*color[2]/5.0,1.0)
                         linear.add_color_stop_rgba(1.0, *color[:4])
                         self.context.set_source(linear)
                     elif self.series_colors[number][4] == 'solid':
                         self.context.set_source_rgba(*self.series_colors[number][:4])
-                    if self.rounded_corners and data.content != 0:
-                        BarPlot.draw_round_rectangle(self, x0, self.plot_top - data.content*self.steps[VERT], x0+inner_step, self.plot_top)
+                    if self.rounded_corners and value != 0:
+                        BarPlot.draw_round_rectangle(self, x0, self.plot_top - value*self.steps[VERT], x0+inner_step, self.plot_top)
                         self.context.fill()
                     elif self.three_dimension:
-                        self.draw_3d_rectangle_front(x0, self.plot_top - data.content*self.steps[VERT], x0+inner_step, self.plot_top, 5)
+                        self.draw_3d_rectangle_front(x0, self.plot_top - value*self.steps[VERT], x0+inner_step, self.plot_top, 5)
                         self.context.fill()
-                        self.draw_3d_rectangle_side(x0, self.plot_top - data.content*self.steps[VERT], x0+inner_step, self.plot_top, 5)
+                        self.draw_3d_rectangle_side(x0, self.plot_top - value*self.steps[VERT], x0+inner_step, self.plot_top, 5)
                         self.context.fill()
-                        self.draw_3d_rectangle_top(x0, self.plot_top - data.content*self.steps[VERT], x0+inner_step, self.plot_top, 5)
+                        self.draw_3d_rectangle_top(x0, self.plot_top - value*self.steps[VERT], x0+inner_step, self.plot_top, 5)
                         self.context.fill()
                     else:
-                        self.context.rectangle(x0, self.plot_top - data.content*self.steps[VERT], inner_step, data.content*self.steps[VERT])
+                        self.context.rectangle(x0, self.plot_top - value*self.steps[VERT], inner_step, value*self.steps[VERT])
                         self.context.fill()
                     
                     x0 += inner_step
@@ -27,6 +27,12 @@
 #import cairoplot
 import doctest
 
+# ArraySeries needs NumPy, the rest of this module does not.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 NUMTYPES = (int, float, long)
 LISTTYPES = (list, tuple)
 STRTYPES = (str, unicode)
@@ -1136,5 +1142,98 @@ class Series(object):
         return len(self.group_list)
     
 
+class ArraySeries(object):
+    '''
+        A Series of plain numbers kept as one NumPy array per group, instead of
+        a Group of Data objects per group. It is much cheaper to build and plot
+        for groups of thousands of points, since the plots compute bounds and
+        coordinates on whole arrays. It can receive:
+         - a list of numbers or points, converted to a single group;
+         - a list of lists of numbers or points, or of arrays, each converted
+           to a group;
+         - a Dictionary of groups, named by their keys, in sorted order like
+           Series.
+        Points are (x, y); a group of numbers is plotted against its indexes.
+        
+        Usage:
+        >>> print ArraySeries([1,2,3])
+        ["Group 1 ['1.0', '2.0', '3.0']"]
+        >>> print ArraySeries([[1,2],[3]])
+        ["Group 1 ['1.0', '2.0']", "Group 2 ['3.0']"]
+        >>> print ArraySeries({'g2':[(0,5),(1,6)], 'g1':[(0,1),(1,2)]})
+        ["g1 ['(0.0, 1.0)', '(1.0, 2.0)']", "g2 ['(0.0, 5.0)', '(1.0, 6.0)']"]
+    '''
+    def __init__(self, series, names=None):
+        if hasattr(series, "keys"):
+            names = sorted(series.keys())
+            groups = [series[name] for name in names]
+        elif len(series) and (type(series[0]) is list or isinstance(series[0], numpy.ndarray)):
+            groups = series
+        else:
+            groups = [series]
+        
+        self.group_list = [numpy.asarray(group, dtype=float) for group in groups]
+        if names is None:
+            names = ["Group %i" % (i+1) for i in range(len(self.group_list))]
+        self.names = list(names)
+        
+    def get_names(self):
+        '''
+            Returns a list of the names of all groups in the Series
+        '''
+        return self.names
+    
+    def get_points(self):
+        '''
+            Returns a list with an array of (x, y) points for each group, where
+            a group of numbers gets its indexes as x.
+            
+            Usage:
+            >>> ArraySeries([[5,6]]).get_points()[0].tolist()
+            [[0.0, 5.0], [1.0, 6.0]]
+        '''
+        points = []
+        for group in self.group_list:
+            if group.ndim == 1:
+                group = numpy.column_stack((numpy.arange(len(group), dtype=float), group))
+            points.append(group)
+        return points
+    
+    def to_list(self):
+        '''
+            Returns a list with the content of all groups, like Series.to_list
+            
+            Usage:
+            >>> ArraySeries([[(1,2),(3,4)],[5]]).to_list()
+            [1.0, 2.0, 3.0, 4.0, 5.0]
+        '''
+        big_list = []
+        for group in self.group_list:
+            big_list.extend(group.ravel().tolist())
+        return big_list
+    
+    def __getitem__(self, key):
+        '''
+            Makes the ArraySeries iterable, over the array of each group
+        '''
+        return self.group_list[key]
+    
+    def __str__(self):
+        '''
+            Returns a string that represents the ArraySeries, like a Series
+        '''
+        list_str = []
+        for name, group in zip(self.names, self.group_list):
+            items = [str(tuple(item)) if group.ndim > 1 else str(item) for item in group.tolist()]
+            list_str.append(name + " " + str(items))
+        return str(list_str)
+    
+    def __len__(self):
+        '''
+            Returns the number of groups
+        '''
+        return len(self.group_list)
+    
+
 if __name__ == '__main__':
     doctest.testmod()
@@ -1,7 +1,7 @@
 import cairo, math, sys
 
 import cairoplot
-from series import Series
+from series import Series, ArraySeries
 
 # non-random data for needs of visual comparison of changes
 if '--non-random' in sys.argv:
@@ -63,6 +63,12 @@ if test_scatter_plot:
     cairoplot.scatter_plot ( 'cross_r_exponential_series.png', data = data, errorx = [erx,erx], errory = [ery,ery], width = 800, height = 600, border = 20, 
                              axis = True, discrete = False, dots = 5, grid = True, 
                              x_title = "t", y_title = "f(t) g(t)", series_legend=True, series_colors = series_colors )
+    
+    #Arrays of many points
+    t = [x*0.001 for x in range(0,4000)]
+    data = ArraySeries({"exp" : [(x, math.exp(x)) for x in t], "cos" : [(x, 10*math.cos(x)) for x in t]})
+    cairoplot.scatter_plot ( 'scatter_4_array_series.png', data = data, width = 800, height = 600, border = 20, 
+                             axis = True, grid = True, x_title = "t", y_title = "f(t) g(t)", series_legend=True, series_colors = ["red", "blue"] )
 
 
 if test_dot_line_plot:
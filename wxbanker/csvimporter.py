@@ -102,7 +102,7 @@ class CsvImporter:
                 
             desc = re.sub('\d+', lambda x: row[int(x.group(0)) - 1], settings['descriptionColumns'])
             tdate = datetime.strptime(row[settings['dateColumn'] -1],
-                settings['dateFormat']).strftime('%Y-%m-%d')
+                settings['dateFormat']).date()
 
             transactions.append(Transaction(None, None, amount, desc, tdate))
 
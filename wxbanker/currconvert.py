@@ -20,48 +20,145 @@
 
 from wxbanker import localization, fileservice
 from xml.etree import ElementTree
+import os, bisect, datetime
 
 class ConversionException(Exception): pass
 
 class CurrencyConverter(object):
+    # Daily rates in the same format as exchanges.xml (such as the ECB's eurofxref-hist.xml),
+    # which are used if present in the data directory to convert amounts at the rates of their dates.
+    HISTORY_NAME = "exchanges-history.xml"
+    
+    # The rates are parsed once and shared by every converter.
+    _SharedExchanges = None
+    _SharedHistory = None
+    _Shared = None
+
     def __init__(self):
-        self.Exchanges = {"EUR": 1.0}
         self.OriginalPath = fileservice.getSharedFilePath("exchanges.xml")
-        self._loadExchanges()
+        self._loadExchanges(self.OriginalPath)
+        # Copy the latest rates, so that changes to this converter's rates stay local.
+        self.Exchanges = dict(self._SharedExchanges)
+        # The history is {nick: (dates, rates)} with ascending dates. It can be large, so it isn't copied.
+        self.History = self._SharedHistory
+
+    @classmethod
+    def _loadExchanges(cls, path):
+        if cls._SharedExchanges is not None:
+            return
+        
+        snapshots = {}
+        for path in (path, fileservice.getDataFilePath(cls.HISTORY_NAME)):
+            if os.path.exists(path):
+                snapshots.update(cls._parseSnapshots(path))
+
+        # Build each currency's series, leaving the latest known rates in the exchanges.
+        exchanges = {"EUR": 1.0}
+        history = {}
+        for date in sorted(snapshots):
+            for nick, rate in snapshots[date].items():
+                exchanges[nick] = rate
+                dates, rates = history.setdefault(nick, ([], []))
+                dates.append(date)
+                rates.append(rate)
+        cls._SharedExchanges, cls._SharedHistory = exchanges, history
+
+    @staticmethod
+    def _parseSnapshots(path):
+        """Return {date: {nick: rate}} for each day of rates in a reference rates file."""
+        snapshots = {}
+        tree = ElementTree.fromstring(open(path).read())
+        for day in tree.getchildren()[-1].getchildren():
+            date = datetime.date(*[int(x) for x in day.get("time").split("-")])
+            snapshots[date] = dict((e.get("currency"), float(e.get("rate"))) for e in day.getchildren())
+        return snapshots
 
-    def _loadExchanges(self):
-        tree = ElementTree.fromstring(open(self.OriginalPath).read())
+    @classmethod
+    def GetShared(cls):
+        """Return the converter shared by the model, rather than creating one per conversion."""
+        if cls._Shared is None:
+            cls._Shared = cls()
+        return cls._Shared
 
-        exchanges = tree.getchildren()[-1].getchildren()[0].getchildren()
-        for e in exchanges:
-            self.Exchanges[e.get("currency")] = float(e.get("rate"))
+    def _getHistory(self, nick):
+        """
+        Return the (dates, rates) history of the currency, or None if there is none. A rate
+        set in Exchanges overrides the history too, so there is none for an overridden rate.
+        """
+        if nick not in self.History or self.Exchanges.get(nick) != self._SharedExchanges.get(nick):
+            return None
+        return self.History[nick]
 
+    def _getEuroRate(self, nick, date=None):
+        """Return the rate from euros to the currency, on the date if given, otherwise the latest."""
+        rate = self.Exchanges.get(nick)
+        if rate is None:
+            raise ConversionException(_('No exchange rate for currency "%s"') % nick)
+        
+        history = date is not None and self._getHistory(nick)
+        if history:
+            dates, rates = history
+            # Use the last rate on or before the date, or the earliest we know of.
+            rate = rates[max(0, bisect.bisect_right(dates, date) - 1)]
+        return rate
 
-    def Convert(self, amount, original, destination):
+    def _getEuroRates(self, nick, dates):
+        """Return the rate from euros to the currency for each of the ascending dates, in one pass."""
+        rate = self._getEuroRate(nick)
+        history = self._getHistory(nick)
+        if history is None:
+            return [rate] * len(dates)
+        
+        historyDates, historyRates = history
+        result = []
+        i, last = 0, len(historyDates) - 1
+        for date in dates:
+            while i < last and historyDates[i+1] <= date:
+                i += 1
+            result.append(historyRates[i])
+        return result
+
+    def GetRate(self, original, destination, date=None):
         """
-        Convert an amount from one currency to another. In order to do this we
-        first convert the original to euros, and then convert that to the
-        destination currency, since all rates are based on euros.
+        Return the factor converting amounts from the original currency to the destination,
+        on the given date or otherwise at the latest rates. All rates are based on euros,
+        so this is the rate from the original to euros, times the rate from euros to the destination.
         """
         if original == destination:
-            return amount
+            return 1.0
 
-        #fromStr = original.CurrencyNick
-        #toStr = destination.CurrencyNick
-        fromStr, toStr = original, destination
+        fromRate = self._getEuroRate(original, date)
+        toRate = self._getEuroRate(destination, date)
+        return (1.0 / fromRate) * toRate
 
-        fromRate = self.Exchanges.get(fromStr)
-        toRate = self.Exchanges.get(toStr)
+    def ConvertMany(self, amounts, original, destination):
+        """Convert a sequence of amounts from one currency to another, looking up the rate just once."""
+        if original == destination:
+            return list(amounts)
+        rate = self.GetRate(original, destination)
+        return [amount * rate for amount in amounts]
 
-        # Make sure we have an exchange rate for each currency.
-        for rate in (fromRate, toRate):
-            if rate is None:
-                raise ConversionException(_('No exchange rate for currency "%s"') % rate)
+    def ConvertSeries(self, amounts, dates, original, destination):
+        """
+        Convert each amount at the rate on its date. The dates must be in ascending order,
+        so that the rates can be found by walking the history alongside them.
+        """
+        if original == destination:
+            return list(amounts)
+        fromRates = self._getEuroRates(original, dates)
+        toRates = self._getEuroRates(destination, dates)
+        return [amount * ((1.0 / fromRate) * toRate) for amount, fromRate, toRate in zip(amounts, fromRates, toRates)]
 
-        middle = amount * (1.0 / fromRate)
-        end = middle * toRate
+    def Convert(self, amount, original, destination, date=None):
+        """
+        Convert an amount from one currency to another, optionally at the rates on a date.
+        In order to do this we first convert the original to euros, and then convert that
+        to the destination currency, since all rates are based on euros.
+        """
+        if original == destination:
+            return amount
 
-        return end
+        return amount * self.GetRate(original, destination, date)
 
 if __name__ == "__main__":
     import doctest
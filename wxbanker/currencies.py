@@ -21,7 +21,7 @@
 # First: apt-cache search language-pack | grep -v "(gnome|kde|base)" | grep -i LANGUAGE_SPOKEN_IN_COUNTRY
 # Usage: LC_ALL=vi_VN.utf8 python -m wxbanker/currencies Vietnamese
 
-import locale
+import locale, threading
 from wxbanker import localization
 
 def createFromLocale(currencyName):
@@ -61,6 +61,129 @@ def createFromLocale(currencyName):
     open(__file__, "w").write(currencies.encode("utf8"))
     open(currencytests_path, "w").write(currencytests.encode("utf8"))
 
+class CurrencyFormatter(object):
+    """
+    Formats values as locale.currency(val, grouping=True) would under a LOCALECONV, using
+    settings worked out once instead of swapping out the global locale.localeconv each time.
+    Recent results are kept in a bounded LRU cache, and the lock makes formatters safe to
+    share between threads.
+    """
+    CACHE_SIZE = 1024
+
+    def __init__(self, localeconv):
+        self.FracDigits = localeconv['frac_digits']
+        self.Symbol = localeconv['currency_symbol']
+        self.ThousandsSep = localeconv['mon_thousands_sep']
+        self.Grouping = list(localeconv['mon_grouping'])
+        self.DecimalPoint = localeconv['mon_decimal_point']
+        # (precedes, separated, sign position, sign) for positive and negative values.
+        self.Positive = [localeconv[key] for key in ('p_cs_precedes', 'p_sep_by_space', 'p_sign_posn', 'positive_sign')]
+        self.Negative = [localeconv[key] for key in ('n_cs_precedes', 'n_sep_by_space', 'n_sign_posn', 'negative_sign')]
+        self.Nick = localeconv['int_curr_symbol'].strip()
+        
+        # The formatted values by key, along with when each was last used.
+        self._Cache = {}
+        self._Uses = 0
+        self._Lock = threading.Lock()
+
+    def Format(self, val, withNick=False):
+        key = (val, withNick)
+        self._Lock.acquire()
+        try:
+            self._Uses += 1
+            entry = self._Cache.get(key)
+            if entry is None:
+                s = self._format(val)
+                if withNick:
+                    s = self.Nick + " " + s
+                if len(self._Cache) >= self.CACHE_SIZE:
+                    self._evict()
+                entry = self._Cache[key] = [0, s]
+            # Mark a hit as the most recent.
+            entry[0] = self._Uses
+            s = entry[1]
+        finally:
+            self._Lock.release()
+        return s
+
+    def _evict(self):
+        # Drop the least recently used quarter at once, so the sort is rarely needed.
+        byUse = sorted(self._Cache.items(), key=lambda item: item[1][0])
+        for key, entry in byUse[:max(self.CACHE_SIZE // 4, 1)]:
+            del self._Cache[key]
+
+    def _format(self, val):
+        if self.FracDigits == 127:
+            raise ValueError("Currency formatting is not possible using the 'C' locale.")
+
+        parts = ('%%.%if' % self.FracDigits % abs(val)).split('.')
+        parts[0] = self._group(parts[0])
+        s = '<' + self.DecimalPoint.join(parts) + '>'
+
+        precedes, separated, signPosition, sign = self.Negative if val < 0 else self.Positive
+        if precedes:
+            s = self.Symbol + (separated and ' ' or '') + s
+        else:
+            s = s + (separated and ' ' or '') + self.Symbol
+
+        if signPosition == 0:
+            s = '(' + s + ')'
+        elif signPosition == 2:
+            s = s + sign
+        elif signPosition == 3:
+            s = s.replace('<', sign)
+        elif signPosition == 4:
+            s = s.replace('>', sign)
+        else:
+            s = sign + s
+        s = s.replace('<', '').replace('>', '')
+
+        if not isinstance(s, unicode):
+            s = unicode(s, locale.getlocale()[1])
+        return s
+
+    def _group(self, s):
+        """Insert the thousands separators into a string of digits, as locale._group does."""
+        if not self.Grouping:
+            return s
+        groups = []
+        lastInterval = None
+        for interval in self.Grouping:
+            if interval == locale.CHAR_MAX:
+                break
+            if interval == 0:
+                # Zero means repeat the last interval for the rest.
+                while s:
+                    groups.append(s[-lastInterval:])
+                    s = s[:-lastInterval]
+                break
+            if not s:
+                break
+            groups.append(s[-interval:])
+            s = s[:-interval]
+            lastInterval = interval
+        if s:
+            groups.append(s)
+        groups.reverse()
+        return self.ThousandsSep.join(groups)
+
+
+# Formatters are shared by every currency object with the same settings.
+_Formatters = {}
+_FormattersLock = threading.Lock()
+
+def GetFormatter(localeconv):
+    """Return the shared CurrencyFormatter for a LOCALECONV dictionary."""
+    key = tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in localeconv.items()))
+    _FormattersLock.acquire()
+    try:
+        formatter = _Formatters.get(key)
+        if formatter is None:
+            formatter = _Formatters[key] = CurrencyFormatter(localeconv)
+    finally:
+        _FormattersLock.release()
+    return formatter
+
 class BaseCurrency(object):
     """
     This object represents the base of a currency, seeded with Western values.
@@ -85,32 +208,25 @@ class BaseCurrency(object):
             'positive_sign': '',
             'thousands_sep': ','
         }
+        self._Formatter = self._FormatterConv = None
 
     def GetCurrencyNick(self):
         return self.LOCALECONV["int_curr_symbol"].strip()
 
+    def GetFormatter(self):
+        # Look up the formatter again if LOCALECONV has been replaced, as createFromLocale does.
+        if self._FormatterConv is not self.LOCALECONV:
+            self._Formatter = GetFormatter(self.LOCALECONV)
+            self._FormatterConv = self.LOCALECONV
+        return self._Formatter
+
     def float2str(self, val, just=0, withNick=False):
         """Formats float values as currency strings according to the currency settings in self.LOCALECONV"""
         # Don't show negative zeroes!
         if abs(val) < .001:
             val = 0
 
-        # Temporarily override the localeconv dictionary so the locale module acts as the desired locale.
-        # Wrap in a try/finally to be extra safe as it needs to be restored no matter what.
-        ##locale._override_localeconv = self.LOCALECONV # Use this when python2.5 support is dropped.
-        localeConvBackup = locale.localeconv
-        locale.localeconv = lambda: self.LOCALECONV
-        try:
-            s = locale.currency(val, grouping=True)
-        finally:
-            ##locale._override_localeconv = None
-            locale.localeconv = localeConvBackup
-
-        if not isinstance(s, unicode):
-            s = unicode(s, locale.getlocale()[1])
-
-        if withNick:
-            s = self.GetCurrencyNick() + " " + s
+        s = self.GetFormatter().Format(val, withNick)
             
         # Justify as appropriate.
         s = s.rjust(just)
@@ -523,6 +639,26 @@ class LocalizedCurrency(BaseCurrency):
         BaseCurrency.__init__(self)
         self.LOCALECONV = locale.localeconv()
 
+def GetCurrency(currencyInt):
+    """
+    Return a shared instance of the currency with this index in CurrencyList, for formatting
+    and converting. Callers that may modify the currency should create their own instead.
+    """
+    key = currencyInt
+    # The localized currency depends on the current locale, so cache it per locale.
+    if currencyInt == 0:
+        key = (currencyInt, locale.setlocale(locale.LC_ALL))
+    currency = _Currencies.get(key)
+    if currency is None:
+        currency = _Currencies[key] = CurrencyList[currencyInt]()
+    return currency
+
+_Currencies = {}
+
+def GetCurrencyNick(currencyInt):
+    """Return the nick (such as USD) of the currency with this index in CurrencyList."""
+    return GetCurrency(currencyInt).GetCurrencyNick()
+
 def GetCurrencyInt(currency):
     for i, curr in enumerate(CurrencyList):
         if isinstance(currency, curr):
@@ -66,13 +66,8 @@ class BankerPanel(wx.Panel):
     def CheckRecurringTransactions(self):
         recurrings = self.bankController.Model.GetRecurringTransactions()
         # Figure out how many due recurring transactions there are.
-        untransacted = []
-        totalTransactions = 0
-        for recurring in recurrings:
-            dates = recurring.GetUntransactedDates()
-            if dates:
-                untransacted.append((recurring, dates))
-                totalTransactions += len(dates)
+        untransacted = self.bankController.Model.GetDueRecurringTransactions()
+        totalTransactions = sum(len(dates) for recurring, dates in untransacted)
                 
         # If there aren't any untransacted transactions, we are done.
         if not untransacted:
@@ -103,8 +98,7 @@ class BankerPanel(wx.Panel):
             
         # Create the callback to perform the transactions.
         def performer(event=None):
-            for recurring, dates in untransacted:
-                recurring.PerformTransactions()
+            self.bankController.Model.PerformRecurringTransactions(untransacted)
             mpanel.Dismiss()
         
         # Add a button which will enter the transactions on a click.
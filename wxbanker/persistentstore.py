@@ -113,10 +113,10 @@ class PersistentStore:
         self.AutoSave = autoSave
         self.commitIfAppropriate()
 
-    def GetModel(self, useCached=True):
+    def GetModel(self, useCached=True, mintLogin=True):
         if self.cachedModel is None or not useCached:
             debug.debug('Creating model...')
-            self.cachedModel = BankModel(self)
+            self.cachedModel = BankModel(self, mintLogin)
 
         return self.cachedModel
 
@@ -153,6 +153,15 @@ class PersistentStore:
         transaction.ID = cursor.lastrowid
         return transaction
 
+    def MakeTransactions(self, account, transactions):
+        """Store many transactions at once, committing (if appropriate) just once at the end."""
+        cursor = self.dbconn.cursor()
+        for transaction in transactions:
+            cursor.execute('INSERT INTO transactions VALUES (null, ?, ?, ?, ?, ?, ?)', [account.ID] + transaction.toResult()[1:])
+            transaction.ID = cursor.lastrowid
+        self.commitIfAppropriate()
+        return transactions
+
     def RemoveTransaction(self, transaction):
         ID = transaction.ID
         result = self.dbconn.cursor().execute('DELETE FROM transactions WHERE id=?', (ID,)).fetchone()
@@ -404,8 +413,10 @@ class PersistentStore:
             t.LinkedTransaction = linkedTransaction
         else:
             # Handle recurring parents.
+            # Set the private attribute directly as this came from the row itself and shouldn't be written back.
+            # The recurring transaction learns about its children when the account's transactions are loaded.
             if recurringId:
-                t.RecurringParent = recurringCache[recurringId]
+                t._RecurringParent = recurringCache[recurringId]
 
             # Handle linked transactions.
             if linkId:
@@ -421,7 +432,7 @@ class PersistentStore:
                         linkAccount._preTransactions.append(link)
                     t.LinkedTransaction = link
                     # Synchronize the RecurringParent attribute.
-                    t.LinkedTransaction.RecurringParent = t.RecurringParent
+                    t.LinkedTransaction._RecurringParent = t.RecurringParent
         return t
 
     def getTransactionsFrom(self, account):
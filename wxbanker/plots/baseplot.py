@@ -20,18 +20,10 @@ import datetime
 from wxbanker.plots.plotfactory import BasePlotImportException
 from wxbanker.analyzers import MonthlyAnalyzer
 
-# Needs Numeric or numarray or NumPy
+# Needs NumPy.
 try:
-    import numpy.oldnumeric as _Numeric
-except:
-    try:
-        import numarray as _Numeric  #if numarray is used it is renamed Numeric
-    except:
-        try:
-            import Numeric as _Numeric
-        except:
-            _Numeric = None
-if not hasattr(_Numeric, 'polyfit'):
+    import numpy
+except ImportError:
     raise BasePlotImportException()
 
 
@@ -74,13 +66,14 @@ class BasePlot(object):
 
         return points[:-1], startDate, daysPerPoint or smallDelta
     
-    def plotMonthly(self, transactions, months):
+    def plotMonthly(self, periodTotals, months, account=None):
         monthly = MonthlyAnalyzer(months)
-        earnings = monthly.GetEarnings(transactions)
+        earnings = monthly.GetPeriodEarnings(periodTotals, account)
         return earnings
     
-    def plotBalance(self, totals, plotSettings, xunits):
-        totals, startDate, every = self.getPoints(totals, plotSettings['Granularity'])
+    def plotBalance(self, points, plotSettings, xunits):
+        """Generate the plot data from (points, startDate, daysPerPoint), as BankModel.GetSampledTotals returns."""
+        totals, startDate, every = points
         
         self.startDate = startDate
         timeDelta = datetime.timedelta( every * {'Days':1, 'Weeks':7, 'Months':30, 'Years':365}[xunits] )
@@ -107,18 +100,54 @@ class BasePlot(object):
         
         return totals, dates, strdates, trendable
     
+    def getTrendData(self, points, plotSettings):
+        """Fit a trend line to the points, in the way chosen by the FitMode and FitDegree settings."""
+        fitter = [self.getPolyData, self.getMovingAverageData, self.getExponentialData][plotSettings.get("FitMode", 0)]
+        return fitter(points, plotSettings["FitDegree"])
+    
+    def _splitPoints(self, points):
+        xs = numpy.array([p[0] for p in points], dtype=float)
+        ys = numpy.array([p[1] for p in points], dtype=float)
+        return xs, ys
+    
+    def _joinPoints(self, xs, ys):
+        return [(int(x), float(y)) for x, y in zip(xs, ys)]
+    
     def getPolyData(self, points, N=1):
-        xs = tuple((p[0] for p in points))
-        ys = tuple((p[1] for p in points))
-
-        coefficients = _Numeric.polyfit(xs, ys, N)
-
-        bestFitPoints = []
-        for x in xs:
-            newY = 0.0
-            power = len(coefficients)-1
-            for coefficient in coefficients:
-                newY += coefficient*(x**power)
-                power -= 1
-            bestFitPoints.append((int(x), float(newY)))
-        return bestFitPoints
\ No newline at end of file
+        """The best fitting polynomial of degree N."""
+        xs, ys = self._splitPoints(points)
+        coefficients = numpy.polyfit(xs, ys, N)
+        return self._joinPoints(xs, numpy.polyval(coefficients, xs))
+    
+    def getMovingAverageData(self, points, N=1):
+        """The average of each point and the N-1 before it (or as many as there are)."""
+        xs, ys = self._splitPoints(points)
+        N = max(1, min(N, len(ys)))
+        sums = numpy.cumsum(numpy.concatenate(([0.0], ys)))
+        ends = numpy.arange(1, len(ys) + 1)
+        starts = numpy.maximum(ends - N, 0)
+        return self._joinPoints(xs, (sums[ends] - sums[starts]) / (ends - starts))
+    
+    def getExponentialData(self, points, N=1):
+        """
+        Exponential smoothing with the weight of an N point moving average, alpha = 2 / (N+1).
+        Each smoothed value is s[t] = a*y[t] + (1-a)*s[t-1], which unrolls to
+        s[t] = (1-a)**t * (y[0] + a * sum(y[k] / (1-a)**k, 1 <= k <= t)), so it is computed
+        as a cumsum. The powers are rescaled every block so that they can't overflow.
+        """
+        xs, ys = self._splitPoints(points)
+        alpha = 2.0 / (N + 1)
+        if alpha >= 1 or not len(ys):
+            return self._joinPoints(xs, ys)
+        
+        decay = 1 - alpha
+        # Keep (1-a)**-block well within the range of a float.
+        block = max(1, int(500 / -numpy.log(decay)))
+        smoothed = numpy.empty_like(ys)
+        previous = ys[0]
+        for start in range(0, len(ys), block):
+            chunk = ys[start:start + block]
+            powers = decay ** numpy.arange(1, len(chunk) + 1)
+            smoothed[start:start + block] = powers * (previous + alpha * numpy.cumsum(chunk / powers))
+            previous = smoothed[start + len(chunk) - 1]
+        return self._joinPoints(xs, smoothed)
@@ -0,0 +1,118 @@
+#    https://launchpad.net/wxbanker
+#    cairocharts.py: Copyright 2007-2010 Mike Rooney <mrooney@ubuntu.com>
+#
+#    This file is part of wxBanker.
+#
+#    wxBanker is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    wxBanker is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with wxBanker.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+The cairoplot charts, independent of wx. The cairo plot panels draw these on the
+screen, and the chart renderer draws them to files.
+"""
+
+import datetime
+from wxbanker.plots import baseplot
+from wxbanker.cairoplot import cairoplot, series
+
+
+class BalanceChart(baseplot.BasePlot):
+    """The balance over time, with a trend line."""
+    def __init__(self):
+        baseplot.BasePlot.__init__(self)
+        self.data = None
+        self.x_labels = None
+
+    def setPoints(self, points, plotSettings, xunits="Days"):
+        """Set the data from (points, startDate, daysPerPoint), as BankModel.GetSampledTotals returns."""
+        amounts, dates, strdates, trendable = self.plotBalance(points, plotSettings, xunits)
+        data = [(i, total) for i, total in enumerate(amounts)]
+        groups = {
+            _("Balance") : data,
+        }
+        if trendable:
+            fitdata = self.getTrendData(data, plotSettings)
+            groups[_("Trend")] = fitdata
+        # Plain arrays are much faster for cairoplot than its Series of Data objects.
+        self.data = series.ArraySeries(groups)
+
+        # The maximum number of X labels (dates) we want to show.
+        num_dates = 10
+        if len(amounts) <= num_dates+1:
+            labels = strdates
+        else:
+            labels = []
+            delta = 1.0 * (len(amounts)-1) / (num_dates)
+            for i in range(num_dates+1):
+                labels.append(strdates[int(i*delta)])
+
+        self.x_labels = labels
+
+    def draw(self, surface, width, height, formatter, background=None):
+        """Draw onto a cairo surface, or a file name ending in .png or .svg, with the amounts formatted by formatter."""
+        cairoplot.scatter_plot(
+            surface,
+            data = self.data,
+            width = width, height = height,
+            background = background,
+            border = 20,
+            axis = True,
+            dots = 0,
+            grid = True,
+            series_colors = ["green", "blue"],
+            series_legend = True,
+            x_labels=self.x_labels,
+            y_formatter=formatter,
+            x_title=_("Time"),
+            y_title=_("Balance"),
+        )
+
+
+class MonthlyChart(baseplot.BasePlot):
+    """The earnings of each of the last so many months, as bars."""
+    def __init__(self):
+        baseplot.BasePlot.__init__(self)
+        self.data = None
+        self.x_labels = None
+
+    def setTotals(self, periodTotals, months, account=None):
+        """Set the data from the monthly totals of a PeriodTotals, see BankModel.GetPeriodTotals."""
+        earnings = self.plotMonthly(periodTotals, months, account)
+        data, self.x_labels = [], []
+        for month, amount in earnings:
+            # Add the amount to the data.
+            data.append([amount])
+            # Generate the x_label representing the month.
+            year, month = [int(x) for x in month.split(".")]
+            x_label = datetime.date(year, month, 1).strftime("%b %Y")
+            self.x_labels.append(x_label)
+        self.data = series.ArraySeries(data)
+
+    def draw(self, surface, width, height, formatter, background="white light_gray"):
+        """Draw onto a cairo surface, or a file name ending in .png or .svg, with the amounts formatted by formatter."""
+        cairoplot.vertical_bar_plot(
+            surface,
+            data = self.data,
+            width = width, height = height,
+            background = background,
+            border = 20,
+            grid = True,
+            colors = ["green"],
+            #series_legend = True,
+            display_values = True,
+            value_formatter = formatter,
+            #x_title=_("Earnings"),
+            #y_title=_("Month"),
+            rounded_corners = True,
+            x_labels = self.x_labels
+        )
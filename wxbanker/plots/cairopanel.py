@@ -1,5 +1,4 @@
 import wx
-import datetime
 from wxbanker.plots import plotfactory
 from wxbanker.lib.pubsub import Publisher
 
@@ -8,7 +7,7 @@ try:
         from wxbanker.plots import baseplot
     except plotfactory.BasePlotImportException:
         raise plotfactory.PlotLibraryImportException('cairo', 'python-numpy')
-    from wxbanker.cairoplot import cairoplot, series
+    from wxbanker.plots import cairocharts
     import wx.lib.wxcairo
 except ImportError:
     raise plotfactory.PlotLibraryImportException('cairo', 'pycairo')
@@ -18,6 +17,9 @@ class CairoPlotPanelFactory(baseplot.BaseFactory):
         self.Plots = [CairoPlotPanel, CairoPlotPanelMonthly]
     
 class BaseCairoPlotPanel(wx.Panel, baseplot.BasePlot):
+    # How long the size has to stay the same before the plot is rendered again, in ms.
+    RESIZE_DELAY = 150
+    
     def __init__(self, bankController, parent, plotSettings=None):
         wx.Panel.__init__(self, parent)
         baseplot.BasePlot.__init__(self)
@@ -26,124 +28,107 @@ class BaseCairoPlotPanel(wx.Panel, baseplot.BasePlot):
         self.Bind(wx.EVT_SIZE, self.OnSize)
         self.data = None
         self.x_labels = None
+        # The cairocharts chart of the data, set by plotBalance.
+        self.chart = None
         self.plotSettings = plotSettings
         
+        # The rendered plot is kept as a bitmap and only redrawn when the data, settings or size change.
+        # Anything which changes the plot bumps the version, see plotChanged.
+        self.plotVersion = 0
+        self.renderedKey = None
+        self.renderedBitmap = None
+        self.ID_RESIZE_TIMER = wx.NewId()
+        self.ResizeTimer = wx.Timer(self, self.ID_RESIZE_TIMER)
+        self.isResizing = False
+        self.Bind(wx.EVT_TIMER, self.onResizeTimer, id=self.ID_RESIZE_TIMER)
+        
         # watch if there's any currency change to repaint the plot.
         Publisher.subscribe(self.currencyChanged, "controller.show_currency_nick_toggled")
         Publisher.subscribe(self.currencyChanged, "currency_changed")
     
     def currencyChanged(self, message):
+        # The labels are formatted in the currency, so the plot has to be rendered again.
+        self.plotChanged()
+        
+    def plotChanged(self):
+        self.plotVersion += 1
         self.Refresh()
         
     def OnSize(self, event):
+        # Rendering on every step of a resize is slow, so stretch the last plot until the size settles.
+        self.isResizing = True
+        self.ResizeTimer.Start(self.RESIZE_DELAY, wx.TIMER_ONE_SHOT)
         self.Refresh()
         
-class CairoPlotPanelMonthly(BaseCairoPlotPanel):
-    NAME = _("monthly")
-    
-    def plotBalance(self, totals, plotSettings):
-        self.plotSettings = plotSettings
-        model = self.bankController.Model
-        transactions = model.GetTransactions()
-        earnings = baseplot.BasePlot.plotMonthly(self, transactions, plotSettings['Months'])
-        self.data, self.x_labels = [], []
-        for month, amount in earnings:
-            # Add the amount to the data.
-            self.data.append([amount])
-            # Generate the x_label representing the month.
-            year, month = [int(x) for x in month.split(".")]
-            x_label = datetime.date(year, month, 1).strftime("%b %Y")
-            self.x_labels.append(x_label)
+    def onResizeTimer(self, event):
+        self.isResizing = False
         self.Refresh()
         
     def OnPaint(self, event):
+        dc = wx.PaintDC(self)
         # I'm not sure when this might happen, but I recall doing it for a reason. Perhaps OnPaint can occur without a plotBalance?
         if self.data is None:
             return
         
-        dc = wx.BufferedPaintDC(self)
+        size = self.GetClientSize()
+        if size.width <= 0 or size.height <= 0:
+            return
+        
+        key = (self.plotVersion, tuple(size))
+        if key != self.renderedKey:
+            if self.isResizing and self.renderedKey is not None and self.renderedKey[0] == self.plotVersion:
+                # Only the size changed, and it is still changing.
+                image = self.renderedBitmap.ConvertToImage().Scale(size.width, size.height)
+                dc.DrawBitmap(wx.BitmapFromImage(image), 0, 0)
+                return
+            self.renderedBitmap = self.renderPlot(size)
+            self.renderedKey = key
+        
+        dc.DrawBitmap(self.renderedBitmap, 0, 0)
+        
+    def renderPlot(self, size):
+        """Return a bitmap of the plot at the given size."""
+        bitmap = wx.EmptyBitmap(size.width, size.height)
+        dc = wx.MemoryDC(bitmap)
+        dc.SetBackground(wx.Brush(self.GetBackgroundColour()))
         dc.Clear()
         
         cr = wx.lib.wxcairo.ContextFromDC(dc)
-        size = self.GetClientSize()
+        self.drawPlot(cr.get_target(), size)
+        cr.get_target().flush()
+        
+        dc.SelectObject(wx.NullBitmap)
+        return bitmap
         
+    def drawPlot(self, surface, size):
+        """Draw the chart onto a cairo surface of the given size."""
+        self.chart.draw(surface, size.width, size.height, self.getFormatter())
+        
+    def getFormatter(self):
         # try to format Y axes labels according to the account's currency.
         if self.plotSettings['Account']:
-            value_formatter = lambda s: self.plotSettings['Account'].float2str(s)
+            return lambda s: self.plotSettings['Account'].float2str(s)
         else:
-            value_formatter = lambda s: self.bankController.Model.float2str(s)
-            
-        cairoplot.vertical_bar_plot(
-            cr.get_target(),
-            data = self.data,
-            width = size.width, height = size.height,
-            border = 20, 
-            grid = True,
-            colors = ["green"],
-            #series_legend = True,
-            display_values = True,
-            value_formatter = value_formatter,
-            #x_title=_("Earnings"),
-            #y_title=_("Month"),
-            rounded_corners = True,
-            x_labels = self.x_labels
-        )
+            return lambda s: self.bankController.Model.float2str(s)
+        
+class CairoPlotPanelMonthly(BaseCairoPlotPanel):
+    NAME = _("monthly")
+    
+    def plotBalance(self, points, plotSettings):
+        self.plotSettings = plotSettings
+        chart = cairocharts.MonthlyChart()
+        chart.setTotals(self.bankController.Model.GetPeriodTotals(), plotSettings['Months'])
+        self.chart = chart
+        self.data = chart.data
+        self.plotChanged()
         
 class CairoPlotPanel(BaseCairoPlotPanel):
     NAME = _("balance")
     
-    def plotBalance(self, totals, plotSettings, xunits="Days"):
+    def plotBalance(self, points, plotSettings, xunits="Days"):
         self.plotSettings = plotSettings
-        amounts, dates, strdates, trendable = baseplot.BasePlot.plotBalance(self, totals, plotSettings, xunits)
-        data = [(i, total) for i, total in enumerate(amounts)]
-        self.data = {
-            _("Balance") : data,
-        }
-        if trendable:
-            fitdata = self.getPolyData(data, N=plotSettings["FitDegree"])
-            self.data[_("Trend")] = fitdata
-        
-        # The maximum number of X labels (dates) we want to show.        
-        num_dates = 10
-        if len(amounts) <= num_dates+1:
-            labels = strdates
-        else:
-            labels = []
-            delta = 1.0 * (len(amounts)-1) / (num_dates)
-            for i in range(num_dates+1):
-                labels.append(strdates[int(i*delta)])
-        
-        self.x_labels = labels
-        self.Refresh()
-        
-    def OnPaint(self, event):
-        if self.data is None:
-            return
-        
-        dc = wx.BufferedPaintDC(self)
-        dc.Clear()
-        
-        cr = wx.lib.wxcairo.ContextFromDC(dc)
-        size = self.GetClientSize()
-        
-         # try to format Y axes labels according to the account's currency.
-        if self.plotSettings['Account']:
-            y_formatter = lambda s: self.plotSettings['Account'].float2str(s)
-        else:
-            y_formatter = lambda s: self.bankController.Model.float2str(s)
-        
-        cairoplot.scatter_plot(
-            cr.get_target(),
-            data = self.data,
-            width = size.width, height = size.height,
-            border = 20, 
-            axis = True,
-            dots = 0,
-            grid = True,
-            series_colors = ["green", "blue"],
-            series_legend = True,
-            x_labels=self.x_labels,
-            y_formatter=y_formatter,
-            x_title=_("Time"),
-            y_title=_("Balance"),
-        )
+        chart = cairocharts.BalanceChart()
+        chart.setPoints(points, plotSettings, xunits)
+        self.chart = chart
+        self.data = chart.data
+        self.plotChanged()
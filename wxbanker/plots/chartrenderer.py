@@ -0,0 +1,148 @@
+#    https://launchpad.net/wxbanker
+#    chartrenderer.py: Copyright 2007-2010 Mike Rooney <mrooney@ubuntu.com>
+#
+#    This file is part of wxBanker.
+#
+#    wxBanker is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    wxBanker is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with wxBanker.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Render the balance and monthly charts of a bank to image files without a GUI,
+for all accounts together and for each account, such as from a nightly job:
+
+    python -m wxbanker.plots.chartrenderer [options] BANK_PATH OUTPUT_DIR
+
+The charts are made just as the summary tab makes them, from the sampled totals
+and period totals of the model. Accounts are rendered in parallel processes,
+each of which opens the bank once.
+"""
+
+import os, re, optparse, multiprocessing
+
+# This installs _ for the chart labels.
+from wxbanker import localization
+from wxbanker.persistentstore import PersistentStore
+from wxbanker.plots import cairocharts
+
+FORMATS = ("png", "svg")
+# The same defaults as the summary tab.
+DEFAULT_SETTINGS = {'FitDegree': 2, 'FitMode': 0, 'Granularity': 100, 'Months': 12}
+
+# The characters which can't go in a chart file name.
+UNSAFE_CHARS = re.compile(r"[^\w\-]+", re.UNICODE)
+
+# The model of the bank in this worker process, see initWorker.
+_Model = None
+
+def initWorker(path):
+    """Open the bank in this process, without saving anything back to it or logging in to Mint.com."""
+    global _Model
+    _Model = PersistentStore(path, autoSave=False).GetModel(mintLogin=False)
+
+def getChartName(accountId, accountName):
+    """
+    Return the start of the chart file names of an account, or of all accounts for None.
+    The ID keeps them unique, even for names which only differ in unsafe characters.
+    """
+    if accountId is None:
+        return "all"
+    return "%s-%i" % (UNSAFE_CHARS.sub("_", accountName).strip("_") or "account", accountId)
+
+def renderAccount(job):
+    """Render the charts of the account with the given ID, or all accounts for None, and return their paths."""
+    accountId, accountName, outdir, fileFormat, width, height, plotSettings = job
+    model = _Model
+    if accountId is None:
+        account, formatter = None, model.float2str
+    else:
+        account = model.Accounts.GetById(accountId)
+        formatter = account.float2str
+    name = os.path.join(outdir, getChartName(accountId, accountName))
+
+    balance = cairocharts.BalanceChart()
+    balance.setPoints(model.GetSampledTotals(plotSettings['Granularity'], account, extremes=True), plotSettings)
+    balancePath = "%s-balance.%s" % (name, fileFormat)
+    balance.draw(balancePath, width, height, formatter, background="white")
+
+    monthly = cairocharts.MonthlyChart()
+    monthly.setTotals(model.GetPeriodTotals(), plotSettings['Months'], account)
+    monthlyPath = "%s-monthly.%s" % (name, fileFormat)
+    monthly.draw(monthlyPath, width, height, formatter)
+
+    return [balancePath, monthlyPath]
+
+def renderCharts(path, outdir, fileFormat="png", width=800, height=600, processes=None, plotSettings=None):
+    """
+    Render the charts of all accounts and of each account in the bank at path into outdir,
+    as PNG or SVG files, and return their paths. The accounts are shared out between the
+    given number of processes, by default one per CPU, or rendered in this one if it is 1.
+    """
+    global _Model
+    if fileFormat not in FORMATS:
+        raise ValueError("Unknown chart format '%s', expected one of: %s" % (fileFormat, ", ".join(FORMATS)))
+    if not os.path.exists(path):
+        raise IOError("No bank found at '%s'" % path)
+    if not os.path.isdir(outdir):
+        os.makedirs(outdir)
+
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(plotSettings or {})
+
+    # Open the bank here first, so any upgrade of it happens once, before the workers open it.
+    store = PersistentStore(path, autoSave=False)
+    accounts = [(None, None)] + [(account.ID, account.Name) for account in store.GetModel(mintLogin=False).Accounts]
+    store.Close()
+
+    jobs = [(accountId, accountName, outdir, fileFormat, width, height, settings) for accountId, accountName in accounts]
+    if processes == 1:
+        initWorker(path)
+        try:
+            results = map(renderAccount, jobs)
+        finally:
+            _Model.Store.Close()
+            _Model = None
+    else:
+        pool = multiprocessing.Pool(processes, initWorker, (path,))
+        try:
+            results = pool.map(renderAccount, jobs)
+        finally:
+            pool.close()
+            pool.join()
+
+    return [chartPath for paths in results for chartPath in paths]
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [options] BANK_PATH OUTPUT_DIR")
+    parser.add_option("-f", "--format", default="png", choices=FORMATS, help="png or svg [default: %default]")
+    parser.add_option("-s", "--size", default="800x600", help="the chart size, as WIDTHxHEIGHT [default: %default]")
+    parser.add_option("-p", "--processes", type="int", help="the number of processes to render with [default: one per CPU]")
+    parser.add_option("-m", "--months", type="int", default=DEFAULT_SETTINGS['Months'], help="the months of earnings to chart [default: %default]")
+    parser.add_option("-n", "--points", type="int", default=DEFAULT_SETTINGS['Granularity'], help="the points of balance to chart [default: %default]")
+    # Allow the --lang option which localization handles.
+    parser.add_option("--lang", help="the language to label the charts in")
+    options, args = parser.parse_args()
+    if len(args) != 2:
+        parser.error("expected a bank and an output directory")
+
+    try:
+        width, height = [int(x) for x in options.size.lower().split("x")]
+    except ValueError:
+        parser.error("invalid size '%s'" % options.size)
+
+    path, outdir = args
+    settings = {'Months': options.months, 'Granularity': options.points}
+    for chartPath in renderCharts(path, outdir, options.format, width, height, options.processes, settings):
+        print chartPath
+
+if __name__ == "__main__":
+    main()
@@ -27,8 +27,8 @@ class AccountPlotCanvas(pyplot.PlotCanvas, baseplot.BasePlot):
 
         self.canvas.Bind(wx.EVT_MOTION, self.onMotion)
 
-    def plotBalance(self, totals, plotSettings, xunits="Days"):
-        totals, dates, strdates, trendable = baseplot.BasePlot.plotBalance(self, totals, plotSettings, xunits)
+    def plotBalance(self, points, plotSettings, xunits="Days"):
+        totals, dates, strdates, trendable = baseplot.BasePlot.plotBalance(self, points, plotSettings, xunits)
 
         data = zip(dates, totals)
         #drawPointLabel will need these later
@@ -38,7 +38,7 @@ class AccountPlotCanvas(pyplot.PlotCanvas, baseplot.BasePlot):
         lines = [line]
         # Without more than one unique value, a best fit line doesn't make sense (and also causes freezes!)
         if trendable:
-            bestFitData = self.getPolyData(data, N=plotSettings["FitDegree"])
+            bestFitData = self.getTrendData(data, plotSettings)
             bestfitline = pyplot.PolyLine(bestFitData, width=2, colour="blue", legend=_("Trend"))
             lines.append(bestfitline)
         self.Draw(pyplot.PlotGraphics(lines, _("Total Balance Over Time"), _("Time"), _("Balance")))
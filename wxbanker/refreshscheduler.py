@@ -0,0 +1,95 @@
+#    https://launchpad.net/wxbanker
+#    refreshscheduler.py: Copyright 2007-2010 Mike Rooney <mrooney@ubuntu.com>
+#
+#    This file is part of wxBanker.
+#
+#    wxBanker is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    wxBanker is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with wxBanker.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Coalesce the refreshes views make in response to model changes.
+
+Rather than redrawing on every message, a view schedules a refresh method, along
+with what it needs to refresh (such as rows or accounts). Once the messages of the
+current event have all been handled, each method is called once, with everything
+scheduled for it, no matter how many messages asked for it.
+
+    RefreshScheduler.GetShared().Schedule(self.refreshAccounts, account)
+"""
+
+import sys, wx
+
+
+class RefreshScheduler(object):
+    _Shared = None
+
+    def __init__(self, callAfter=None):
+        # Allow something other than wx.CallAfter to run the flush, such as for testing.
+        self.callAfter = callAfter or wx.CallAfter
+        # The scheduled methods in order, and the items scheduled for each.
+        self.pending = []
+        self.items = {}
+        self.isScheduled = False
+
+    @classmethod
+    def GetShared(cls):
+        """Return the scheduler shared by all the views, so their refreshes happen together."""
+        if cls._Shared is None:
+            cls._Shared = cls()
+        return cls._Shared
+
+    def Schedule(self, callback, *items):
+        """Call callback once the current event is over, along with any others scheduled by then."""
+        if callback not in self.items:
+            self.pending.append(callback)
+            self.items[callback] = set()
+        self.items[callback].update(items)
+
+        if not self.isScheduled:
+            self.isScheduled = True
+            self.callAfter(self.Flush)
+
+    def Flush(self, owner=None):
+        """
+        Do the scheduled refreshes now, or only those of the methods of owner if it is given,
+        such as when a view is asked about its state while it has refreshes pending.
+        Methods which had items scheduled are called with the set of them. If any raise,
+        the rest are still called, and then the first error is raised again.
+        """
+        if owner is None:
+            self.isScheduled = False
+            callbacks, self.pending = self.pending, []
+        else:
+            callbacks = [c for c in self.pending if getattr(c, "im_self", None) is owner]
+            if not callbacks:
+                return
+            self.pending = [c for c in self.pending if c not in callbacks]
+
+        # Take them all off the schedule first, so any scheduled while refreshing wait for the next flush.
+        batch = [(callback, self.items.pop(callback)) for callback in callbacks]
+        error = None
+        for callback, items in batch:
+            try:
+                if items:
+                    callback(items)
+                else:
+                    callback()
+            except wx.PyDeadObjectError:
+                # The view was destroyed after scheduling this, so there's nothing to refresh.
+                pass
+            except Exception:
+                if error is None:
+                    error = sys.exc_info()
+
+        if error is not None:
+            raise error[0], error[1], error[2]
@@ -16,8 +16,9 @@
 #    You should have received a copy of the GNU General Public License
 #    along with wxBanker.  If not, see <http://www.gnu.org/licenses/>.
 
-from wxbanker import localization, bankcontrols, helpers
+from wxbanker import localization, bankcontrols, helpers, analyzers
 import wx, datetime
+import wx.lib.delayedresult as delayedresult
 from wxbanker.lib.pubsub import Publisher
 
 class SummaryPanel(wx.Panel):
@@ -26,10 +27,16 @@ class SummaryPanel(wx.Panel):
         self.plotFactory = plotFactory
         self.bankController = bankController
 
-        self.plotSettings = {'FitDegree': 2, 'Granularity': 100, 'Account': None, 'Months': 12}
+        self.plotSettings = {'FitDegree': 2, 'FitMode': 0, 'Granularity': 100, 'Account': None, 'Months': 12}
         self.plotLabels = [_("Trend Degree"), _("Months")]
+        # The ways of fitting a trend to the balance, see BasePlot.getTrendData.
+        self.fitModes = [_("Polynomial"), _("Moving average"), _("Exponential smoothing")]
         self.currentPlotIndex = 0
         self.cachedData = None
+        # The summary data is computed in a worker, one request at a time; see generateData.
+        self.dataJobID = 0
+        self.isGenerating = False
+        self.pendingRequest = None
         self.dateRange = None
         self.isActive = False
 
@@ -40,6 +47,8 @@ class SummaryPanel(wx.Panel):
         controlSizer = wx.BoxSizer()
         self.graphChoice = wx.Choice(self, choices=[plot.NAME for plot in plotFactory.Plots])
         self.optionCtrl = wx.SpinCtrl(self, min=1, max=24, initial=self.plotSettings['FitDegree'])
+        self.fitChoice = wx.Choice(self, choices=self.fitModes)
+        self.fitChoice.SetSelection(self.plotSettings['FitMode'])
         # the date range controls
         self.startDate = bankcontrols.DateCtrlFactory(self)
         self.endDate = bankcontrols.DateCtrlFactory(self)
@@ -59,6 +68,8 @@ class SummaryPanel(wx.Panel):
         controlSizer.AddSpacer(5)
         controlSizer.Add(self.endDate, 0, wx.ALIGN_CENTER_VERTICAL)
         controlSizer.AddSpacer(10)
+        controlSizer.Add(self.fitChoice, 0, wx.ALIGN_CENTER_VERTICAL)
+        controlSizer.AddSpacer(5)
         controlSizer.Add(self.optionText, 0, wx.ALIGN_CENTER_VERTICAL)
         controlSizer.AddSpacer(5)
         controlSizer.Add(self.optionCtrl, 0, wx.ALIGN_CENTER_VERTICAL)
@@ -74,6 +85,7 @@ class SummaryPanel(wx.Panel):
         # bind to the spin buttons
         self.graphChoice.Bind(wx.EVT_CHOICE, self.onGraphChoice)
         self.optionCtrl.Bind(wx.EVT_SPINCTRL, self.onOptionSpin)
+        self.fitChoice.Bind(wx.EVT_CHOICE, self.onFitChoice)
         self.Bind(wx.EVT_DATE_CHANGED, self.onDateRangeChanged)
         Publisher.subscribe(self.onAccountSelect, "view.account changed")
         
@@ -87,9 +99,9 @@ class SummaryPanel(wx.Panel):
         self.generateData(useCache=True)
         
         # Update the controls
-        self.optionText.Label = self.plotLabels[index]
+        self.optionText.Label = self.getOptionLabel(index)
         self.optionCtrl.Value = self.plotSettings[self.getOptionKey(index)]
-        for ctrl in (self.fromText, self.toText, self.startDate, self.endDate):
+        for ctrl in (self.fromText, self.toText, self.startDate, self.endDate, self.fitChoice):
             ctrl.Show(index == 0)
         
         # A replace does not Layout, and we have made some changes.
@@ -98,6 +110,12 @@ class SummaryPanel(wx.Panel):
     def onDateRangeChanged(self, event):
         self.generateData()
         
+    def getOptionLabel(self, index):
+        # Smoothing trends use the option as the number of points to smooth over.
+        if index == 0 and self.plotSettings['FitMode'] != 0:
+            return _("Trend Span")
+        return self.plotLabels[index]
+
     def getOptionKey(self, index):
         return ['FitDegree', 'Months'][index]
     
@@ -111,6 +129,13 @@ class SummaryPanel(wx.Panel):
         if self.isActive:
             self.generateData()
 
+    def onFitChoice(self, event):
+        self.plotSettings['FitMode'] = self.fitChoice.GetSelection()
+        self.optionText.Label = self.getOptionLabel(self.currentPlotIndex)
+        self.Layout()
+        # Only the trend changes, so re-use the sampled balances.
+        self.generateData(useCache=True)
+
     def onOptionSpin(self, event):
         self.plotSettings[self.getOptionKey(self.currentPlotIndex)] = event.EventObject.Value
         self.generateData(useCache=True)
@@ -126,9 +151,46 @@ class SummaryPanel(wx.Panel):
         self.isActive = False
 
     def generateData(self, useCache=False):
+        """
+        Plot the balances, re-using the last sampled points if useCache is True. Otherwise
+        the points are sampled in a worker thread and the current plot stays up until they
+        arrive. Only one worker runs at a time; requests made meanwhile replace each other,
+        so when dragging through dates only the latest range is computed and drawn.
+        """
         if useCache and self.cachedData is not None:
-            totals = self.cachedData
+            self.plotPanel.plotBalance(self.cachedData, self.plotSettings)
+            return
+
+        # Ask for just the points we will plot, rather than a total for every day,
+        # keeping the highs and lows in between so that spikes aren't lost.
+        request = (self.plotSettings['Granularity'], self.plotSettings['Account'], self.getDateRange())
+        if self.isGenerating:
+            self.pendingRequest = request
         else:
-            totals = self.bankController.Model.GetXTotals(self.plotSettings['Account'], daterange=self.getDateRange())
-            self.cachedData = totals
-        self.plotPanel.plotBalance(totals, self.plotSettings)
+            self.startGenerating(request)
+
+    def startGenerating(self, request):
+        granularity, account, daterange = request
+        self.isGenerating = True
+        self.dataJobID += 1
+        # Get the series here, since loading transactions uses the database and sends messages,
+        # which must happen on this thread. The model keeps it until the transactions change,
+        # so changing the range or granularity doesn't rebuild it; the worker only samples it.
+        series = self.bankController.Model.GetBalanceSeries(account)
+        delayedresult.startWorker(self.onDataGenerated, analyzers.sampleTotals,
+            wargs=(series, granularity), wkwargs={"daterange": daterange, "extremes": True}, jobID=self.dataJobID)
+
+    def onDataGenerated(self, result):
+        self.isGenerating = False
+        # If something newer was asked for in the meantime, these points are already stale.
+        if self.pendingRequest is not None:
+            request, self.pendingRequest = self.pendingRequest, None
+            self.startGenerating(request)
+            return
+        if result.getJobID() != self.dataJobID:
+            return
+
+        # This re-raises any exception from the worker.
+        points = result.get()
+        self.cachedData = points
+        self.plotPanel.plotBalance(points, self.plotSettings)
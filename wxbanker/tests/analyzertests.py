@@ -19,7 +19,10 @@
 #    along with wxBanker.  If not, see <http://www.gnu.org/licenses/>.
 
 from wxbanker.tests import testbase
-from wxbanker.analyzers import MonthlyAnalyzer
+from wxbanker import analyzers
+from wxbanker.analyzers import MonthlyAnalyzer, ForecastAnalyzer, PeriodTotals
+from wxbanker.bankobjects.recurringtransaction import RecurringTransaction
+from wxbanker.tests.testbase import tomorrow
 import unittest, datetime
 
 class AnalyzerTests(testbase.TestCaseWithController):
@@ -34,6 +37,11 @@ class AnalyzerTests(testbase.TestCaseWithController):
         monthly.Today = datetime.date(2010, 1, 15)
         return monthly
             
+    def createForecast(self, *args, **kwargs):
+        forecast = ForecastAnalyzer(*args, **kwargs)
+        forecast.Today = datetime.date(2010, 1, 15)
+        return forecast
+            
     def testMonthlyDateRangeDefault(self):
         monthly = self.createMonthly()
         start, end = monthly.GetDateRange()
@@ -69,4 +77,148 @@ class AnalyzerTests(testbase.TestCaseWithController):
             earnings,
             [('2009.01', 0), ('2009.02', 0), ('2009.03', 0), ('2009.04', 0), ('2009.05', 0), ('2009.06', 0),
              ('2009.07', 0), ('2009.08', 0), ('2009.09', 0), ('2009.10', 0), ('2009.11', 0), ('2009.12', 0)]
-        )
\ No newline at end of file
+        )
+
+    def testMonthlyPeriodEarnings(self):
+        for months in (1, 12, 24):
+            monthly = self.createMonthly(months=months)
+            self.assertEqual(
+                monthly.GetPeriodEarnings(self.Model.GetPeriodTotals()),
+                monthly.GetEarnings(self.Model.GetTransactions())
+            )
+
+    def testMonthlyPeriodEarningsEndToday(self):
+        monthly = MonthlyAnalyzer(months=1)
+        earnings = monthly.GetPeriodEarnings(self.Model.GetPeriodTotals())
+        # A transaction later this month hasn't happened yet, as with GetEarnings.
+        self.Model.Accounts[0].AddTransaction(1000, date=tomorrow)
+        self.assertEqual(monthly.GetPeriodEarnings(self.Model.GetPeriodTotals()), earnings)
+        self.assertEqual(earnings, monthly.GetEarnings(self.Model.GetTransactions()))
+
+    def testPeriodTotalsParseTagsWhenFirstNeeded(self):
+        a = self.Model.Accounts[0]
+        a.AddTransaction(10, "#rent", datetime.date(2009, 4, 1))
+        totals = PeriodTotals(self.Model)
+        self.assertEqual(totals.GetTotals(PeriodTotals.YEAR), {2009: 88})
+        self.assertFalse(totals._TagsIndexed)
+        
+        self.assertEqual(totals.GetTotals(PeriodTotals.YEAR, tag="rent"), {2009: 10})
+        self.assertTrue(totals._TagsIndexed)
+        a.AddTransaction(5, "#rent", datetime.date(2009, 5, 1))
+        self.assertEqual(totals.GetTotals(PeriodTotals.MONTH, tag="rent"), {2009*12 + 3: 10, 2009*12 + 4: 5})
+
+    def testPeriodBounds(self):
+        for date in (datetime.date(2009, 1, 1), datetime.date(2010, 2, 28), datetime.date(2012, 12, 31)):
+            for granularity in PeriodTotals.GRANULARITIES:
+                period = PeriodTotals.PeriodOf(granularity, date)
+                start = PeriodTotals.PeriodStart(granularity, period)
+                self.assertTrue(start <= date)
+                self.assertEqual(PeriodTotals.PeriodOf(granularity, start), period)
+                self.assertTrue(PeriodTotals.PeriodStart(granularity, period + 1) > date)
+        # Weeks start on Monday.
+        self.assertEqual(PeriodTotals.PeriodStart(PeriodTotals.WEEK, PeriodTotals.PeriodOf(PeriodTotals.WEEK, datetime.date(2010, 1, 15))), datetime.date(2010, 1, 11))
+
+    def testPeriodTotals(self):
+        totals = self.Model.GetPeriodTotals()
+        a = self.Model.Accounts[0]
+        b = self.Model.CreateAccount("B")
+        b.AddTransaction(100, "#rent", datetime.date(2009, 2, 1))
+        a.AddTransaction(10, "#Rent", datetime.date(2009, 4, 1))
+
+        quarters = totals.GetSeries(PeriodTotals.QUARTER, datetime.date(2009, 1, 1), datetime.date(2010, 3, 1))
+        self.assertEqual(quarters, [
+            (datetime.date(2009, 1, 1), 1 + 2 + 3 + 100), (datetime.date(2009, 4, 1), 4 + 5 + 6 + 10),
+            (datetime.date(2009, 7, 1), 7 + 8 + 9), (datetime.date(2009, 10, 1), 10 + 11 + 12), (datetime.date(2010, 1, 1), 0),
+        ])
+        self.assertEqual(totals.GetTotals(PeriodTotals.YEAR), {2009: 78 + 110})
+        self.assertEqual(totals.GetTotals(PeriodTotals.YEAR, account=b), {2009: 100})
+        self.assertEqual(totals.GetTotals(PeriodTotals.MONTH, tag="rent"), {2009*12 + 1: 100, 2009*12 + 3: 10})
+        weekly = totals.GetTotals(PeriodTotals.WEEK, account=a)
+        self.assertEqual(sum(weekly.values()), 88)
+        self.assertEqual(len(weekly), 13)
+
+    def testPeriodTotalsStayCurrent(self):
+        totals = self.Model.GetPeriodTotals()
+        a = self.Model.Accounts[0]
+        b = self.Model.CreateAccount("B")
+        march, april = 2009*12 + 2, 2009*12 + 3
+        t = a.Transactions[2]
+
+        t.Amount = 30
+        self.assertEqual(totals.GetTotals(PeriodTotals.MONTH)[march], 30)
+        t.Date = datetime.date(2009, 4, 2)
+        self.assertFalse(march in totals.GetTotals(PeriodTotals.MONTH))
+        self.assertEqual(totals.GetTotals(PeriodTotals.MONTH)[april], 34)
+        t.Description = "#food"
+        self.assertEqual(totals.GetTotals(PeriodTotals.MONTH, tag="food"), {april: 30})
+
+        a.MoveTransaction(t, b)
+        self.assertEqual(totals.GetTotals(PeriodTotals.MONTH, account=a)[april], 4)
+        self.assertEqual(totals.GetTotals(PeriodTotals.MONTH, account=b), {april: 30})
+        self.assertEqual(totals.GetTotals(PeriodTotals.MONTH, tag="food"), {april: 30})
+
+        b.RemoveTransaction(t)
+        self.assertEqual(totals.GetTotals(PeriodTotals.MONTH)[april], 4)
+        self.assertEqual(totals.GetTotals(PeriodTotals.MONTH, tag="food"), {})
+
+        # Transfers count on both sides.
+        a.AddTransaction(5, date=datetime.date(2009, 4, 3), source=b)
+        self.assertEqual(totals.GetTotals(PeriodTotals.MONTH, account=b), {april: -5})
+        self.assertEqual(totals.GetTotals(PeriodTotals.MONTH)[april], 4)
+
+    def testForecastOccurrencesMatchRRule(self):
+        forecast = self.createForecast(years=2)
+        a = self.Model.Accounts[0]
+        start = datetime.date(2009, 11, 20)
+        recurrings = [
+            a.AddRecurringTransaction(1, "", start, RecurringTransaction.DAILY, repeatEvery=3),
+            a.AddRecurringTransaction(1, "", start, RecurringTransaction.WEEKLY, repeatEvery=2, repeatOn=[1,0,1,0,0,0,1]),
+            a.AddRecurringTransaction(1, "", start, RecurringTransaction.MONTLY, endDate=datetime.date(2011, 5, 1)),
+            a.AddRecurringTransaction(1, "", start, RecurringTransaction.YEARLY),
+        ]
+        recurrings[0].LastTransacted = datetime.date(2010, 1, 10)
+        
+        begin, end = forecast.GetDateRange()
+        for recurring in recurrings:
+            # Anything due but not yet entered counts as today.
+            after = recurring.LastTransacted or recurring.Date - datetime.timedelta(days=1)
+            last = min(end, recurring.EndDate or end)
+            dates = recurring.GetRRule().between(recurring.DateToDatetime(after), recurring.DateToDatetime(last), inc=True)
+            expected = [max(0, (dt.date() - forecast.Today).days) for dt in dates if dt.date() > after]
+            self.assertEqual(list(forecast.GetOccurrences(recurring)), expected)
+
+    def testForecastBalances(self):
+        forecast = self.createForecast(years=1)
+        a = self.Model.Accounts[0]
+        b = self.Model.CreateAccount("B")
+        a.AddTransaction(100, date=datetime.date(2010, 2, 1))
+        # Due on 2010-01-01 and 2010-01-11 but not entered, then every 10 days.
+        a.AddRecurringTransaction(1, "", datetime.date(2010, 1, 1), RecurringTransaction.DAILY, repeatEvery=10)
+        # A monthly transfer from B, on the 20th.
+        a.AddRecurringTransaction(5, "", datetime.date(2010, 1, 20), RecurringTransaction.MONTLY, source=b)
+        
+        balances = forecast.GetBalances([a, b])
+        self.assertEqual(len(balances), 366)
+        self.assertEqual(balances[0], 78 + 2)
+        self.assertEqual(balances[5], 78 + 2)
+        # The transfer moves money between the two accounts, so only the daily one counts.
+        self.assertEqual(balances[6], 78 + 3)
+        self.assertEqual(balances[16], 78 + 4)
+        self.assertEqual(balances[17], 78 + 4 + 100)
+        # Two due, and then 36 more in the year from 2010-01-21.
+        self.assertEqual(balances[-1], 78 + 100 + 2 + 36)
+        
+        aTotals = forecast.GetTotals([a])
+        self.assertEqual(aTotals[0], (forecast.Today, 80.0))
+        self.assertEqual(aTotals[5], (datetime.date(2010, 1, 20), 85.0))
+        bTotals = forecast.GetTotals([b])
+        self.assertEqual(bTotals[5], (datetime.date(2010, 1, 20), -5.0))
+        self.assertEqual(bTotals[-1], (datetime.date(2011, 1, 15), -60.0))
+
+    def testForecastNeedsNumpy(self):
+        backup = analyzers.numpy
+        analyzers.numpy = None
+        try:
+            self.assertRaises(ImportError, self.Model.GetForecastTotals)
+        finally:
+            analyzers.numpy = backup
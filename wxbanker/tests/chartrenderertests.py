@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#    https://launchpad.net/wxbanker
+#    chartrenderertests.py: Copyright 2007-2010 Mike Rooney <mrooney@ubuntu.com>
+#
+#    This file is part of wxBanker.
+#
+#    wxBanker is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    wxBanker is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with wxBanker.  If not, see <http://www.gnu.org/licenses/>.
+
+from wxbanker.tests import testbase
+from wxbanker.tests.testbase import today, one
+from wxbanker.plots import chartrenderer
+from wxbanker.bankobjects import bankmodel
+import os, shutil, tempfile, unittest
+
+class ChartRendererTests(testbase.TestCaseWithControllerOnDisk):
+    def setUp(self):
+        testbase.TestCaseWithControllerOnDisk.setUp(self)
+        self.outdir = tempfile.mkdtemp()
+        model = self.Controller.Model
+        self.a = model.CreateAccount("Checking")
+        self.b = model.CreateAccount("all")
+        for i in range(10):
+            self.a.AddTransaction(10 * i, date=today - one * i)
+        self.b.AddTransaction(5)
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+        testbase.TestCaseWithControllerOnDisk.tearDown(self)
+
+    def testChartNames(self):
+        self.assertEqual(chartrenderer.getChartName(None, None), "all")
+        # The ID keeps names apart which would otherwise clash, even with the charts of all accounts.
+        self.assertEqual(chartrenderer.getChartName(1, "a b"), "a_b-1")
+        self.assertEqual(chartrenderer.getChartName(2, "a_b"), "a_b-2")
+        self.assertEqual(chartrenderer.getChartName(3, "all"), "all-3")
+        self.assertEqual(chartrenderer.getChartName(4, u"Épargne/2010"), u"Épargne_2010-4")
+        self.assertEqual(chartrenderer.getChartName(5, "?!"), "account-5")
+
+    def assertRenders(self, fileFormat):
+        paths = chartrenderer.renderCharts(self.DBFILE, self.outdir, fileFormat, 200, 150, processes=1)
+        names = ["all", "Checking-%i" % self.a.ID, "all-%i" % self.b.ID]
+        expected = []
+        for name in names:
+            for chart in ("balance", "monthly"):
+                expected.append(os.path.join(self.outdir, "%s-%s.%s" % (name, chart, fileFormat)))
+        self.assertEqual(sorted(paths), sorted(expected))
+        for path in paths:
+            self.assertTrue(os.path.getsize(path) > 0, path)
+
+    def testRenderPNG(self):
+        self.assertRenders("png")
+
+    def testRenderSVG(self):
+        self.assertRenders("svg")
+
+    def testRenderUnknownFormat(self):
+        self.assertRaises(ValueError, chartrenderer.renderCharts, self.DBFILE, self.outdir, "gif")
+
+    def testRenderWithoutMintLogin(self):
+        # Opening a bank with Mint.com enabled normally starts logging in from the keyring.
+        self.Controller.Model.MintEnabled = True
+        workers = []
+        backup = bankmodel.delayedresult.startWorker
+        bankmodel.delayedresult.startWorker = lambda *args, **kwargs: workers.append(args)
+        try:
+            self.assertRenders("png")
+        finally:
+            bankmodel.delayedresult.startWorker = backup
+        self.assertEqual(workers, [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -19,7 +19,7 @@
 #    along with wxBanker.  If not, see <http://www.gnu.org/licenses/>.
 
 from wxbanker.tests import testbase
-import unittest
+import unittest, datetime
 from wxbanker import currencies, currconvert
 
 class CurrConvertTest(unittest.TestCase):
@@ -39,5 +39,45 @@ class CurrConvertTest(unittest.TestCase):
         self.assertRaises(currconvert.ConversionException, lambda: self.CC.Convert(1, "FOO", "USD"))
         self.assertRaises(currconvert.ConversionException, lambda: self.CC.Convert(1, "USD", "BAR"))
 
+    def testConvertMany(self):
+        rate = self.CC.Exchanges['USD'] = 1.25
+        self.assertEqual(self.CC.ConvertMany([1, 2, -4], "EUR", "USD"), [1.25, 2.5, -5.0])
+        self.assertEqual(self.CC.ConvertMany((1, 2), "USD", "USD"), [1, 2])
+        self.assertEqual(self.CC.ConvertMany([], "USD", "EUR"), [])
+        self.assertRaises(currconvert.ConversionException, lambda: self.CC.ConvertMany([1], "FOO", "USD"))
+
+    def testRatesAreParsedOnceAndShared(self):
+        self.assertTrue(currconvert.CurrencyConverter.GetShared() is currconvert.CurrencyConverter.GetShared())
+        # Changing one converter's rates must not affect the others.
+        self.CC.Exchanges['USD'] = 1234.5
+        self.assertNotEqual(currconvert.CurrencyConverter().Exchanges['USD'], 1234.5)
+        self.assertNotEqual(currconvert.CurrencyConverter.GetShared().Exchanges['USD'], 1234.5)
+
+    def testConversionUsesRateOnDate(self):
+        d = datetime.date
+        self.CC.History = {"USD": ([d(2009, 1, 1), d(2009, 6, 1)], [1.5, 2.0]), "GBP": ([d(2009, 3, 1)], [0.5])}
+        
+        # Before the first rate we use the earliest, and without a date the latest known rates.
+        self.assertEqual(self.CC.Convert(1, "EUR", "USD", d(2008, 1, 1)), 1.5)
+        self.assertEqual(self.CC.Convert(1, "EUR", "USD", d(2009, 5, 31)), 1.5)
+        self.assertEqual(self.CC.Convert(1, "EUR", "USD", d(2009, 6, 1)), 2.0)
+        self.assertEqual(self.CC.Convert(1, "GBP", "USD", d(2010, 1, 1)), 4.0)
+        self.assertEqual(self.CC.Convert(1, "EUR", "USD"), self.CC.Exchanges["USD"])
+        
+        dates = [d(2008, 1, 1), d(2009, 2, 1), d(2009, 3, 1), d(2009, 6, 1), d(2009, 6, 2)]
+        expected = [self.CC.Convert(2, "GBP", "USD", date) for date in dates]
+        self.assertEqual(self.CC.ConvertSeries([2] * 5, dates, "GBP", "USD"), expected)
+        self.assertEqual(expected, [6.0, 6.0, 6.0, 8.0, 8.0])
+
+    def testOverriddenRateReplacesHistory(self):
+        d = datetime.date
+        self.CC.History = {"USD": ([d(2009, 1, 1)], [1.5])}
+        self.assertEqual(self.CC.Convert(1, "EUR", "USD", d(2009, 2, 1)), 1.5)
+        
+        # A rate set in Exchanges is used for every date, not just the latest.
+        self.CC.Exchanges["USD"] = 3.0
+        self.assertEqual(self.CC.Convert(1, "EUR", "USD", d(2009, 2, 1)), 3.0)
+        self.assertEqual(self.CC.ConvertSeries([1, 2], [d(2008, 1, 1), d(2009, 2, 1)], "EUR", "USD"), [3.0, 6.0])
+
 if __name__ == "__main__":
     unittest.main()
@@ -47,6 +47,36 @@ class CurrencyTest(unittest.TestCase):
         self.assertTrue(tinyNegative < 0)
         self.assertEqual(usd.float2str(tinyNegative), u'$0.00')
 
+    def testFormattingLeavesLocaleAlone(self):
+        def localeconv():
+            raise Exception("float2str should not use the global locale")
+        backup = locale.localeconv
+        locale.localeconv = localeconv
+        try:
+            self.assertEqual(currencies.EuroCurrency().float2str(-1234.5), u'-1 234,50 €')
+        finally:
+            locale.localeconv = backup
+
+    def testFormatterCacheIsBounded(self):
+        formatter = currencies.CurrencyFormatter(currencies.UnitedStatesCurrency().LOCALECONV)
+        formatter.CACHE_SIZE = 3
+        # The cached keys, from the least to the most recently used.
+        getKeys = lambda: sorted(formatter._Cache, key=lambda key: formatter._Cache[key][0])
+        for i in range(5):
+            self.assertEqual(formatter.Format(i), '$%i.00' % i)
+        self.assertEqual(getKeys(), [(2, False), (3, False), (4, False)])
+        
+        # A hit should become the most recent entry.
+        self.assertEqual(formatter.Format(2, withNick=False), '$2.00')
+        self.assertEqual(formatter.Format(2, withNick=True), 'USD $2.00')
+        self.assertEqual(getKeys(), [(4, False), (2, False), (2, True)])
+
+    def testFormattersAreShared(self):
+        usd = currencies.UnitedStatesCurrency()
+        self.assertTrue(usd.GetFormatter() is currencies.UnitedStatesCurrency().GetFormatter())
+        self.assertTrue(currencies.GetCurrency(1) is currencies.GetCurrency(1))
+        self.assertFalse(usd.GetFormatter() is currencies.EuroCurrency().GetFormatter())
+
     def testCurrencyLocalizes(self):
         russianLocale = testbase.LOCALES[1]
         self.assertEqual(locale.setlocale(locale.LC_ALL, russianLocale), russianLocale)
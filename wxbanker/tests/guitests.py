@@ -20,8 +20,9 @@
 
 from wxbanker.tests import testbase
 from wxbanker import main, controller
-import os, wx, unittest
+import os, wx, unittest, datetime
 from wxbanker.lib.pubsub import Publisher
+from wxbanker.refreshscheduler import RefreshScheduler
 
 class GUITests(testbase.TestCaseHandlingConfigBase):
     def setUp(self):
@@ -133,8 +134,77 @@ class GUITests(testbase.TestCaseHandlingConfigBase):
         
         # Make sure that a balance going to / coming from zero results in a visibility toggle.
         b.AddTransaction(-1)
+        # Balance changes are shown once the event is over, as the scheduled refreshes run.
+        RefreshScheduler.GetShared().Flush()
         self.assertEqual(self.AccountListCtrl.GetVisibleCount(), 0)
-        
+
+    def testAccountListRows(self):
+        accountList = self.AccountListCtrl
+        getRowNames = lambda: [accountList.getRow(row)[0] for row in range(accountList.accountList.GetItemCount())]
+        c = self.Model.CreateAccount("C")
+        a = self.Model.CreateAccount("A")
+        b = self.Model.CreateAccount("B")
+        a.AddTransaction(1)
+        c.AddTransaction(2)
+
+        # The rows are the visible accounts in order, with the current one selected.
+        self.assertEqual(accountList.GetVisibleCount(), 3)
+        self.assertEqual(getRowNames(), ["A", "B", "C", _("All accounts")])
+        self.assertEqual(accountList.accountList.GetSelection(), 1)
+        self.assertEqual(accountList.getAccountRow(2)[1], c.float2str(2))
+
+        Publisher.sendMessage("user.showzero_toggled", False)
+        try:
+            self.assertEqual(accountList.GetVisibleCount(), 2)
+            self.assertEqual(getRowNames(), ["A", "C", _("All accounts")])
+            self.assertCurrentAccount(a)
+            self.assertEqual(accountList.accountList.GetSelection(), 0)
+
+            # The rename box covers the row being renamed.
+            accountList.onRenameButton(None)
+            self.assertEqual(accountList.editCtrl.Value, "A")
+            self.assertEqual(accountList.editCtrl.Position.x, accountList.accountList.Position.x)
+            self.assertTrue(accountList.accountList.Position.y <= accountList.editCtrl.Position.y < accountList.accountList.Position.y + accountList.accountList.RowHeight)
+            accountList.onHideEditCtrl()
+
+            # Renaming keeps the selection on the account in its new row.
+            a.Name = "D"
+            self.assertEqual(getRowNames(), ["C", "D", _("All accounts")])
+            self.assertCurrentAccount(a)
+            self.assertEqual(accountList.accountList.GetSelection(), 1)
+
+            Publisher.sendMessage("user.account changed", None)
+            self.assertEqual(accountList.accountList.GetSelection(), 2)
+        finally:
+            Publisher.sendMessage("user.showzero_toggled", True)
+
+    def testAccountListArrowKeys(self):
+        accountList = self.AccountListCtrl
+        listBox = accountList.accountList
+        def pressKey(keyCode):
+            event = wx.KeyEvent(wx.wxEVT_KEY_DOWN)
+            event.m_keyCode = keyCode
+            event.SetEventObject(listBox)
+            listBox.GetEventHandler().ProcessEvent(event)
+        a = self.Model.CreateAccount("A")
+        b = self.Model.CreateAccount("B")
+        accountList.SelectItemByAccount(a)
+
+        # The arrow keys move through the accounts and on to the total, and back.
+        pressKey(wx.WXK_DOWN)
+        self.assertCurrentAccount(b)
+        pressKey(wx.WXK_DOWN)
+        self.assertCurrentAccount(None)
+        self.assertEqual(listBox.GetSelection(), 2)
+        pressKey(wx.WXK_DOWN)
+        self.assertCurrentAccount(None)
+        pressKey(wx.WXK_UP)
+        self.assertCurrentAccount(b)
+        self.assertEqual(listBox.GetSelection(), 1)
+        pressKey(wx.WXK_UP)
+        pressKey(wx.WXK_UP)
+        self.assertCurrentAccount(a)
+
     def testAppHasController(self):
         self.assertTrue( hasattr(self.App, "Controller") )
 
@@ -269,6 +339,82 @@ class GUITests(testbase.TestCaseHandlingConfigBase):
         self.OLV.SortBy(self.OLV.COL_DESCRIPTION, ascending=False)
         self.OLV.SortBy(self.OLV.COL_DATE, ascending=False)
         self.assertEqual(totals(), [13.25, 7.25, 2.25, 0.5])
+
+    def testOLVTotalsPartialUpdates(self):
+        """Test the totals stay right when only the rows after an edit are recomputed."""
+        def totals():
+            return [self.OLV.GetValueAt(self.OLV.GetObjectAt(i), 3) for i in range(len(self.OLV.GetObjects()))]
+
+        a = self.Model.CreateAccount("B")
+        self.OLV.SortBy(self.OLV.COL_DATE)
+        ts = [a.AddTransaction(i, date=testbase.today - datetime.timedelta(days=10-i)) for i in range(1, 6)]
+        self.assertEqual(totals(), [1, 3, 6, 10, 15])
+
+        # Edit the last one, then one in the middle.
+        ts[-1].Amount = 10
+        self.assertEqual(totals(), [1, 3, 6, 10, 20])
+        ts[2].Amount = 0
+        self.assertEqual(totals(), [1, 3, 3, 7, 17])
+
+        # Move the first one to the end, and remove one from the middle.
+        ts[0].Date = testbase.tomorrow
+        self.assertEqual(totals(), [2, 2, 6, 16, 17])
+        a.RemoveTransaction(ts[2])
+        self.assertEqual(totals(), [2, 6, 16, 17])
+
+    def testOLVAmountExtremesFollowEdits(self):
+        """Test the amounts the amount column is sized for stay the lowest and highest."""
+        a = self.Model.CreateAccount("A")
+        t1, t2, t3 = [a.AddTransaction(amount) for amount in (1, 5, 3)]
+        self.OLV._sizeAmounts()
+        self.assertEqual(self.OLV.amountExtremes, (t1, t2))
+
+        # Editing one past the highest makes it the highest.
+        t3.Amount = 100
+        self.assertEqual(self.OLV.amountExtremes, (t1, t3))
+
+        # Editing the highest means finding them again.
+        t3.Amount = -1
+        self.OLV._sizeAmounts()
+        self.assertEqual(self.OLV.amountExtremes, (t3, t2))
+
+    def testOLVSortByBalanceAfterEdit(self):
+        """Test sorting by balance uses the balances after an edit changed the later ones."""
+        a = self.Model.CreateAccount("A")
+        ts = [a.AddTransaction(amount, date=testbase.today - datetime.timedelta(days=3-i)) for i, amount in enumerate((1, 2, 3))]
+        self.OLV.SortBy(self.OLV.COL_TOTAL)
+        self.assertEqual(self.OLV.GetObjects(), ts)
+
+        # The first balance is now the highest, and the ones after it all go down.
+        ts[0].Amount = 10
+        ts[1].Amount = -9
+        self.OLV.SortBy(self.OLV.COL_TOTAL)
+        self.assertEqual(self.OLV.GetObjects(), [ts[1], ts[2], ts[0]])
+        self.OLV.SortBy(self.OLV.COL_DATE)
+
+    def testOLVCellStringsUpdate(self):
+        """Test the cached cell strings are rendered again when what they show changes."""
+        a = self.Model.CreateAccount("A")
+        t1 = a.AddTransaction(1, "First")
+        t2 = a.AddTransaction(2, "Second")
+        cell = self.OLV.GetStringValueAt
+
+        self.assertEqual(cell(t1, self.OLV.COL_DESCRIPTION), "First")
+        t1.Description = "Changed"
+        self.assertEqual(cell(t1, self.OLV.COL_DESCRIPTION), "Changed")
+
+        # Changing an amount changes the balance of the rows after it too.
+        self.assertEqual(cell(t2, self.OLV.COL_TOTAL), a.float2str(3))
+        t1.Amount = 5
+        self.assertEqual(cell(t1, self.OLV.COL_AMOUNT), a.float2str(5))
+        self.assertEqual(cell(t2, self.OLV.COL_TOTAL), a.float2str(7))
+
+        # Renaming the other account of a transfer changes its description.
+        b = self.Model.CreateAccount("B")
+        transfer = a.AddTransaction(3, source=b)[0]
+        self.assertEqual(cell(transfer, self.OLV.COL_DESCRIPTION), "Transfer from B")
+        b.Name = "C"
+        self.assertEqual(cell(transfer, self.OLV.COL_DESCRIPTION), "Transfer from C")
         
         
     def testSearch(self):
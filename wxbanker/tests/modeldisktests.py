@@ -189,6 +189,26 @@ class ModelDiskTests(testbase.TestCaseWithControllerOnDisk):
         self.assertEqual(len(repeatOn), 7)
         self.assertEqual(sum(repeatOn), 1)
         
+    def testRecurringTransactionRemovedBeforeTransactionsLoad(self):
+        model1 = self.Controller.Model
+        a = model1.CreateAccount("A")
+        rt = a.AddRecurringTransaction(1, "test", today, RecurringTransaction.DAILY)
+        rt.PerformTransactions()
+        self.assertEqual(len(a.Transactions), 1)
+
+        # Remove it from a fresh model which hasn't loaded the transactions of the account yet.
+        model2 = model1.Store.GetModel(useCached=False)
+        a2 = model2.Accounts[0]
+        self.assertEqual(a2._Transactions, None)
+        a2.RemoveRecurringTransaction(a2.RecurringTransactions[0])
+
+        # The child is orphaned, so it still loads as a normal transaction.
+        model3 = model1.Store.GetModel(useCached=False)
+        a3 = model3.Accounts[0]
+        self.assertEqual(model3.GetRecurringTransactions(), [])
+        self.assertEqual(len(a3.Transactions), 1)
+        self.assertEqual(a3.Transactions[0].RecurringParent, None)
+
     def testRecurringRepeatTypeIsStoredOnUpdate(self):
         model1 = self.Controller.Model
         a = model1.CreateAccount("A")
@@ -348,6 +368,8 @@ class ModelDiskTests(testbase.TestCaseWithControllerOnDisk):
         rt2 = model2.GetRecurringTransactions()[0]
         self.assertEqual(t2.RecurringParent, rt)
         self.assertTrue(t2.RecurringParent is rt2)
+        self.assertEqual(rt2.GetChildren(), [t2])
+        self.assertTrue(rt2.GetChildren()[0] is t2)
         
     def testLastAccountIsStored(self):
         model1 = self.Controller.Model
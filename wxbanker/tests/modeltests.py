@@ -189,7 +189,8 @@ class ModelTests(testbase.TestCaseWithController):
         model = self.Controller.Model
 
         self.assertEqual(len(model.Accounts), 2)
-        self.assertEqual(model.GetTransactions(), [atrans, btrans])
+        # Transactions are ordered by date and then ID, and the source side of a transfer is made first.
+        self.assertEqual(model.GetTransactions(), [btrans, atrans])
         self.assertEqual(model.Balance, 0)
         self.assertEqual(len(a.Transactions), 1)
         self.assertEqual(len(b.Transactions), 1)
@@ -232,6 +233,31 @@ class ModelTests(testbase.TestCaseWithController):
         
         self.assertEqual(model.GetDateRange(), (yesterday, today))
         
+    def testAllTransactionsAreSortedAndKeptCurrent(self):
+        model = self.Controller.Model
+        a = model.CreateAccount("A")
+        b = model.CreateAccount("B")
+        t1 = a.AddTransaction(1, date=today)
+        t2 = b.AddTransaction(2, date=yesterday)
+        self.assertEqual(model.GetTransactions(), [t2, t1])
+        
+        # The returned list is a copy, so modifying it shouldn't affect the model.
+        model.GetTransactions().pop()
+        self.assertEqual(model.GetTransactions(), [t2, t1])
+        
+        t3 = a.AddTransaction(3, date=tomorrow)
+        self.assertEqual(model.GetTransactions(), [t2, t1, t3])
+        
+        t2.Date = tomorrow + datetime.timedelta(days=1)
+        self.assertEqual(model.GetTransactions(), [t1, t3, t2])
+        self.assertEqual(model.GetDateRange(), (today, t2.Date))
+        
+        a.RemoveTransaction(t1)
+        self.assertEqual(model.GetTransactions(), [t3, t2])
+        
+        b.Remove()
+        self.assertEqual(model.GetTransactions(), [t3])
+        
     def testAccountRename(self):
         model = self.Controller.Model
         a = model.CreateAccount("A")
@@ -323,6 +349,43 @@ class ModelTests(testbase.TestCaseWithController):
         self.assertEqual(atrans.Description, "Transfer from C")
         self.assertEqual(ctrans.Description, "Transfer to A")
         
+    def testSampledTotals(self):
+        model = self.Controller.Model
+        a = model.CreateAccount("A")
+        b = model.CreateAccount("B")
+        a.AddTransaction(1, date=today - datetime.timedelta(days=9))
+        a.AddTransaction(2, date=today)
+        b.AddTransaction(4, date=today - datetime.timedelta(days=5))
+        
+        self.assertEqual(model.GetSampledTotals(10, a), ([1.0] * 9 + [3.0], today - datetime.timedelta(days=9), 0.9))
+        self.assertEqual(model.GetSampledTotals(2, b), ([4.0, 4.0], today - datetime.timedelta(days=5), 2.5))
+        self.assertEqual(model.GetSampledTotals(5, None, (yesterday, today))[0], [5.0, 5.0, 5.0, 5.0, 7.0])
+        
+        # Many accounts are sampled over their shared range.
+        points, start, every = model.GetSampledTotals(5, [a, b])
+        self.assertEqual(points, [[1.0, 1.0, 1.0, 1.0, 3.0], [0.0, 0.0, 4.0, 4.0, 4.0]])
+        self.assertEqual((start, every), (today - datetime.timedelta(days=9), 1.8))
+        
+    def testTransferDescriptionsStayCurrent(self):
+        model = self.Controller.Model
+        a = model.CreateAccount("A")
+        b = model.CreateAccount("B")
+        atrans, btrans = a.AddTransaction(1, source=b)
+        self.assertEqual(atrans.Description, "Transfer from B")
+        
+        # The description is cached, but must follow renames, edits and the direction of the transfer.
+        b.Name = "C"
+        self.assertEqual(atrans.Description, "Transfer from C")
+        self.assertEqual(btrans.Description, "Transfer to A")
+        atrans.Description = "pizza"
+        self.assertEqual(atrans.Description, "Transfer from C (pizza)")
+        self.assertEqual(btrans.Description, "Transfer to A (pizza)")
+        atrans.Amount = -1
+        self.assertEqual(atrans.Description, "Transfer to C (pizza)")
+        self.assertEqual(btrans.Description, "Transfer from A (pizza)")
+        atrans.LinkedTransaction = None
+        self.assertEqual(atrans.Description, "pizza")
+        
     def testCanMoveTransferDestination(self):
         model = self.Controller.Model
         a = model.CreateAccount("A")
@@ -348,6 +411,97 @@ class ModelTests(testbase.TestCaseWithController):
         self.assertEqual(btrans.Description, "Transfer to C")
         self.assertEqual(ctrans.Description, "Transfer from B")
         
+    def testBalanceSeriesIsCachedUntilChanged(self):
+        model = self.Controller.Model
+        a = model.CreateAccount("A")
+        b = model.CreateAccount("B")
+        t = a.AddTransaction(1, date=yesterday)
+        b.AddTransaction(2, date=today)
+        
+        series = model.GetBalanceSeries(a)
+        allSeries = model.GetBalanceSeries()
+        self.assertEqual(series, ([yesterday.toordinal()], [1.0]))
+        self.assertTrue(model.GetBalanceSeries(a) is series)
+        self.assertTrue(model.GetBalanceSeries() is allSeries)
+        
+        # Changing one account leaves the others' series alone.
+        bSeries = model.GetBalanceSeries(b)
+        t.Amount = 3
+        self.assertEqual(model.GetBalanceSeries(a), ([yesterday.toordinal()], [3.0]))
+        self.assertEqual(model.GetBalanceSeries(), ([yesterday.toordinal(), today.toordinal()], [3.0, 2.0]))
+        self.assertTrue(model.GetBalanceSeries(b) is bSeries)
+        
+        a.AddTransaction(4, date=today)
+        self.assertEqual(model.GetBalanceSeries(a)[1], [3.0, 4.0])
+        t.Date = today
+        self.assertEqual(model.GetBalanceSeries(a)[0], [today.toordinal()] * 2)
+        
+        series = model.GetBalanceSeries(a)
+        Publisher.sendMessage("currency_changed", 0)
+        self.assertFalse(model.GetBalanceSeries(a) is series)
+        
+    def testConvertedAmountsMatchBalances(self):
+        from wxbanker.currconvert import CurrencyConverter
+        model = self.Controller.Model
+        a = model.CreateAccount("A")
+        a.Currency = currencies.EuroCurrency()
+        t1 = a.AddTransaction(1, date=yesterday)
+        t2 = a.AddTransaction(2, date=today)
+        usd = currencies.CurrencyList.index(currencies.UnitedStatesCurrency)
+        
+        converter = CurrencyConverter.GetShared()
+        converter.History = {"USD": ([yesterday, today], [5.0, 1.0])}
+        converter.Exchanges["USD"] = converter._SharedExchanges["USD"] = 2.0
+        try:
+            # By default amounts use the latest rates, so they add up to the converted balance.
+            self.assertEqual(model.GetAmounts([t1, t2], usd), [2.0, 4.0])
+            self.assertEqual(sum(model.GetAmounts([t1, t2], usd)), a.GetBalance(usd))
+            self.assertEqual(t1.GetAmount(usd), 2.0)
+            # Converting at the rates on their dates is asked for explicitly.
+            self.assertEqual(model.GetAmounts([t1, t2], usd, dated=True), [5.0, 2.0])
+            self.assertEqual(t1.GetAmount(usd, dated=True), 5.0)
+        finally:
+            CurrencyConverter._Shared = CurrencyConverter._SharedExchanges = CurrencyConverter._SharedHistory = None
+        
+    def testMoveTransactionsCreatedMessages(self):
+        model = self.Controller.Model
+        a = model.CreateAccount("A")
+        b = model.CreateAccount("B")
+        c = model.CreateAccount("C")
+        t1 = a.AddTransaction(1)
+        t2, ctrans = a.AddTransaction(2, source=c)
+        
+        # The destination gets one message with everything moved, and the other side
+        # of the transfer is re-created and announced in its own account.
+        created = []
+        def listener(message):
+            created.append(message.data)
+        Publisher.subscribe(listener, "transactions.created")
+        a.MoveTransactions([t1, t2], b)
+        Publisher.unsubscribe(listener)
+        
+        self.assertEqual(created, [(c, c.Transactions), (b, [t1, t2])])
+        self.assertEqual(c.Transactions[0].LinkedTransaction, t2)
+        self.assertEqual((a.Balance, b.Balance, c.Balance), (0, 3, -2))
+        
+    def testImportedTransactionsCreatedOnce(self):
+        from wxbanker.csvimporter import CsvImporter, CsvImporterProfileManager
+        model = self.Controller.Model
+        a = model.CreateAccount("A")
+        profile = CsvImporterProfileManager().getProfile("mint")
+        transactions = CsvImporter().getTransactionsFromFile(testbase.fixturefile("mint.csv"), profile).Transactions
+        
+        created = []
+        def listener(message):
+            created.append(message.data)
+        Publisher.subscribe(listener, "transactions.created")
+        a.AddTransactions(transactions)
+        Publisher.unsubscribe(listener)
+        
+        self.assertEqual(created, [(a, transactions)])
+        self.assertEqual(a.Transactions, transactions)
+        self.assertAlmostEqual(a.Balance, 29.46)
+        
     def testTransferDescriptionWithoutDescription(self):
         model = self.Controller.Model
         a = model.CreateAccount("A")
@@ -452,6 +606,24 @@ class ModelTests(testbase.TestCaseWithController):
         t.Date = None
         self.assertEqual(t.Date, datetime.date.today())
         
+    def testTransactionDateMassagingFastPaths(self):
+        model = self.Controller.Model
+        t = model.CreateAccount("A").AddTransaction(1)
+        # Dates should be passed through untouched, and datetimes truncated.
+        d = datetime.date(2008, 1, 6)
+        t.Date = d
+        self.assertTrue(t.Date is d)
+        t.Date = datetime.datetime(2008, 1, 6, 12, 30)
+        self.assertEqual(t.Date, d)
+        # Store and ISO formatted strings should parse to the same (cached) object.
+        t.Date = u"2008/01/06"
+        first = t.Date
+        t.Date = u"2008/01/06"
+        self.assertEqual(first, d)
+        self.assertTrue(t.Date is first)
+        t.Date = "2008-1-6"
+        self.assertEqual(t.Date, d)
+        
     def testDeletingAccountDoesNotDeleteSiblingLinkedTransfers(self):
         """If you close (delete) an account, it is still true that the transfers occurred."""
         a, b, atrans, btrans = self.createLinkedTransfers()
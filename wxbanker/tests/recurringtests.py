@@ -22,6 +22,7 @@ from wxbanker.tests import testbase
 import unittest, datetime
 
 from bankobjects.recurringtransaction import RecurringTransaction
+from wxbanker.lib.pubsub import Publisher
 from testbase import today, yesterday, tomorrow, one
 
 class RecurringTest(testbase.TestCaseWithController):
@@ -46,6 +47,25 @@ class RecurringTest(testbase.TestCaseWithController):
         rt.PerformTransactions()
         self.assertLength(rt.GetChildren(), 1)
         
+    def testGetChildrenOfTransfer(self):
+        model, account = self.createAccount()
+        account2 = model.CreateAccount("B")
+        rt = account.AddRecurringTransaction(5, "test", yesterday, RecurringTransaction.DAILY, source=account2)
+        rt.PerformTransactions()
+        
+        # The linked transactions in the source account are not children.
+        self.assertEqual(rt.GetChildren(), sorted(account.Transactions))
+        self.assertLength(rt.GetChildren(), 2)
+        
+        # Orphaning a child should remove it from the children.
+        child = account.Transactions[0]
+        child.RecurringParent = None
+        self.assertEqual(rt.GetChildren(), [account.Transactions[1]])
+        
+        # As should moving or removing it.
+        account.RemoveTransaction(account.Transactions[1])
+        self.assertEqual(rt.GetChildren(), [])
+        
     def testCanDeleteRecurringTransaction(self):
         model, account = self.createAccount()
         
@@ -209,6 +229,35 @@ class RecurringTest(testbase.TestCaseWithController):
         self.assertEqual(account.Transactions[0].Amount, 5)
         self.assertEqual(account2.Transactions[0].Amount, -5)
         
+    def testPerformRecurringTransactionsInBulk(self):
+        model, account = self.createAccount()
+        account2 = model.CreateAccount("B")
+        twoDaysAgo = today - datetime.timedelta(days=2)
+        rt1 = account.AddRecurringTransaction(1, "one", twoDaysAgo, RecurringTransaction.DAILY)
+        rt2 = account.AddRecurringTransaction(5, "two", yesterday, RecurringTransaction.DAILY, source=account2)
+        
+        due = model.GetDueRecurringTransactions()
+        self.assertEqual(due, [(rt1, [twoDaysAgo, yesterday, today]), (rt2, [yesterday, today])])
+        
+        # Each account involved should be notified just once, with all of its new transactions.
+        created = []
+        def listener(message):
+            created.append(message.data)
+        Publisher.subscribe(listener, "transactions.created")
+        model.PerformRecurringTransactions()
+        Publisher.unsubscribe(listener)
+        
+        self.assertEqual([(a, len(ts)) for a, ts in created], [(account2, 2), (account, 5)])
+        self.assertEqual(account.Balance, 13)
+        self.assertEqual(account2.Balance, -10)
+        self.assertEqual(model.GetDueRecurringTransactions(), [])
+        
+        # Transfers should be linked both ways, and both sides know their recurring parent.
+        for t in rt2.GetChildren():
+            self.assertEqual(t.LinkedTransaction.LinkedTransaction, t)
+            self.assertEqual(t.LinkedTransaction.RecurringParent, rt2)
+        self.assertLength(rt1.GetChildren(), 3)
+        
     def testDoesntMakeTransactionsAfterLastUpdated(self):
         model, account = self.createAccount()
         rt = account.AddRecurringTransaction(1, "test", today, RecurringTransaction.DAILY)
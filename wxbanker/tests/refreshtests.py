@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#    https://launchpad.net/wxbanker
+#    refreshtests.py: Copyright 2007-2010 Mike Rooney <mrooney@ubuntu.com>
+#
+#    This file is part of wxBanker.
+#
+#    wxBanker is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    wxBanker is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with wxBanker.  If not, see <http://www.gnu.org/licenses/>.
+
+from wxbanker.tests import testbase
+import unittest
+from wxbanker.refreshscheduler import RefreshScheduler
+
+
+class View(object):
+    def __init__(self):
+        self.Refreshes = []
+        self.Layouts = 0
+
+    def refreshRows(self, rows):
+        self.Refreshes.append(rows)
+
+    def layout(self):
+        self.Layouts += 1
+
+
+class RefreshSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.Flushes = []
+        self.Scheduler = RefreshScheduler(callAfter=self.Flushes.append)
+
+    def testRefreshesAreCoalesced(self):
+        view = View()
+        for row in (1, 2, 2, 3):
+            self.Scheduler.Schedule(view.refreshRows, row)
+            self.Scheduler.Schedule(view.layout)
+
+        # Nothing happens until the flush, which is only asked for once.
+        self.assertEqual(view.Refreshes, [])
+        self.assertEqual(self.Flushes, [self.Scheduler.Flush])
+
+        self.Scheduler.Flush()
+        self.assertEqual(view.Refreshes, [set([1, 2, 3])])
+        self.assertEqual(view.Layouts, 1)
+
+        # Another change asks for another flush.
+        self.Scheduler.Schedule(view.layout)
+        self.assertEqual(len(self.Flushes), 2)
+        self.Scheduler.Flush()
+        self.assertEqual(view.Layouts, 2)
+
+    def testFlushOwner(self):
+        view, other = View(), View()
+        self.Scheduler.Schedule(view.layout)
+        self.Scheduler.Schedule(other.layout)
+
+        self.Scheduler.Flush(view)
+        self.assertEqual((view.Layouts, other.Layouts), (1, 0))
+
+        self.Scheduler.Flush()
+        self.assertEqual((view.Layouts, other.Layouts), (1, 1))
+
+    def testFailingRefreshDoesNotStopOthers(self):
+        view = View()
+        def fail():
+            raise ValueError("refresh failed")
+        def failAgain():
+            raise KeyError("refresh failed again")
+        self.Scheduler.Schedule(fail)
+        self.Scheduler.Schedule(view.refreshRows, 1)
+        self.Scheduler.Schedule(failAgain)
+        self.Scheduler.Schedule(view.layout)
+
+        # The refreshes after a failed one still happen, and then the first error is raised.
+        self.assertRaises(ValueError, self.Scheduler.Flush)
+        self.assertEqual(view.Refreshes, [set([1])])
+        self.assertEqual(view.Layouts, 1)
+
+        # Nothing is left over for the next flush.
+        self.Scheduler.Flush()
+        self.assertEqual(view.Layouts, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -19,7 +19,7 @@
 #    along with wxBanker.  If not, see <http://www.gnu.org/licenses/>.
 
 from wxbanker.tests import testbase
-from wxbanker import bankobjects
+from wxbanker import bankobjects, analyzers
 import unittest, datetime
 from wxbanker.tests.testbase import today, yesterday, one
 from wxbanker.plots.baseplot import BasePlot
@@ -31,6 +31,12 @@ class SummaryTests(testbase.TestCaseWithController):
         self.basePlot = BasePlot()
     
     def get(self, transactionsData, numPoints, *args):
+        result = self.getFromTotals(transactionsData, numPoints, *args)
+        # The model should sample exactly the same points directly.
+        self.assertEqual(self.Model.GetSampledTotals(numPoints, *args), result)
+        return result
+    
+    def getFromTotals(self, transactionsData, numPoints, *args):
         # Remove all existing accounts, it is assumed that none exist
         for account in self.Model.Accounts:
             self.Model.RemoveAccount(account.Name)
@@ -98,10 +104,85 @@ class SummaryTests(testbase.TestCaseWithController):
         amounts, start, delta = self.get([(today-one, 3), (today, 2), (today+one, 1)], 3, None, (today, today+one))
         self.assertEqual(amounts, [5.0, 5.0, 6.0])
         
+    def testSampleBalanceSeries(self):
+        # The summary tab reads the series from the model and samples them in a worker thread.
+        self.getFromTotals([(today-one*2, 3), (today, 1)], 5)
+        series = self.Model.GetBalanceSeries()
+        self.assertEqual(series, ([(today-one*2).toordinal(), today.toordinal()], [3, 1]))
+        self.assertEqual(analyzers.sampleTotals(series, 5, extremes=True), self.Model.GetSampledTotals(5, extremes=True))
+        
     def testDateRangeEndingBeforeTodayWorks(self):
         amounts, start, delta = self.get([(today-one*2, 3), (today-one, 2), (today, 1)], 2, None, (today-one*2, today-one))
         # Make sure 'today' isn't counted as it isn't in our date range.
         self.assertEqual(amounts, [3.0, 5.0])
         
+    def getExtremes(self, transactionsData, numPoints, daterange=None):
+        """Return the sampled extremes, and what they should be from the total of every day."""
+        self.getFromTotals(transactionsData, numPoints)
+        result = self.Model.GetSampledTotals(numPoints, daterange=daterange, extremes=True)
+        
+        totals = self.Model.GetXTotals(daterange=daterange)
+        startDate, endDate = totals[0][0], totals[-1][0]
+        buckets = numPoints // 2
+        delta = datetime.timedelta(1.0 * (endDate - startDate).days / buckets)
+        expected, balance = [], totals[0][1]
+        for i in range(buckets):
+            bound = min(startDate + delta * (i+1), endDate)
+            # A bucket without any days of its own still has the balance carried into it.
+            values = [total for date, total in totals if date <= bound and (i == 0 or date > previous)] or [balance]
+            low, high = values.index(min(values)), values.index(max(values))
+            expected.extend([values[min(low, high)], values[max(low, high)]])
+            balance = [total for date, total in totals if date <= bound][-1]
+            previous = bound
+        return result, expected
+    
+    def testExtremesKeepSpikes(self):
+        # A transfer in and back out a week later, which sampling only the ends of each bucket misses.
+        data = [(today-one*300, 10), (today-one*148, 1000), (today-one*141, -1000)]
+        self.assertEqual(max(self.get(data, 10)[0]), 10)
+        points, start, delta = self.Model.GetSampledTotals(10, extremes=True)
+        self.assertEqual(len(points), 10)
+        self.assertEqual(max(points), 1010)
+        self.assertEqual(points[-1], 10)
+        self.assertEqual(start, today-one*300)
+        self.assertEqual(delta, 30.0)
+        
+    def testExtremesMatchDailyTotals(self):
+        data = [(today-one*((i * 37) % 400), ((i * 7919) % 201) - 100) for i in range(150)]
+        for numPoints in (2, 7, 20, 100, 1000):
+            result, expected = self.getExtremes(data, numPoints)
+            self.assertEqual(result[0], expected)
+            result, expected = self.getExtremes(data, numPoints, (today-one*200, today-one*150))
+            self.assertEqual(result[0], expected)
+            
+    def testPolynomialTrend(self):
+        points = [(x, 3 - 2*x + .5*x**2) for x in range(10)]
+        for x, y in self.basePlot.getPolyData(points, N=2):
+            self.assertAlmostEqual(y, 3 - 2*x + .5*x**2)
+        
+        line = self.basePlot.getTrendData([(0, 1), (1, 2), (2, 3)], {"FitDegree": 1})
+        self.assertEqual([x for x, y in line], [0, 1, 2])
+        for (x, y), expected in zip(line, [1, 2, 3]):
+            self.assertAlmostEqual(y, expected)
+            
+    def testMovingAverageTrend(self):
+        points = [(0, 1), (1, 3), (2, 5), (3, 10)]
+        self.assertEqual(self.basePlot.getMovingAverageData(points, 2), [(0, 1.0), (1, 2.0), (2, 4.0), (3, 7.5)])
+        self.assertEqual(self.basePlot.getMovingAverageData(points, 1), [(0, 1.0), (1, 3.0), (2, 5.0), (3, 10.0)])
+        self.assertEqual(self.basePlot.getTrendData(points, {"FitMode": 1, "FitDegree": 10})[-1], (3, 4.75))
+        
+    def testExponentialTrend(self):
+        ys = [((i * 7919) % 101) - 50.0 for i in range(2000)]
+        points = list(enumerate(ys))
+        for N in (1, 2, 5, 24):
+            alpha = 2.0 / (N + 1)
+            expected = [ys[0]]
+            for y in ys[1:]:
+                expected.append(alpha * y + (1 - alpha) * expected[-1])
+            smoothed = self.basePlot.getTrendData(points, {"FitMode": 2, "FitDegree": N})
+            for (x, y), e in zip(smoothed, expected):
+                self.assertAlmostEqual(y, e, 6)
+        self.assertEqual(self.basePlot.getExponentialData([], 3), [])
+        
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -19,7 +19,7 @@
 #    along with wxBanker.  If not, see <http://www.gnu.org/licenses/>.
 
 from wxbanker.tests import testbase
-from wxbanker.bankobjects.tag import Tag, EmptyTagException
+from wxbanker.bankobjects.tag import Tag, TagRegistry, EmptyTagException
 
 class TagTests(testbase.TestCaseWithController):
     def getTransaction(self):
@@ -134,7 +134,22 @@ class TagTests(testbase.TestCaseWithController):
         self.assertEqual(t2.Tags, set())
         self.assertEqual(model.Tags, set([Tag("bar")]))
         
+    def testTagsAreParsedLazily(self):
+        t = self.getTransaction()
+        t.Description = "lunch #food"
+        self.assertEqual(t._Tags, None)
+        # The model should still know about tags which haven't been accessed yet.
+        self.assertEqual(self.Model.Tags, set([Tag("food")]))
+        self.assertEqual(t.Tags, set([Tag("food")]))
+        
+    def testTagsAreInterned(self):
+        a = self.Model.CreateAccount("A")
+        t1 = a.AddTransaction(1, "lunch #food")
+        t2 = a.AddTransaction(1, "dinner #Food")
+        self.assertTrue(list(t1.Tags)[0] is list(t2.Tags)[0])
+        self.assertTrue(TagRegistry.Get("food") is TagRegistry.Get(Tag("food")))
         
 
+
 if __name__ == "__main__":
     import unittest; unittest.main()
\ No newline at end of file
@@ -28,11 +28,12 @@ TODO (for feature parity):
 - handle batch events at UI level
 """
 
-import threading
 import wx, datetime
 from wxbanker.lib.pubsub import Publisher
 from wxbanker.ObjectListView import GroupListView, ColumnDefn, CellEditorRegistry
 from wxbanker import bankcontrols, tagtransactiondialog
+from wxbanker.bankobjects.transaction import Transaction
+from wxbanker.refreshscheduler import RefreshScheduler
 
 from wxbanker.currencies import GetCurrencyInt
 
@@ -45,6 +46,22 @@ class TransactionOLV(GroupListView):
         self.LastSearch = None
         self.CurrentAccount = None
         self.BankController = bankController
+        # The converted amounts and running totals of the rows as of the last refreshTotals, along
+        # with the list of rows and the sort they were in, so edits only need to recompute from their row on.
+        self.totalRows = None
+        self.totalAmounts = []
+        self.totals = []
+        self.totalsSort = None
+        # The transactions with the lowest and highest amounts, or None when they need finding again.
+        self.amountExtremes = None
+        # The widths of rendered amounts, by font.
+        self.textWidths = {}
+        # The rendered strings of the cells of each transaction, by column, so repainting and scrolling
+        # only format a row once. Transfer descriptions go stale when an account is renamed, see Transaction.
+        self.cellStrings = {}
+        self.cellsGeneration = Transaction._DescriptionGeneration
+        # Likewise for the cached sort keys, see _SortObjects.
+        self.sortKeysGeneration = Transaction._DescriptionGeneration
 
         self.showGroups = False
         #WXTODO: figure out these (and the text color, or is that already?) from theme (LP: ???)
@@ -84,11 +101,13 @@ class TransactionOLV(GroupListView):
             (self.onSearchCancelled, "SEARCH.CANCELLED"),
             (self.onSearchMoreToggled, "SEARCH.MORETOGGLED"),
             (self.onTransactionAdded, "transaction.created"),
+            (self.onTransactionsAdded, "transactions.created"),
             (self.onTransactionsRemoved, "transactions.removed"),
             (self.onCurrencyChanged, "currency_changed"),
             (self.onShowCurrencyNickToggled, "controller.show_currency_nick_toggled"),
-            (self.updateTotals, "ormobject.updated.Transaction.Amount"),
+            (self.onTransactionAmountUpdated, "ormobject.updated.Transaction.Amount"),
             (self.onTransactionDateUpdated, "ormobject.updated.Transaction.Date"),
+            (self.onTransactionUpdated, "ormobject.updated.Transaction"),
         )
 
         for callback, topic in self.Subscriptions:
@@ -101,13 +120,38 @@ class TransactionOLV(GroupListView):
         search and have a subset of transactions.
         """
         # Remove any previously cached totals, to fix search totals.
+        self.clearCellStrings()
         GroupListView.SetObjects(self, objs, *args, **kwargs)
         self.updateTotals()
+        self.amountExtremes = None
 
         # Force a re-size here, in the case that the vscrollbar-needed state
         # changed by this set account, to size correctly.
         wx.CallLater(50, self._ResizeSpaceFillingColumns)
         
+    def GetStringValueAt(self, modelObject, columnIndex):
+        """Return the rendered value of the cell, formatting it only if it hasn't been already."""
+        if self.cellsGeneration != Transaction._DescriptionGeneration:
+            self.clearCellStrings()
+        cells = self.cellStrings.get(modelObject)
+        if cells is None:
+            cells = self.cellStrings[modelObject] = {}
+        value = cells.get(columnIndex)
+        if value is None:
+            value = cells[columnIndex] = GroupListView.GetStringValueAt(self, modelObject, columnIndex)
+        return value
+
+    def _SortObjects(self, modelObjects=None, sortColumn=None, secondarySortColumn=None):
+        # Renaming an account changes the descriptions of its transfers without updating them.
+        if self.sortKeysGeneration != Transaction._DescriptionGeneration:
+            self.InvalidateSortKeys()
+            self.sortKeysGeneration = Transaction._DescriptionGeneration
+        GroupListView._SortObjects(self, modelObjects, sortColumn, secondarySortColumn)
+
+    def clearCellStrings(self):
+        self.cellStrings = {}
+        self.cellsGeneration = Transaction._DescriptionGeneration
+
     def IsSearchActive(self):
         return self.GrandParent.searchActive
     
@@ -115,10 +159,24 @@ class TransactionOLV(GroupListView):
         self.GrandParent.searchActive = value
         
     def onTransactionDateUpdated(self, message):
+        self.moveObject(message.data)
+
+    def onTransactionUpdated(self, message):
+        # Any attribute of the transaction may be shown, so render all its cells again and sort it anew.
+        self.cellStrings.pop(message.data, None)
+        self.InvalidateSortKeys([message.data])
+        RefreshScheduler.GetShared().Schedule(self.refreshRows, message.data)
+
+    def onTransactionAmountUpdated(self, message):
         transaction = message.data
-        self.RefreshObject(transaction)
-        self.SortBy(self.SORT_COL)
-        self.updateTotals()
+        self.refreshTotals(self.getFirstIndex([transaction]))
+        # If this was the lowest or highest amount, it may not be any more,
+        # and if it is shown, it may now be past one of them.
+        if self.GetIndexOf(transaction) == -1:
+            self.updateAmountExtremes(removed=[transaction])
+        else:
+            self.updateAmountExtremes(added=[transaction], removed=[transaction])
+            self.sizeAmounts()
 
     def getDateAndIDOf(self, transaction):
         # A date and ID two-tuple is used to allow for correct sorting
@@ -126,44 +184,126 @@ class TransactionOLV(GroupListView):
         return (transaction.Date, transaction.ID)
 
     def setDateOf(self, transaction, date):
+        # onTransactionDateUpdated moves the row to its new place.
         transaction.Date = date
-        self.Freeze()
-        self.SortBy(self.SORT_COL)
-        self.Thaw()
         
     def setAmount(self, transaction, amount):
+        # The order doesn't change, and onTransactionAmountUpdated updates the totals after it.
         transaction.Amount = amount
-        self.Freeze()
-        self.SortBy(self.SORT_COL)
-        self.Thaw()
+
+    def getSortValue(self, modelObject):
+        """Return the (cached) key the sort column sorts the object by, as _SortObjects does."""
+        return self._GetSortKey(modelObject, self.GetSortColumn())
+
+    def moveObject(self, modelObject):
+        """
+        Move an object whose date changed to its place in the list sorted by date,
+        by bisecting for it rather than sorting every row again. Only the rows between its
+        old and new places are re-indexed, and only the totals from there on recomputed.
+        """
+        objects = self.modelObjects
+        if (self.sortColumnIndex, self.sortAscending) != (self.SORT_COL, True) or self.showGroups or self.innerList is not objects:
+            # The rows aren't simply sorted by date, so sort them all as usual.
+            self.SortBy(self.SORT_COL)
+            self.updateTotals()
+            return
+
+        old = self.GetIndexOf(modelObject)
+        if old == -1:
+            return
+        # Its key has changed, and the order any other sort left it in won't hold any more.
+        self.InvalidateSortKeys([modelObject])
+        selection = self.GetSelectedObjects()
+
+        del objects[old]
+        value = self.getSortValue(modelObject)
+        lo, hi = 0, len(objects)
+        # Go after any equal values, as a stable sort of an appended row would.
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if value < self.getSortValue(objects[mid]):
+                hi = mid
+            else:
+                lo = mid + 1
+        objects.insert(lo, modelObject)
+
+        first, last = min(old, lo), max(old, lo)
+        if self.objectToIndexMap is not None:
+            for i in xrange(first, last + 1):
+                self.objectToIndexMap[objects[i]] = i
+        self.refreshTotals(first)
+        if first != last:
+            self.SelectObjects(selection)
+        RefreshScheduler.GetShared().Schedule(self.refreshRows, objects[first])
+
+    def refreshRows(self, transactions):
+        """Redraw the rows of the transactions, and the rows after them whose balances they changed."""
+        indexes = [i for i in (self.GetIndexOf(t) for t in transactions) if i != -1]
+        if indexes:
+            self.lastGetObjectIndex = -1
+            self.RefreshItems(min(indexes), self.GetItemCount() - 1)
 
     def getTotal(self, transObj):
         if not hasattr(transObj, "_Total"):
-            self.updateTotals()
+            self.refreshTotals(self.getFirstIndex([transObj]))
         
         return transObj._Total
     
     def updateTotals(self, message=None):
-        first = self.GetObjectAt(0)
-        if first is None:
-            return
-        
+        """Recompute the running totals of all the rows."""
+        self.refreshTotals()
+
+    def getBalanceCurrency(self):
         if not self.CurrentAccount:
             #This means we are in 'All accounts' so we need to convert each total
             # to the global currency
-            balance_currency = self.BankController.Model.GlobalCurrency
+            return self.BankController.Model.GlobalCurrency
         else:
             #we are just viewing a single account
             # balance currency = accounts currency
-            balance_currency = GetCurrencyInt(self.CurrentAccount.GetCurrency())
-        
-        first._Total = first.GetAmount(balance_currency)
-        
-        b = first
-        for i in range(1, len(self.GetObjects())):
-            a, b = b, self.GetObjectAt(i)
-            b._Total = a._Total + b.GetAmount(balance_currency)
-    
+            return GetCurrencyInt(self.CurrentAccount.GetCurrency())
+
+    def getFirstIndex(self, transactions):
+        """Return the lowest row of any of the transactions, or the number of rows if none are shown."""
+        indexes = [i for i in (self.GetIndexOf(t) for t in transactions) if i != -1]
+        if indexes:
+            return min(indexes)
+        return len(self.innerList)
+
+    def refreshTotals(self, first=0):
+        """
+        Bring the running totals of the rows up to date. Only the rows from the given one on
+        are recomputed, and only those amounts converted, so it should be the first row at which
+        transactions were added, removed, moved or edited. If the rows have been replaced or
+        sorted another way since the last time, they are all recomputed.
+        """
+        rows = self.innerList
+        sort = (self.sortColumnIndex, self.sortAscending)
+        if sort != self.totalsSort or rows is not self.totalRows:
+            first = 0
+        first = min(first, len(self.totals))
+
+        # Convert all the amounts at once, rather than once per row.
+        del self.totalAmounts[first:]
+        self.totalAmounts.extend(self.BankController.Model.GetAmounts(rows[first:], self.getBalanceCurrency()))
+
+        del self.totals[first:]
+        total = self.totals[-1] if self.totals else 0.0
+        cellStrings = self.cellStrings
+        for i in xrange(first, len(rows)):
+            total += self.totalAmounts[i]
+            rows[i]._Total = total
+            self.totals.append(total)
+            cells = cellStrings.get(rows[i])
+            if cells:
+                cells.pop(self.COL_TOTAL, None)
+
+        self.totalRows = rows
+        self.totalsSort = sort
+        # The balances of every row after an edited one change, so their sort keys are stale.
+        if first < len(rows):
+            self.InvalidateColumnSortKeys(self.columns[self.COL_TOTAL])
+
     def renderDateIDTuple(self, pair):
         return str(pair[0])
   
@@ -194,6 +334,31 @@ class TransactionOLV(GroupListView):
     def renderEditDescription(self, modelObj):
         return modelObj._Description
 
+    def updateAmountExtremes(self, added=(), removed=()):
+        """Keep the lowest and highest amounts current as transactions are added and removed."""
+        if self.amountExtremes is None:
+            return
+        low, high = self.amountExtremes
+        # If one of the extremes went, the next one could be anywhere, so find them again when sizing.
+        for transaction in removed:
+            if transaction is low or transaction is high:
+                self.amountExtremes = None
+                return
+        for transaction in added:
+            if transaction.Amount < low.Amount:
+                low = transaction
+            if transaction.Amount > high.Amount:
+                high = transaction
+        self.amountExtremes = (low, high)
+
+    def getTextWidth(self, text):
+        """Return the width of the text in the list's font, measuring each string only once."""
+        widths = self.textWidths.setdefault(self.GetFont().GetNativeFontInfoDesc(), {})
+        width = widths.get(text)
+        if width is None:
+            width = widths[text] = self.GetTextExtent(text)[0]
+        return width
+
     def _sizeAmounts(self):
         """Set the width of the Amount and Total columns based on the approximated widest value."""
         transactions = self.GetObjects()
@@ -201,18 +366,25 @@ class TransactionOLV(GroupListView):
         if len(transactions) == 0:
             return
 
-        for i, attr in enumerate(("Amount", "_Total")):
-            # Sort by amount, then compare the highest and lowest, to take into account a negative sign.
-            sortedtrans = list(sorted(transactions, cmp=lambda a,b: cmp(getattr(a, attr), getattr(b, attr))))
-            high, low = sortedtrans[0], sortedtrans[-1]
-            # Get the (translated) displayed column name to calculate width.
-            header = _({"_Total": "Balance"}.get(attr, attr))
+        if self.amountExtremes is None:
+            amountOf = lambda t: t.Amount
+            self.amountExtremes = (min(transactions, key=amountOf), max(transactions, key=amountOf))
+        if not self.totals:
+            self.updateTotals()
+
+        # Compare the highest and lowest, to take into account a negative sign.
+        columns = (
+            (self.COL_AMOUNT, _("Amount"), self.amountExtremes),
+            (self.COL_TOTAL, _("Balance"), (min(self.totals), max(self.totals))),
+        )
+        for col, header, values in columns:
             # Take the max of the two as well as the column header width, as we need to at least display that.
-            widestWidth = max([self.GetTextExtent(header)[0]] + [self.GetTextExtent(self.renderFloat(getattr(t, attr)))[0] for t in (high, low)])
-            wx.CallAfter(self.SetColumnFixedWidth, *(self.COL_AMOUNT+i, widestWidth + 10))
+            widestWidth = max([self.getTextWidth(header)] + [self.getTextWidth(self.renderFloat(value)) for value in values])
+            self.SetColumnFixedWidth(col, widestWidth + 10)
 
     def sizeAmounts(self):
-        threading.Thread(target=self._sizeAmounts).start()
+        """Size the amount columns once, after all the changes of the current event."""
+        RefreshScheduler.GetShared().Schedule(self._sizeAmounts)
 
     def setAccount(self, account, scrollToBottom=True):
         self.CurrentAccount = account
@@ -393,17 +565,32 @@ class TransactionOLV(GroupListView):
     def onTransactionsRemoved(self, message):
         account, transactions = message.data
         if account is self.CurrentAccount:
+            # The totals before the first of them stay the same.
+            first = self.getFirstIndex(transactions)
             # Remove the item from the list.
             self.RemoveObjects(transactions)
-            self.updateTotals()
+            for transaction in transactions:
+                self.cellStrings.pop(transaction, None)
+            self.refreshTotals(first)
+            self.updateAmountExtremes(removed=transactions)
             self.sizeAmounts()
             
     def onTransactionAdded(self, message):
         account, transaction = message.data
         if account is self.CurrentAccount:
             self.AddObject(transaction)
-            self.updateTotals()
+            self.refreshTotals(self.getFirstIndex([transaction]))
             self.Reveal(transaction)
+            self.updateAmountExtremes(added=[transaction])
+            self.sizeAmounts()
+
+    def onTransactionsAdded(self, message):
+        account, transactions = message.data
+        if account is self.CurrentAccount and transactions:
+            self.AddObjects(transactions)
+            self.refreshTotals(self.getFirstIndex(transactions))
+            self.Reveal(transactions[-1])
+            self.updateAmountExtremes(added=transactions)
             self.sizeAmounts()
 
     def onTagSearch(self, tag):
@@ -445,6 +632,10 @@ class TransactionOLV(GroupListView):
         self.Refresh()
 
     def onCurrencyChanged(self, message):
+        # Every amount and balance is rendered differently now.
+        self.clearCellStrings()
+        # The balances may be in a different currency now.
+        self.updateTotals()
         # Refresh all the transaction objects, re-rendering the amounts.
         self.RefreshObjects()
         # The current likely changed the widths of the amount/total column.
@@ -453,6 +644,8 @@ class TransactionOLV(GroupListView):
         self.AutoSizeColumns()
         
     def onShowCurrencyNickToggled(self, message):
+        # Every amount and balance is rendered differently now.
+        self.clearCellStrings()
         # Refresh all the transaction objects, re-rendering the amounts.
         self.RefreshObjects()
         # The current likely changed the widths of the amount/total column.